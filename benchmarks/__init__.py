@@ -0,0 +1,6 @@
+"""
+Offline conversion benchmarks of the Quickwit backend with seeded synthetic rule corpora.
+
+Run with ``python -m benchmarks --output results.json`` and compare with the results of
+another version with ``--baseline``.
+"""
@@ -0,0 +1,181 @@
+import ipaddress
+import random
+import string
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from sigma.pipelines.quickwit import quickwit_windows_pipeline
+from sigma.processing.pipeline import ProcessingPipeline
+
+RuleDict = Dict[str, Any]
+
+# Sysmon process creation fields, as used by most public Sigma rules
+FIELDS = ["Image", "ParentImage", "CommandLine", "User", "TargetFilename"]
+MODIFIERS = ["", "|endswith", "|contains", "|startswith"]
+CONDITIONS = [
+    "sel",
+    "sel and not filter",
+    "1 of sel*",
+    "sel1 and (sel2 or sel3)",
+    "all of sel* and not filter",
+]
+
+
+def _word(rng: random.Random, length: int = 8) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def _value(rng: random.Random) -> str:
+    kind = rng.randrange(3)
+    if kind == 0:
+        return f"\\{_word(rng)}.exe"
+    elif kind == 1:
+        return f" -{_word(rng, 4)} "
+    return f"C:\\Windows\\{_word(rng)}\\"
+
+
+def _rule(rng: random.Random, title: str, detection: Dict[str, Any]) -> RuleDict:
+    return {
+        "title": title,
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "status": "test",
+        "logsource": {"product": "windows", "category": "process_creation"},
+        "detection": detection,
+    }
+
+
+def _selection(rng: random.Random, max_values: int = 10) -> Dict[str, Any]:
+    return {
+        rng.choice(FIELDS) + rng.choice(MODIFIERS): [
+            _value(rng) for _ in range(rng.randint(1, max_values))
+        ]
+        for _ in range(rng.randint(1, 3))
+    }
+
+
+@dataclass
+class Corpus:
+    """Named generator of rules, whose size is scaled by a factor."""
+
+    name: str
+    description: str
+    generate: Callable[[random.Random, float], List[RuleDict]]
+    options: Dict[str, Any] = field(default_factory=dict)
+    pipeline: Optional[Callable[[], ProcessingPipeline]] = None
+
+
+def realistic(rng: random.Random, scale: float) -> List[RuleDict]:
+    """Rules resembling public process creation rules, with shared filters."""
+    filters = [_selection(rng, 5) for _ in range(10)]
+    rules = []
+    for i in range(max(1, int(1000 * scale))):
+        condition = rng.choice(CONDITIONS)
+        detection: Dict[str, Any] = {"condition": condition}
+        if "sel1" in condition:
+            for name in ("sel1", "sel2", "sel3"):
+                detection[name] = _selection(rng)
+        else:
+            detection["sel"] = _selection(rng)
+        if "filter" in condition:
+            detection["filter"] = rng.choice(filters)
+        rules.append(_rule(rng, f"Realistic {i}", detection))
+    return rules
+
+
+def deep_nesting(rng: random.Random, scale: float) -> List[RuleDict]:
+    """Rules with conditions nested alternately with AND and OR up to 50 levels deep."""
+    depth = max(2, int(50 * scale))
+    rules = []
+    for i in range(max(1, int(100 * scale))):
+        condition = f"sel{depth - 1}"
+        for level in range(depth - 2, -1, -1):
+            operator = "and" if level % 2 else "or"
+            condition = f"sel{level} {operator} ({condition})"
+        detection: Dict[str, Any] = {
+            f"sel{level}": {rng.choice(FIELDS): _value(rng)} for level in range(depth)
+        }
+        detection["condition"] = condition
+        rules.append(_rule(rng, f"Deep nesting {i}", detection))
+    return rules
+
+
+def large_list(rng: random.Random, scale: float) -> List[RuleDict]:
+    """A single rule with a list of 100000 values, like indicator lists."""
+    values = [
+        f"{_word(rng, 12)}.example.com" for _ in range(max(1, int(100000 * scale)))
+    ]
+    return [
+        _rule(
+            rng,
+            "Large list",
+            {"sel": {"QueryName|endswith": values}, "condition": "sel"},
+        )
+    ]
+
+
+def cidrs(rng: random.Random, scale: float) -> List[RuleDict]:
+    """Rules with lists of overlapping and adjacent IPv4 and IPv6 networks."""
+    rules = []
+    for i in range(max(1, int(100 * scale))):
+        networks = []
+        for _ in range(200):
+            if rng.random() < 0.7:
+                prefix = rng.randint(16, 30)
+                address = ipaddress.IPv4Address(rng.getrandbits(32))
+            else:
+                prefix = rng.randint(32, 64)
+                address = ipaddress.IPv6Address(
+                    (0x2001_0DB8 << 96) | rng.getrandbits(96)
+                )
+            networks.append(str(ipaddress.ip_network(f"{address}/{prefix}", False)))
+        rules.append(
+            _rule(
+                rng,
+                f"CIDRs {i}",
+                {"sel": {"DestinationIp|cidr": networks}, "condition": "sel"},
+            )
+        )
+    return rules
+
+
+def regexes(rng: random.Random, scale: float) -> List[RuleDict]:
+    """Rules with anchored and unanchored regular expressions, many shared between rules."""
+    patterns = [
+        f"{'^' if rng.random() < 0.5 else ''}{_word(rng, 4)}[0-9]{{2,4}}"
+        f"(\\.{_word(rng, 3)}|-{_word(rng, 3)})+{'$' if rng.random() < 0.5 else ''}"
+        for _ in range(200)
+    ]
+    rules = []
+    for i in range(max(1, int(500 * scale))):
+        rules.append(
+            _rule(
+                rng,
+                f"Regexes {i}",
+                {
+                    "sel": {
+                        "CommandLine|re": rng.sample(patterns, 5),
+                        "Image|endswith": _value(rng),
+                    },
+                    "condition": "sel",
+                },
+            )
+        )
+    return rules
+
+
+CORPORA: Dict[str, Corpus] = {
+    corpus.name: corpus
+    for corpus in (
+        Corpus(
+            "realistic",
+            realistic.__doc__,
+            realistic,
+            pipeline=quickwit_windows_pipeline,
+        ),
+        Corpus("deep_nesting", deep_nesting.__doc__, deep_nesting),
+        Corpus("large_list", large_list.__doc__, large_list),
+        Corpus("cidrs", cidrs.__doc__, cidrs),
+        Corpus("regexes", regexes.__doc__, regexes, {"regex_guard": "off"}),
+    )
+}
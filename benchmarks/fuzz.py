@@ -0,0 +1,657 @@
+"""
+Differential and complexity fuzzing of the Quickwit backend with seeded random Sigma rules.
+
+The differential check converts random rules with several sets of backend options and compares
+the matches of the converted queries, evaluated by the local query evaluator, with the matches
+of a reference evaluator of the Sigma detection on events generated from the values of each
+rule. The complexity check converts rules of growing condition depth and list length and fits
+the growth of the conversion time and output size, which must stay near-linear.
+"""
+
+import argparse
+import ipaddress
+import json
+import math
+import random
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.backends.quickwit.evaluator import QuickwitQueryEvaluator
+from sigma.backends.quickwit.events import Event, field_values, value_str
+from sigma.conditions import (
+    ConditionAND,
+    ConditionFieldEqualsValueExpression,
+    ConditionNOT,
+    ConditionOR,
+)
+from sigma.rule import SigmaRule
+from sigma.types import (
+    SigmaCIDRExpression,
+    SigmaCompareExpression,
+    SigmaNull,
+    SigmaNumber,
+    SigmaRegularExpression,
+    SigmaRegularExpressionFlag,
+    SigmaString,
+    SpecialChars,
+)
+
+from .corpus import RuleDict
+
+Matcher = Callable[[Event], bool]
+
+# String fields, of which dotted names are also generated as nested objects in events
+STRING_FIELDS = ["Image", "CommandLine", "process.name"]
+NUMBER_FIELD = "EventID"
+IP_FIELD = "DestinationIp"
+# Small alphabet, so generated events often match, with characters escaped in Quickwit queries
+# and Sigma wildcards, which are escaped in rule values
+ALPHABET = 'abAB01 -.:/\\"()*?'
+STRING_MODIFIERS = ["", "|contains", "|startswith", "|endswith", "|contains|all"]
+COMPARE_MODIFIERS = ["|lt", "|lte", "|gt", "|gte"]
+NETWORKS = ["10.0.0.0/8", "10.1.0.0/16", "192.168.1.0/24", "2001:db8::/32"]
+
+# Backend options the differential check converts each rule with
+OPTION_SETS: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "unoptimized": {"optimize": False},
+    "canonical": {"canonical": True},
+    "split": {"split_max_clauses": 3},
+}
+
+DEFAULT_MAX_EXPONENT = 1.3
+
+
+@dataclass
+class GeneratedRule:
+    """Random rule and examples of field values matching the values of the rule."""
+
+    rule: RuleDict
+    samples: Dict[str, List[Any]] = field(default_factory=dict)
+
+
+def _literal(rng: random.Random, max_length: int = 4) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, max_length)))
+
+
+def _sigma_string(parts: Sequence[Optional[str]]) -> str:
+    """Sigma string of literals and wildcards (None), with escaped special characters."""
+    return "".join(
+        "*" if part is None else re.sub(r"([*?\\])", r"\\\1", part) for part in parts
+    )
+
+
+def _instantiate(rng: random.Random, parts: Sequence[Optional[str]]) -> str:
+    """Value matching a pattern, with random case and random strings for wildcards."""
+    return "".join(
+        _literal(rng, 3)[: rng.randint(0, 3)]
+        if part is None
+        else "".join(c.swapcase() if rng.random() < 0.3 else c for c in part)
+        for part in parts
+    )
+
+
+class _RuleGenerator:
+    """Generator of one random rule, recording matching samples of each generated value."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.samples: Dict[str, List[Any]] = dict()
+
+    def sample(self, field_name: str, value: Any) -> None:
+        self.samples.setdefault(field_name, []).append(value)
+
+    def string_value(self, field_name: str, modifier: str) -> str:
+        rng = self.rng
+        parts: List[Optional[str]] = [_literal(rng)]
+        for _ in range(rng.randint(0, 2)):
+            if rng.random() < 0.5:
+                parts.extend((None, _literal(rng)))
+        if modifier == "" and rng.random() < 0.3:
+            parts = [None, *parts] if rng.random() < 0.5 else [*parts, None]
+        wrapped = [
+            *(
+                [None]
+                if modifier in ("|contains", "|endswith", "|contains|all")
+                else []
+            ),
+            *parts,
+            *(
+                [None]
+                if modifier in ("|contains", "|startswith", "|contains|all")
+                else []
+            ),
+        ]
+        self.sample(field_name, _instantiate(rng, wrapped))
+        return _sigma_string(parts)
+
+    def regex_value(self, field_name: str) -> Tuple[str, str]:
+        rng = self.rng
+        literal, alternatives = _literal(rng), [_literal(rng, 2) for _ in range(2)]
+        start, end = rng.random() < 0.5, rng.random() < 0.5
+        regex = (
+            ("^" if start else "")
+            + re.escape(literal)
+            + "("
+            + "|".join(re.escape(alternative) for alternative in alternatives)
+            + ")[0-9]{1,2}"
+            + ("$" if end else "")
+        )
+        case_insensitive = rng.random() < 0.3
+        sample = literal + rng.choice(alternatives) + str(rng.randint(0, 99))
+        self.sample(
+            field_name,
+            ("" if start else _literal(rng))
+            + (sample.swapcase() if case_insensitive else sample)
+            + ("" if end else _literal(rng)),
+        )
+        return "|re|i" if case_insensitive else "|re", regex
+
+    def number_value(self) -> int:
+        number = self.rng.randint(1, 20)
+        self.sample(NUMBER_FIELD, number + self.rng.choice((-1, 0, 0, 1)))
+        return number
+
+    def network_value(self) -> str:
+        network = ipaddress.ip_network(self.rng.choice(NETWORKS))
+        address = network.network_address + self.rng.randrange(
+            min(network.num_addresses, 2**16)
+        )
+        self.sample(IP_FIELD, str(address))
+        return str(network)
+
+    def item(self) -> Tuple[str, Any]:
+        """Field name with modifiers and value of a detection item."""
+        rng = self.rng
+        kind = rng.random()
+        if kind < 0.55:
+            field_name = rng.choice(STRING_FIELDS)
+            modifier = rng.choice(STRING_MODIFIERS)
+            values = [
+                self.string_value(field_name, modifier)
+                for _ in range(
+                    rng.randint(2, 3)
+                    if modifier == "|contains|all"
+                    else rng.randint(1, 3)
+                )
+            ]
+            return field_name + modifier, values[0] if len(values) == 1 else values
+        elif kind < 0.65:
+            field_name = rng.choice(STRING_FIELDS)
+            modifier, regex = self.regex_value(field_name)
+            return field_name + modifier, regex
+        elif kind < 0.75:
+            values = [self.number_value() for _ in range(rng.randint(1, 3))]
+            return NUMBER_FIELD, values[0] if len(values) == 1 else values
+        elif kind < 0.85:
+            modifier = rng.choice(COMPARE_MODIFIERS)
+            return NUMBER_FIELD + modifier, self.number_value()
+        elif kind < 0.95:
+            return IP_FIELD + "|cidr", [
+                self.network_value() for _ in range(rng.randint(1, 3))
+            ]
+        return rng.choice(STRING_FIELDS), None
+
+    def selection(self) -> Any:
+        """Map of detection items or, sometimes, a list of maps."""
+
+        def items() -> Dict[str, Any]:
+            selection: Dict[str, Any] = dict()
+            for _ in range(self.rng.randint(1, 3)):
+                key, value = self.item()
+                selection.setdefault(key, value)
+            return selection
+
+        if self.rng.random() < 0.15:
+            return [items() for _ in range(2)]
+        return items()
+
+    def condition(self, names: List[str], depth: int) -> str:
+        rng = self.rng
+        if depth == 0 or rng.random() < 0.25:
+            return rng.choice(names)
+        operator = rng.choice((" and ", " or "))
+        expression = operator.join(
+            self.condition(names, depth - 1) for _ in range(rng.randint(2, 3))
+        )
+        return ("not " if rng.random() < 0.25 else "") + f"({expression})"
+
+    def rule(self, index: int, max_depth: int) -> RuleDict:
+        names = [f"sel{i}" for i in range(self.rng.randint(1, 4))]
+        detection: Dict[str, Any] = {name: self.selection() for name in names}
+        if len(names) > 1 and self.rng.random() < 0.2:
+            detection["condition"] = self.rng.choice(("1 of sel*", "all of sel*"))
+        else:
+            detection["condition"] = self.condition(names, max_depth)
+        return {
+            "title": f"Fuzz {index}",
+            "status": "test",
+            "logsource": {"product": "fuzz"},
+            "detection": detection,
+        }
+
+
+def random_rule(
+    rng: random.Random, index: int = 0, max_depth: int = 3
+) -> GeneratedRule:
+    """
+    Random rule with string, regular expression, number, comparison, CIDR and null values,
+    combined by random conditions up to max_depth levels deep.
+    """
+    generator = _RuleGenerator(rng)
+    rule = generator.rule(index, max_depth)
+    return GeneratedRule(rule, generator.samples)
+
+
+def _mutate(rng: random.Random, value: Any) -> Any:
+    """Near miss of a sample: a character changed, removed or added, or a number shifted."""
+    if isinstance(value, int):
+        return value + rng.choice((-1, 1))
+    s = str(value)
+    position = rng.randrange(len(s) + 1)
+    kind = rng.randrange(3)
+    if kind == 0 and position < len(s):
+        return s[:position] + rng.choice(ALPHABET) + s[position + 1 :]
+    elif kind == 1 and position < len(s):
+        return s[:position] + s[position + 1 :]
+    return s[:position] + rng.choice(ALPHABET) + s[position:]
+
+
+def _set_field(
+    event: Dict[str, Any], field_name: str, value: Any, nested: bool
+) -> None:
+    if not nested or "." not in field_name:
+        event[field_name] = value
+        return
+    *path, key = field_name.split(".")
+    target = event
+    for name in path:
+        target = target.setdefault(name, dict())
+    target[key] = value
+
+
+def random_events(
+    rng: random.Random, generated: GeneratedRule, count: int
+) -> List[Dict[str, Any]]:
+    """
+    Events with samples of the rule, near misses of samples, lists, nulls and missing fields.
+    """
+    events = []
+    for _ in range(count):
+        event: Dict[str, Any] = dict()
+        for field_name, samples in generated.samples.items():
+            kind = rng.random()
+            if kind < 0.15:
+                continue
+            elif kind < 0.2:
+                value: Any = None
+            elif kind < 0.6:
+                value = rng.choice(samples)
+            elif kind < 0.85:
+                value = _mutate(rng, rng.choice(samples))
+            else:
+                value = [
+                    rng.choice(samples) if rng.random() < 0.5 else _literal(rng)
+                    for _ in range(2)
+                ]
+            _set_field(event, field_name, value, rng.random() < 0.5)
+        events.append(event)
+    return events
+
+
+_regex_flags = {
+    SigmaRegularExpressionFlag.IGNORECASE: re.IGNORECASE,
+    SigmaRegularExpressionFlag.MULTILINE: re.MULTILINE,
+    SigmaRegularExpressionFlag.DOTALL: re.DOTALL,
+}
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _value_matcher(value: Any) -> Callable[[Any], bool]:
+    """Matcher of a single event value against a Sigma value, following the Sigma semantics."""
+    if isinstance(value, SigmaString):
+        regex = re.compile(
+            "".join(
+                re.escape(part)
+                if isinstance(part, str)
+                else ".*"
+                if part == SpecialChars.WILDCARD_MULTI
+                else "."
+                for part in value.s
+            ),
+            re.IGNORECASE | re.DOTALL,
+        )
+        return lambda v: regex.fullmatch(value_str(v)) is not None
+    elif isinstance(value, SigmaNumber):
+        return lambda v: value_str(v) == str(value)
+    elif isinstance(value, SigmaRegularExpression):
+        flags = 0
+        for flag in value.flags:
+            flags |= _regex_flags[flag]
+        regex = re.compile(str(value.regexp), flags)
+        return lambda v: regex.search(value_str(v)) is not None
+    elif isinstance(value, SigmaCompareExpression):
+        bound = float(value.number.number)
+        compare = {
+            SigmaCompareExpression.CompareOperators.LT: float.__lt__,
+            SigmaCompareExpression.CompareOperators.LTE: float.__le__,
+            SigmaCompareExpression.CompareOperators.GT: float.__gt__,
+            SigmaCompareExpression.CompareOperators.GTE: float.__ge__,
+        }[value.op]
+
+        def match_compare(v: Any) -> bool:
+            number = _number(v)
+            return number is not None and compare(number, bound)
+
+        return match_compare
+    elif isinstance(value, SigmaCIDRExpression):
+        network = value.network
+
+        def match_cidr(v: Any) -> bool:
+            try:
+                address = ipaddress.ip_address(v) if isinstance(v, str) else None
+            except ValueError:
+                return False
+            return (
+                address is not None
+                and address.version == network.version
+                and address in network
+            )
+
+        return match_cidr
+    raise TypeError(f"Unsupported value type {type(value).__name__}")
+
+
+def _reference_node(node: Any) -> Matcher:
+    if isinstance(node, ConditionAND):
+        args = [_reference_node(arg) for arg in node.args]
+        return lambda event: all(arg(event) for arg in args)
+    elif isinstance(node, ConditionOR):
+        args = [_reference_node(arg) for arg in node.args]
+        return lambda event: any(arg(event) for arg in args)
+    elif isinstance(node, ConditionNOT):
+        arg = _reference_node(node.args[0])
+        return lambda event: not arg(event)
+    elif isinstance(node, ConditionFieldEqualsValueExpression):
+        field_name = node.field
+        if isinstance(node.value, SigmaNull):
+            return lambda event: not field_values(event, field_name)
+        match_value = _value_matcher(node.value)
+        return lambda event: any(
+            match_value(v) for v in field_values(event, field_name)
+        )
+    raise TypeError(f"Unsupported condition {type(node).__name__}")
+
+
+def reference_matcher(rule: SigmaRule) -> Matcher:
+    """
+    Matcher of events by the detection of a rule, evaluated on the condition tree parsed by
+    pySigma without the backend: case-insensitive wildcard matching of strings, unanchored
+    regular expressions and null values matching missing fields.
+    """
+    conditions = [
+        _reference_node(condition.parsed)
+        for condition in rule.detection.parsed_condition
+    ]
+    return lambda event: any(condition(event) for condition in conditions)
+
+
+@dataclass
+class Mismatch:
+    """Event matched differently by a converted query than by the rule, or failed conversion."""
+
+    rule_index: int
+    options: str
+    rule: RuleDict
+    queries: List[str]
+    event: Optional[Dict[str, Any]] = None
+    expected: Optional[bool] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rule_index": self.rule_index,
+            "options": self.options,
+            "rule": self.rule,
+            "queries": self.queries,
+            "event": self.event,
+            "expected": self.expected,
+            "error": self.error,
+        }
+
+
+@dataclass
+class DifferentialReport:
+    """Numbers of rules, compared matches and matching events, and the mismatches found."""
+
+    seed: int
+    rules: int = 0
+    comparisons: int = 0
+    matches: int = 0
+    mismatches: List[Mismatch] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seed": self.seed,
+            "rules": self.rules,
+            "comparisons": self.comparisons,
+            "matches": self.matches,
+            "mismatches": [mismatch.to_dict() for mismatch in self.mismatches],
+        }
+
+
+def differential(
+    seed: int = 1,
+    rules: int = 200,
+    events: int = 50,
+    option_sets: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> DifferentialReport:
+    """
+    Convert random rules with each set of backend options and compare the matches of the queries
+    with the reference evaluator. Rule i of a seed is generated by random.Random(f"{seed}-{i}"),
+    so single rules of a report can be reproduced.
+    """
+    option_sets = OPTION_SETS if option_sets is None else option_sets
+    backends = {
+        name: QuickwitBackend(**{"regex_guard": "off", **options})
+        for name, options in option_sets.items()
+    }
+    report = DifferentialReport(seed)
+    for index in range(rules):
+        rng = random.Random(f"{seed}-{index}")
+        generated = random_rule(rng, index)
+        reference = reference_matcher(SigmaRule.from_dict(generated.rule))
+        samples = random_events(rng, generated, events)
+        expected = [reference(event) for event in samples]
+        report.rules += 1
+        report.matches += sum(expected)
+        for name, backend in backends.items():
+            try:
+                queries = backend.convert_rule(SigmaRule.from_dict(generated.rule))
+                evaluator = QuickwitQueryEvaluator({"rule": queries})
+            except Exception as e:
+                report.mismatches.append(
+                    Mismatch(index, name, generated.rule, [], error=str(e))
+                )
+                continue
+            for event, match in zip(samples, expected):
+                report.comparisons += 1
+                if bool(evaluator.match(event)) is not match:
+                    report.mismatches.append(
+                        Mismatch(index, name, generated.rule, queries, event, match)
+                    )
+                    break  # One mismatching event per rule and options is enough
+    return report
+
+
+def nested_rule(rng: random.Random, size: int) -> RuleDict:
+    """Rule with a condition nested size levels deep, alternating AND, OR and NOT."""
+    condition = f"sel{size - 1}"
+    for level in range(size - 2, -1, -1):
+        operator = "and" if level % 2 else "or"
+        negation = "not " if level % 3 == 0 else ""
+        condition = f"sel{level} {operator} {negation}({condition})"
+    detection: Dict[str, Any] = {
+        f"sel{level}": {
+            rng.choice(STRING_FIELDS) + rng.choice(STRING_MODIFIERS[:4]): _literal(rng)
+            + str(level)
+        }
+        for level in range(size)
+    }
+    detection["condition"] = condition
+    return {"title": "Nested", "logsource": {"product": "fuzz"}, "detection": detection}
+
+
+def list_rule(rng: random.Random, size: int) -> RuleDict:
+    """Rule with lists of size plain, suffix and CIDR values."""
+    return {
+        "title": "Lists",
+        "logsource": {"product": "fuzz"},
+        "detection": {
+            "sel": {
+                "Image|endswith": [f"{_literal(rng)}{i}.exe" for i in range(size)],
+                "CommandLine": [f"{_literal(rng)}-{i}" for i in range(size)],
+                f"{IP_FIELD}|cidr": [
+                    str(ipaddress.ip_network((rng.getrandbits(32), 24), strict=False))
+                    for _ in range(size)
+                ],
+            },
+            "condition": "sel",
+        },
+    }
+
+
+# Rule generators and sizes of the complexity check
+DIMENSIONS: Dict[
+    str, Tuple[Callable[[random.Random, int], RuleDict], Tuple[int, ...]]
+] = {
+    "depth": (nested_rule, (12, 24, 48, 96)),
+    "list_length": (list_rule, (250, 500, 1000, 2000)),
+}
+
+
+def growth_exponent(sizes: Sequence[float], values: Sequence[float]) -> float:
+    """Exponent k of the least squares fit of values ~ sizes^k, 1 for linear growth."""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(value, 1e-9)) for value in values]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum(
+        (x - mean_x) ** 2 for x in xs
+    )
+
+
+def complexity(
+    seed: int = 1,
+    dimensions: Optional[Sequence[str]] = None,
+    repeat: int = 3,
+    scale: float = 1.0,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Best conversion time of rules of growing size and the size of their queries, with the
+    exponents of their growth. The time checked is the time spent in the backend (condition
+    conversion and finalization), as measured by the instrumentation, because pySigma's
+    condition parser, which runs before, is superlinear in the nesting depth. The total time
+    is reported as well.
+    """
+    results = dict()
+    for name in dimensions or DIMENSIONS:
+        generate, sizes = DIMENSIONS[name]
+        sizes = tuple(max(2, int(size * scale)) for size in sizes)
+        seconds, total_seconds, sizes_bytes = [], [], []
+        for size in sizes:
+            rule = generate(random.Random(seed), size)
+            best = best_total = math.inf
+            for _ in range(repeat):
+                backend = QuickwitBackend(instrument=True, regex_guard="off")
+                queries = backend.convert_rule(SigmaRule.from_dict(rule))
+                metrics = backend.instrumentation.records[-1]
+                best = min(
+                    best, metrics.phases["condition"] + metrics.phases["finalize"]
+                )
+                best_total = min(best_total, metrics.seconds)
+            seconds.append(best)
+            total_seconds.append(best_total)
+            sizes_bytes.append(sum(len(query) for query in queries))
+        results[name] = {
+            "sizes": list(sizes),
+            "seconds": seconds,
+            "total_seconds": total_seconds,
+            "bytes": sizes_bytes,
+            "time_exponent": growth_exponent(sizes, seconds),
+            "size_exponent": growth_exponent(sizes, sizes_bytes),
+        }
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.fuzz",
+        description="Differential and complexity fuzzing of the Quickwit backend.",
+    )
+    parser.add_argument(
+        "--check",
+        action="append",
+        choices=["differential", "complexity"],
+        help="Check to run, can be repeated (default: all)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rules", type=int, default=200)
+    parser.add_argument("--events", type=int, default=50, help="Events per rule")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Factor of the complexity check sizes"
+    )
+    parser.add_argument(
+        "--max-exponent",
+        type=float,
+        default=DEFAULT_MAX_EXPONENT,
+        help="Maximum growth exponent of conversion time and output size",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON to file")
+    args = parser.parse_args(argv)
+    checks = args.check or ["differential", "complexity"]
+
+    result: Dict[str, Any] = {"seed": args.seed}
+    failed = False
+    if "differential" in checks:
+        report = differential(args.seed, args.rules, args.events)
+        result["differential"] = report.to_dict()
+        print(
+            f"differential: {report.rules} rules, {report.comparisons} comparisons, "
+            f"{report.matches} matching events, {len(report.mismatches)} mismatches"
+        )
+        for mismatch in report.mismatches[:5]:
+            print(json.dumps(mismatch.to_dict()), file=sys.stderr)
+        failed = failed or bool(report.mismatches)
+    if "complexity" in checks:
+        result["complexity"] = complexity(
+            args.seed, repeat=args.repeat, scale=args.scale
+        )
+        for name, dimension in result["complexity"].items():
+            print(
+                f"complexity {name}: time exponent {dimension['time_exponent']:.2f}, "
+                f"size exponent {dimension['size_exponent']:.2f}"
+            )
+            for kind in ("time", "size"):
+                if dimension[f"{kind}_exponent"] > args.max_exponent:
+                    print(f"{name}: {kind} grows faster than linear", file=sys.stderr)
+                    failed = True
+    if args.output is not None:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import argparse
+import cProfile
+import json
+import platform
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.collection import SigmaCollection
+
+from .corpus import CORPORA, Corpus
+
+# Functions of these packages are reported in the per-method timings
+PROFILED_PACKAGES = ("sigma/backends/quickwit/", "sigma/conversion/")
+
+
+def _package_version(name: str) -> str:
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _collection(corpus: Corpus, seed: int, scale: float) -> SigmaCollection:
+    """Fresh rule collection, as rules are modified by processing pipelines while converted."""
+    return SigmaCollection.from_dicts(corpus.generate(random.Random(seed), scale))
+
+
+def _convert(corpus: Corpus, collection: SigmaCollection) -> List[Any]:
+    backend = QuickwitBackend(
+        corpus.pipeline() if corpus.pipeline is not None else None,
+        **corpus.options,
+    )
+    return backend.convert(collection)
+
+
+def _methods(profile: cProfile.Profile, top: int) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profile)
+    methods = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        path = filename.replace("\\", "/")
+        package = next((p for p in PROFILED_PACKAGES if p in path), None)
+        if package is None:
+            continue
+        module = path[path.index(package) :].removesuffix(".py").replace("/", ".")
+        methods.append(
+            {
+                "method": f"{module}:{name}",
+                "line": line,
+                "calls": calls,
+                "seconds": tottime,
+                "cumulative_seconds": cumtime,
+            }
+        )
+    methods.sort(key=lambda method: method["seconds"], reverse=True)
+    return methods[:top]
+
+
+def run_corpus(
+    corpus: Corpus, seed: int, scale: float, repeat: int = 3, top: int = 15
+) -> Dict[str, Any]:
+    """
+    Benchmark the conversion of a corpus: best time of repeat runs, peak memory traced in a
+    separate run and time per method profiled in another run, so neither tracing nor profiling
+    distort the timing.
+    """
+    rules = 0
+    query_bytes = 0
+    times = []
+    for _ in range(repeat):
+        collection = _collection(corpus, seed, scale)
+        rules = len(collection.rules)
+        start = time.perf_counter()
+        queries = _convert(corpus, collection)
+        times.append(time.perf_counter() - start)
+        query_bytes = sum(len(str(query).encode("utf-8")) for query in queries)
+
+    collection = _collection(corpus, seed, scale)
+    tracemalloc.start()
+    try:
+        _convert(corpus, collection)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    collection = _collection(corpus, seed, scale)
+    profile = cProfile.Profile()
+    profile.runcall(_convert, corpus, collection)
+
+    seconds = min(times)
+    return {
+        "description": corpus.description,
+        "rules": rules,
+        "seconds": seconds,
+        "rules_per_second": rules / seconds if seconds > 0 else 0.0,
+        "peak_memory_bytes": peak_memory,
+        "query_bytes": query_bytes,
+        "methods": _methods(profile, top),
+    }
+
+
+def run(
+    corpora: Sequence[str], seed: int = 1, scale: float = 1.0, repeat: int = 3
+) -> Dict[str, Any]:
+    return {
+        "metadata": {
+            "backend": _package_version("pySigma-backend-quickwit"),
+            "pysigma": _package_version("pysigma"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "scale": scale,
+            "repeat": repeat,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": {
+            name: run_corpus(CORPORA[name], seed, scale, repeat) for name in corpora
+        },
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Regressions of throughput or peak memory by more than threshold (relative)."""
+    regressions = []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        if result["rules_per_second"] < base["rules_per_second"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {result['rules_per_second']:.1f} rules/s, "
+                f"baseline {base['rules_per_second']:.1f} rules/s"
+            )
+        if result["peak_memory_bytes"] > base["peak_memory_bytes"] * (1 + threshold):
+            regressions.append(
+                f"{name}: peak memory {result['peak_memory_bytes']} bytes, "
+                f"baseline {base['peak_memory_bytes']} bytes"
+            )
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the conversion of synthetic rule corpora.",
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        choices=sorted(CORPORA),
+        help="Corpus to benchmark, can be repeated, all by default",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Factor of the corpus sizes"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="Write results as JSON to file")
+    parser.add_argument(
+        "--baseline", type=Path, help="Compare with results of a previous run"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative slowdown or memory increase reported as regression",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.corpus or sorted(CORPORA), args.seed, args.scale, args.repeat)
+    for name, result in results["results"].items():
+        print(
+            f"{name:<14} {result['rules']:>6} rules {result['seconds']:>9.3f}s "
+            f"{result['rules_per_second']:>10.1f} rules/s "
+            f"{result['peak_memory_bytes'] / 2**20:>8.1f} MiB peak"
+        )
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
@@ -0,0 +1,104 @@
+"""
+Import time of the backend and pipeline plugins, as paid by every sigma-cli invocation. Each
+measurement runs in a fresh interpreter, after pySigma's plugin discovery module is imported,
+so only the time added by this package is measured.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+PLUGIN_MODULES = ("sigma.backends.quickwit", "sigma.pipelines.quickwit")
+
+# Modules only needed by some conversions, which must not be imported with the plugins
+LAZY_MODULES = (
+    "sigma.backends.quickwit.batch",
+    "sigma.backends.quickwit.cost",
+    "sigma.backends.quickwit.instrumentation",
+    "sigma.backends.quickwit.mapping",
+    "sigma.backends.quickwit.runner",
+    "sigma.backends.quickwit.watch",
+    "sigma.pipelines.quickwit.quickwit",
+    "sigma.pipelines.quickwit.mapping",
+)
+
+_measure = """
+import json, sys, time
+import sigma.plugins
+start = time.perf_counter()
+{imports}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "modules": sorted(sys.modules)}}))
+"""
+
+DEFAULT_BUDGET_MS = 25.0
+
+
+def measure(modules: Sequence[str] = PLUGIN_MODULES, runs: int = 9) -> Dict[str, Any]:
+    """Median import time of modules over fresh interpreters and lazy modules imported with them."""
+    code = _measure.format(imports="\n".join(f"import {module}" for module in modules))
+    times = []
+    eager: List[str] = []
+    for _ in range(runs):
+        result = json.loads(
+            subprocess.run(
+                [sys.executable, "-c", code],
+                capture_output=True,
+                check=True,
+                text=True,
+                cwd=Path(__file__).resolve().parent.parent,
+            ).stdout
+        )
+        times.append(result["seconds"])
+        eager = [module for module in LAZY_MODULES if module in result["modules"]]
+    return {
+        "modules": list(modules),
+        "runs": runs,
+        "median_ms": statistics.median(times) * 1000,
+        "min_ms": min(times) * 1000,
+        "eager_modules": eager,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.startup",
+        description="Measure the import time of the Quickwit plugins against a budget.",
+    )
+    parser.add_argument("--runs", type=int, default=9)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help="Maximum median import time in milliseconds",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON to file")
+    args = parser.parse_args(argv)
+
+    result = measure(runs=args.runs)
+    result["budget_ms"] = args.budget_ms
+    print(
+        f"Import of {', '.join(result['modules'])}: {result['median_ms']:.1f}ms median, "
+        f"{result['min_ms']:.1f}ms min, budget {args.budget_ms:g}ms"
+    )
+    if args.output is not None:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    failed = False
+    if result["eager_modules"]:
+        print(
+            f"Imported at startup: {', '.join(result['eager_modules'])}",
+            file=sys.stderr,
+        )
+        failed = True
+    if result["median_ms"] > args.budget_ms:
+        print("Import time exceeds budget", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from sigma.collection import SigmaCollection
+from sigma.conversion.base import Backend
+from sigma.correlations import SigmaCorrelationRule
+from sigma.rule import SigmaRule
+
+if TYPE_CHECKING:
+    from .quickwit import QuickwitBackend
+
+
+@dataclass
+class BatchConversionResult:
+    """Result of a batch conversion: finalized output plus per-rule errors in rule order."""
+
+    output: Any
+    errors: List[Tuple[SigmaRule, Exception]] = field(default_factory=list)
+
+
+# Backend instance of a worker process, initialized once per worker by _init_worker.
+_worker_backend: Optional["QuickwitBackend"] = None
+
+
+def _init_worker(backend: "QuickwitBackend", output_format: str) -> None:
+    global _worker_backend
+    backend.init_processing_pipeline(output_format)
+    _worker_backend = backend
+
+
+def _convert_chunk(
+    chunk: Sequence[SigmaRule], output_format: str
+) -> List[Tuple[List[Any], Optional[Exception], Optional[Dict[str, Any]]]]:
+    """
+    Convert rules in a worker process. The metrics collected by the backend of the worker are
+    returned with the result of each rule, as they would be lost with the worker otherwise.
+    """
+    results = []
+    for rule in chunk:
+        queries, error = _convert_one(_worker_backend, rule, output_format)
+        results.append((queries, error, _worker_backend.worker_report()))
+    return results
+
+
+def _convert_one(
+    backend: Backend,
+    rule: SigmaRule,
+    output_format: str,
+    correlation_method: Optional[str] = None,
+) -> Tuple[List[Any], Optional[Exception]]:
+    """
+    Convert a single rule, returning its finalized queries or the error it raised. Unlike
+    collect_errors, this also catches non-Sigma exceptions (e.g. NotImplementedError raised for
+    unsupported features), so that a single rule can't abort the whole batch.
+    """
+    try:
+        if isinstance(rule, SigmaCorrelationRule):
+            return backend.convert_correlation_rule(
+                rule, output_format, correlation_method
+            ), None
+        return backend.convert_rule(rule, output_format), None
+    except Exception as e:
+        return [], e
+
+
+def convert_batch(
+    backend: "QuickwitBackend",
+    rule_collection: SigmaCollection,
+    output_format: Optional[str] = None,
+    correlation_method: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+) -> BatchConversionResult:
+    """
+    Convert a rule collection by spreading independent rules across a process pool.
+
+    Each worker converts its rules with convert_rule (and thereby finalize_query), the parent
+    process keeps the collection order and runs the output finalization. Rules that take part
+    in correlations are converted in the parent process, because correlation conversion needs
+    the conversion results of the referenced rules. Metrics collected by the workers are merged
+    into the backend of the parent process in rule order.
+    """
+    output_format = output_format or backend.default_format
+    backend.init_processing_pipeline(output_format)
+    rule_collection.resolve_rule_references()
+    rules = rule_collection.rules
+
+    local = [
+        isinstance(rule, SigmaCorrelationRule) or bool(rule._backreferences)
+        for rule in rules
+    ]
+    remote = [rule for rule, is_local in zip(rules, local) if not is_local]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers > 1 and len(remote) > 1:
+        if chunksize is None:
+            chunksize = max(1, len(remote) // (max_workers * 4))
+        chunks = [remote[i : i + chunksize] for i in range(0, len(remote), chunksize)]
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(chunks)),
+            initializer=_init_worker,
+            initargs=(backend, output_format),
+        ) as executor:
+            remote_results = iter(
+                [
+                    result
+                    for chunk_results in executor.map(
+                        _convert_chunk, chunks, [output_format] * len(chunks)
+                    )
+                    for result in chunk_results
+                ]
+            )
+    else:
+        remote_results = iter(
+            [(*_convert_one(backend, rule, output_format), None) for rule in remote]
+        )
+
+    queries = []
+    errors = []
+    for rule, is_local in zip(rules, local):
+        if is_local:
+            rule_queries, error = _convert_one(
+                backend, rule, output_format, correlation_method
+            )
+        else:
+            rule_queries, error, report = next(remote_results)
+            if report is not None:
+                backend.merge_worker_report(report)
+        if error is not None:
+            errors.append((rule, error))
+        queries.extend(rule_queries)
+
+    return BatchConversionResult(backend.finalize(queries, output_format), errors)
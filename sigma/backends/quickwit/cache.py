@@ -0,0 +1,251 @@
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+
+from sigma.processing.pipeline import ProcessingPipeline
+from sigma.rule import SigmaRule
+
+# Pipeline fields that hold state accumulated while rules are processed instead of configuration.
+_pipeline_runtime_fields = frozenset(
+    ("applied", "applied_ids", "field_name_applied_ids", "field_mappings", "state")
+)
+# Back-references from transformations and conditions to their processing item or pipeline.
+_backreference_fields = frozenset(("processing_item", "_pipeline", "pipeline"))
+
+
+def _package_version(name: str) -> str:
+    try:
+        return version(name)
+    except PackageNotFoundError:  # pragma: no cover
+        return "unknown"
+
+
+def _normalize(obj: Any) -> Any:
+    """Convert configuration objects into a JSON-serializable structure with a stable ordering."""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {
+            "__class__": type(obj).__qualname__,
+            **{
+                f.name: _normalize(getattr(obj, f.name))
+                for f in dataclasses.fields(obj)
+                if f.name not in _backreference_fields
+                and not (
+                    isinstance(obj, ProcessingPipeline)
+                    and f.name in _pipeline_runtime_fields
+                )
+            },
+        }
+    elif isinstance(obj, dict):
+        return {str(key): _normalize(value) for key, value in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_normalize(item) for item in obj]
+    elif isinstance(obj, (set, frozenset)):
+        return sorted((_normalize(item) for item in obj), key=repr)
+    elif isinstance(obj, type):
+        return obj.__qualname__
+    elif obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    else:
+        return repr(obj)
+
+
+def _digest(obj: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(obj, sort_keys=True, default=repr).encode("utf-8")
+    ).hexdigest()
+
+
+def pipeline_fingerprint(pipeline: ProcessingPipeline) -> str:
+    """Hash of the configuration of a processing pipeline, ignoring its per-rule runtime state."""
+    normalized = _normalize(pipeline)
+    normalized["vars"] = {
+        name: value
+        for name, value in normalized["vars"].items()
+        if not name.startswith("backend_cache_")
+    }
+    return _digest(normalized)
+
+
+class ConversionCache:
+    """
+    On-disk content-addressed cache of rule conversion results.
+
+    Entries are keyed by a hash of the rule, the fingerprint of the processing pipeline and the
+    backend version, options and output format. Each entry is a JSON file below the cache
+    directory. Hits refresh the modification time of an entry and the least recently used entries
+    are evicted once the total size of the cache exceeds max_bytes.
+    """
+
+    # Fraction of max_bytes the cache is shrunk to by an eviction
+    low_water = 0.8
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = sum(stat.st_size for stat, _ in self._stat_entries())
+        self._pipeline_fingerprints: Dict[int, str] = {}
+
+    def _entries(self) -> List[Path]:
+        return list(self.path.glob("*/*.json"))
+
+    def _stat_entries(self) -> List[Tuple[os.stat_result, Path]]:
+        """Entries with their stats, without those removed since they were listed."""
+        entries = []
+        for entry in self._entries():
+            try:
+                entries.append((entry.stat(), entry))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.json"
+
+    def key(
+        self,
+        rule: SigmaRule,
+        pipeline: ProcessingPipeline,
+        backend_options: Dict[str, Any],
+        output_format: str,
+        doc_mapping: Optional[Any] = None,
+    ) -> str:
+        """
+        Compute the cache key of a rule. Must be called before the pipeline is applied to it. The
+        loaded doc mapping is part of the key, as its file can change while the options don't.
+        """
+        pipeline_id = id(pipeline)
+        if pipeline_id not in self._pipeline_fingerprints:
+            self._pipeline_fingerprints = {pipeline_id: pipeline_fingerprint(pipeline)}
+        return _digest(
+            {
+                "rule": rule.to_dict(),
+                "pipeline": self._pipeline_fingerprints[pipeline_id],
+                "backend": _package_version("pySigma-backend-quickwit"),
+                "pysigma": _package_version("pysigma"),
+                "options": _normalize(backend_options),
+                "format": output_format,
+                "doc_mapping": _normalize(vars(doc_mapping))
+                if doc_mapping is not None
+                else None,
+            }
+        )
+
+    def get(self, key: str) -> Optional[List[Any]]:
+        """Return the cached queries for key or None if there is no entry."""
+        entry = self._entry_path(key)
+        try:
+            with entry.open("r", encoding="utf-8") as f:
+                queries = json.load(f)
+            os.utime(entry)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return queries
+
+    def put(self, key: str, queries: List[Any]) -> None:
+        """Store queries under key. Results that can't be represented as JSON are not cached."""
+        try:
+            data = json.dumps(queries).encode("utf-8")
+        except (TypeError, ValueError):
+            return
+        entry = self._entry_path(key)
+        entry.parent.mkdir(exist_ok=True)
+        try:
+            self.size -= entry.stat().st_size
+        except FileNotFoundError:
+            pass
+        fd, tmp = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, entry)
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the cache is down to the low-water mark of
+        max_bytes, so the entries aren't listed again on each following put. Entries removed
+        concurrently by other processes sharing the cache directory are skipped.
+        """
+        entries = sorted(self._stat_entries(), key=lambda item: item[0].st_mtime)
+        self.size = sum(stat.st_size for stat, _ in entries)
+        for stat, entry in entries:
+            if self.size <= self.max_bytes * self.low_water:
+                break
+            entry.unlink(missing_ok=True)
+            self.size -= stat.st_size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": self.size,
+        }
+
+
+class SubtreeMemo:
+    """
+    In-memory cache of converted condition subtrees, which are shared by many rules of a
+    collection, like common selections and filters. Entries are keyed by a structural hash of
+    the subtree and the conversion state. The least recently used entries are evicted once
+    there are more than max_entries entries or their total size exceeds max_bytes.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        query = self.entries.get(key)
+        if query is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return query
+
+    def put(self, key: Hashable, query: str) -> None:
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        self.entries[key] = query
+        self.size += len(query)
+        while self.entries and (
+            len(self.entries) > self.max_entries or self.size > self.max_bytes
+        ):
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "size": self.size,
+            "hit_rate": self.hit_rate,
+        }
@@ -0,0 +1,27 @@
+import ipaddress
+from typing import Dict, Iterable, List, Tuple, Union
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def merge_networks(networks: Iterable[IPNetwork]) -> List[Tuple[IPAddress, IPAddress]]:
+    """
+    Merge networks into the minimal list of address ranges covering them. Overlapping networks
+    are collapsed and adjacent networks merged into one range, even if the range is no CIDR
+    network itself. IPv4 ranges are returned before IPv6 ranges, each in ascending order.
+    """
+    by_version: Dict[int, List[IPNetwork]] = dict()
+    for network in networks:
+        by_version.setdefault(network.version, []).append(network)
+    ranges: List[Tuple[IPAddress, IPAddress]] = []
+    for version in sorted(by_version):
+        version_ranges: List[Tuple[IPAddress, IPAddress]] = []
+        for network in ipaddress.collapse_addresses(by_version[version]):
+            start, end = network.network_address, network.broadcast_address
+            if version_ranges and int(version_ranges[-1][1]) + 1 == int(start):
+                version_ranges[-1] = (version_ranges[-1][0], end)
+            else:
+                version_ranges.append((start, end))
+        ranges.extend(version_ranges)
+    return ranges
@@ -0,0 +1,63 @@
+from typing import Any, Dict, Optional
+
+from sigma.correlations import (
+    SigmaCorrelationCondition,
+    SigmaCorrelationConditionOperator,
+)
+
+
+def correlation_condition(condition: SigmaCorrelationCondition) -> Dict[str, Any]:
+    """Threshold of a correlation rule, which is checked on the returned buckets."""
+    return {"op": condition.op.name.lower(), "count": condition.count}
+
+
+def min_doc_count(condition: SigmaCorrelationCondition) -> int:
+    """
+    Minimum number of events of buckets that can satisfy an event count condition, which lets
+    Quickwit drop the other buckets server-side. Empty buckets are never returned.
+    """
+    if condition.op == SigmaCorrelationConditionOperator.GTE:
+        return max(condition.count, 1)
+    elif condition.op == SigmaCorrelationConditionOperator.GT:
+        return condition.count + 1
+    elif condition.op == SigmaCorrelationConditionOperator.EQ:
+        return max(condition.count, 1)
+    return 1
+
+
+def correlation_aggs(
+    group_by: Dict[str, str],
+    timestamp_field: str,
+    timespan: int,
+    bucket_size: int,
+    window_min_doc_count: int = 1,
+    window_aggs: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Aggregation of events into nested terms buckets per group-by field, each with a date
+    histogram of time windows of the correlation timespan as innermost aggregation. The terms
+    aggregations are named by the keys of group_by, which are the field names or aliases used
+    in the correlation rule, so results of rules with aliased fields have the same structure.
+
+    The time windows are fixed, non-overlapping buckets aligned to the epoch, not sliding
+    windows. Events of a burst that crosses a bucket boundary are counted in two buckets, which
+    may each stay below the threshold.
+    """
+    window: Dict[str, Any] = {
+        "date_histogram": {
+            "field": timestamp_field,
+            "fixed_interval": f"{timespan}s",
+            "min_doc_count": window_min_doc_count,
+        }
+    }
+    if window_aggs:
+        window["aggs"] = window_aggs
+    aggs = {"window": window}
+    for name, field_name in reversed(list(group_by.items())):
+        aggs = {
+            name: {
+                "terms": {"field": field_name, "size": bucket_size},
+                "aggs": aggs,
+            }
+        }
+    return aggs
@@ -0,0 +1,127 @@
+from dataclasses import asdict, dataclass
+from typing import Any, ClassVar, Dict, Optional
+
+from sigma.types import SpecialChars
+
+from .query import (
+    QueryAnd,
+    QueryClause,
+    QueryNode,
+    QueryNot,
+    QueryOr,
+    StringPattern,
+    parse_query,
+)
+
+
+@dataclass
+class QueryCost:
+    """Estimated cost of a query with the structural metrics it was derived from."""
+
+    score: float = 0.0
+    clauses: int = 0
+    terms: int = 0
+    phrases: int = 0
+    prefix_wildcards: int = 0
+    leading_wildcards: int = 0
+    regexes: int = 0
+    in_lists: int = 0
+    in_list_values: int = 0
+    max_in_list_size: int = 0
+    ranges: int = 0
+    negations: int = 0
+    depth: int = 0
+    query_bytes: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def add(self, other: "QueryCost") -> None:
+        """Accumulate the cost of another query, e.g. of all queries of a rule."""
+        for name, value in asdict(other).items():
+            if name in ("max_in_list_size", "depth"):
+                setattr(self, name, max(getattr(self, name), value))
+            else:
+                setattr(self, name, getattr(self, name) + value)
+
+
+class QueryCostEstimator:
+    """
+    Cost model of Quickwit queries. Term and phrase lookups are cheap, trailing wildcards need a
+    scan of a term dictionary range, leading or infix wildcards and regular expressions a scan of
+    the whole term dictionary. In-lists cost per value, ranges are evaluated on fast fields.
+    Deeply nested boolean queries add intersection/union overhead per level.
+    """
+
+    weights: ClassVar[Dict[str, float]] = {
+        "term": 1,
+        "phrase": 2,
+        "exists": 2,
+        "prefix_wildcard": 5,
+        "leading_wildcard": 50,
+        "regex": 100,
+        "in_list": 1,
+        "in_list_value": 0.5,
+        "range": 10,
+        "negation": 1,
+        "depth": 2,
+    }
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        if weights is not None:
+            self.weights = {**self.weights, **weights}
+
+    def estimate(self, query: str) -> QueryCost:
+        cost = QueryCost(query_bytes=len(query.encode("utf-8")))
+        self._visit(parse_query(query), cost, 1)
+        cost.score += cost.depth * self.weights["depth"]
+        return cost
+
+    def _visit(self, node: QueryNode, cost: QueryCost, depth: int) -> None:
+        cost.depth = max(cost.depth, depth)
+        if isinstance(node, (QueryAnd, QueryOr)):
+            for arg in node.args:
+                self._visit(arg, cost, depth + 1)
+        elif isinstance(node, QueryNot):
+            cost.negations += 1
+            cost.score += self.weights["negation"]
+            self._visit(node.arg, cost, depth)
+        else:
+            self._clause(node, cost)
+
+    def _clause(self, clause: QueryClause, cost: QueryCost) -> None:
+        cost.clauses += 1
+        if clause.kind in ("term", "phrase"):
+            self._pattern(clause.value, clause.kind, cost)
+        elif clause.kind == "in":
+            cost.in_lists += 1
+            cost.in_list_values += len(clause.value)
+            cost.max_in_list_size = max(cost.max_in_list_size, len(clause.value))
+            cost.score += self.weights["in_list"]
+            for value in clause.value:
+                self._pattern(value, "in_list_value", cost)
+        elif clause.kind == "regex":
+            cost.regexes += 1
+            cost.score += self.weights["regex"]
+        elif clause.kind in ("range", "compare"):
+            cost.ranges += 1
+            cost.score += self.weights["range"]
+        else:
+            cost.score += self.weights[clause.kind]
+
+    def _pattern(self, pattern: StringPattern, kind: str, cost: QueryCost) -> None:
+        wildcards = [
+            i for i, part in enumerate(pattern) if part == SpecialChars.WILDCARD_MULTI
+        ]
+        if wildcards and (wildcards[0] < len(pattern) - 1 or len(pattern) == 1):
+            cost.leading_wildcards += 1
+            cost.score += self.weights["leading_wildcard"]
+        elif wildcards:
+            cost.prefix_wildcards += 1
+            cost.score += self.weights["prefix_wildcard"]
+        else:
+            if kind == "term":
+                cost.terms += 1
+            elif kind == "phrase":
+                cost.phrases += 1
+            cost.score += self.weights[kind]
@@ -0,0 +1,411 @@
+import ipaddress
+import json
+import mmap
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Union,
+)
+
+from sigma.exceptions import SigmaValueError
+from sigma.types import SpecialChars
+
+from .events import Event, field_values, value_str
+from .prefilter import QuickwitPrefilter
+from .query import (
+    QueryAnd,
+    QueryClause,
+    QueryNode,
+    QueryNot,
+    QueryOr,
+    StringPattern,
+    parse_query,
+)
+
+Matcher = Callable[[Event], bool]
+ValueMatcher = Callable[[Any], bool]
+
+
+def compile_pattern(
+    pattern: StringPattern, case_sensitive: bool = False
+) -> ValueMatcher:
+    """
+    Matcher of whole values against a StringPattern. Plain, prefix*, *suffix and *infix*
+    patterns are matched with string methods, other patterns with a regular expression.
+    """
+    parts = [
+        part if isinstance(part, str) else None for part in pattern
+    ]  # None: wildcard
+    literals = [part for part in parts if part is not None]
+    if not case_sensitive:
+        literals = [literal.lower() for literal in literals]
+
+    def normalize(value: Any) -> str:
+        s = value_str(value)
+        return s if case_sensitive else s.lower()
+
+    if not literals:
+        if parts:
+            return lambda value: True
+        return lambda value: value_str(value) == ""
+    elif len(literals) == 1:
+        literal = literals[0]
+        if len(parts) == 1:
+            return lambda value: normalize(value) == literal
+        elif len(parts) == 2 and parts[0] is not None:
+            return lambda value: normalize(value).startswith(literal)
+        elif len(parts) == 2:
+            return lambda value: normalize(value).endswith(literal)
+        elif len(parts) == 3 and parts[1] is not None:
+            return lambda value: literal in normalize(value)
+    regex = re.compile(
+        "".join(".*" if part is None else re.escape(part) for part in parts),
+        re.DOTALL if case_sensitive else re.DOTALL | re.IGNORECASE,
+    )
+    return lambda value: regex.fullmatch(value_str(value)) is not None
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _ip(value: Any) -> Optional[Union[ipaddress.IPv4Address, ipaddress.IPv6Address]]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return ipaddress.ip_address(value)
+    except ValueError:
+        return None
+
+
+def compile_range(
+    lower: Optional[str],
+    upper: Optional[str],
+    lower_inclusive: bool,
+    upper_inclusive: bool,
+) -> ValueMatcher:
+    """
+    Matcher of a range clause. Bounds are compared as IP addresses if they are IP addresses,
+    as used for CIDR matches, as numbers if they are numeric and as strings otherwise.
+    """
+    bounds = [bound for bound in (lower, upper) if bound is not None]
+    convert: Callable[[Any], Any]
+    if bounds and all(_ip(bound) is not None for bound in bounds):
+        convert = _ip
+    elif all(_number(bound) is not None for bound in bounds):
+        convert = _number
+    else:
+        convert = value_str
+    lower_value = convert(lower) if lower is not None else None
+    upper_value = convert(upper) if upper is not None else None
+
+    def match(value: Any) -> bool:
+        value = convert(value)
+        if value is None:
+            return False
+        try:
+            if lower_value is not None and (
+                value < lower_value or not lower_inclusive and value == lower_value
+            ):
+                return False
+            if upper_value is not None and (
+                value > upper_value or not upper_inclusive and value == upper_value
+            ):
+                return False
+        except TypeError:  # IPv4 compared with IPv6
+            return False
+        return True
+
+    return match
+
+
+def compile_clause(clause: QueryClause) -> ValueMatcher:
+    """Matcher of a single field value for a clause."""
+    if clause.kind == "phrase":
+        return compile_pattern(clause.value)
+    elif clause.kind == "term":
+        return compile_pattern(clause.value, case_sensitive=True)
+    elif clause.kind == "in":
+        plain = set()
+        matchers = []
+        for pattern in clause.value:
+            if SpecialChars.WILDCARD_MULTI in pattern:
+                matchers.append(compile_pattern(pattern))
+            else:
+                plain.add("".join(pattern).lower())
+        if not matchers:
+            return lambda value: value_str(value).lower() in plain
+
+        def match_in(value: Any) -> bool:
+            if value_str(value).lower() in plain:
+                return True
+            for matcher in matchers:
+                if matcher(value):
+                    return True
+            return False
+
+        return match_in
+    elif clause.kind == "regex":
+        try:
+            regex = re.compile(clause.value)
+        except re.error as e:
+            raise SigmaValueError(f"Invalid regular expression '{clause.value}': {e}")
+        return lambda value: regex.fullmatch(value_str(value)) is not None
+    elif clause.kind == "range":
+        return compile_range(*clause.value)
+    elif clause.kind == "compare":
+        op, bound = clause.value
+        lower = op.startswith(">")
+        return compile_range(
+            bound if lower else None,
+            None if lower else bound,
+            op == ">=",
+            op == "<=",
+        )
+    elif clause.kind == "exists":
+        return lambda value: True
+    raise SigmaValueError(f"Unsupported clause kind '{clause.kind}'")
+
+
+def compile_node(node: QueryNode) -> Matcher:
+    """
+    Compile a query syntax tree into a matcher of events. Matchers are plain closures with
+    explicit loops, which are considerably faster than generator expressions in the hot path.
+    """
+    if isinstance(node, QueryAnd):
+        matchers = [compile_node(arg) for arg in node.args]
+
+        def match_and(event: Event) -> bool:
+            for matcher in matchers:
+                if not matcher(event):
+                    return False
+            return True
+
+        return match_and
+    elif isinstance(node, QueryOr):
+        matchers = [compile_node(arg) for arg in node.args]
+
+        def match_or(event: Event) -> bool:
+            for matcher in matchers:
+                if matcher(event):
+                    return True
+            return False
+
+        return match_or
+    elif isinstance(node, QueryNot):
+        matcher = compile_node(node.arg)
+        return lambda event: not matcher(event)
+    value_matcher = compile_clause(node)
+    field_name = node.field
+
+    def match_field(event: Event) -> bool:
+        value = event.get(field_name)
+        if value.__class__ in (str, int):  # Fast path for scalar top-level values
+            return value_matcher(value)
+        for value in field_values(event, field_name):
+            if value_matcher(value):
+                return True
+        return False
+
+    return match_field
+
+
+def compile_query(query: str) -> Matcher:
+    """
+    Compile a query generated by the backend into a matcher of events (decoded JSON objects).
+    Matching follows the semantics of the Sigma rule the query was converted from instead of
+    the Quickwit tokenizers: phrase and in-list values are matched case-insensitively against
+    whole field values, term values case-sensitively, as generated for raw fields. Regular
+    expressions match whole values, like tantivy regular expressions match whole terms.
+    """
+    return compile_node(parse_query(query))
+
+
+@dataclass
+class EvaluationReport:
+    """
+    Result of an evaluation: number of events and matches per rule with sample positions, the
+    number of full rule evaluations after prefiltering and the evaluation time.
+    """
+
+    events: int = 0
+    matches: Dict[str, int] = field(default_factory=dict)
+    samples: Dict[str, List[int]] = field(default_factory=dict)
+    errors: int = 0
+    evaluations: int = 0
+    seconds: float = 0.0
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "events": self.events,
+            "errors": self.errors,
+            "matches": self.matches,
+            "samples": self.samples,
+            "evaluations": self.evaluations,
+            "seconds": self.seconds,
+            "events_per_second": self.events_per_second,
+        }
+
+
+class QuickwitQueryEvaluator:
+    """
+    Local evaluation of converted queries against log events, e.g. to validate rules or hunt in
+    NDJSON exports without a Quickwit cluster. Multiple queries of the same rule, like parts of
+    split queries, are combined with OR. By default, only rules found as candidates by the
+    literal prefilter are evaluated for an event.
+    """
+
+    def __init__(
+        self,
+        queries: Mapping[str, Union[str, Iterable[str]]],
+        max_samples: int = 100,
+        prefilter: bool = True,
+    ):
+        self.rule_ids: List[str] = []
+        self.matchers: List[Matcher] = []
+        nodes: List[List[QueryNode]] = []
+        for rule_id, rule_queries in queries.items():
+            if isinstance(rule_queries, str):
+                rule_queries = [rule_queries]
+            rule_nodes = [parse_query(query) for query in rule_queries]
+            self.rule_ids.append(rule_id)
+            self.matchers.append(
+                compile_node(
+                    rule_nodes[0]
+                    if len(rule_nodes) == 1
+                    else QueryOr(tuple(rule_nodes))
+                )
+            )
+            nodes.append(rule_nodes)
+        self.prefilter: Optional[QuickwitPrefilter] = (
+            QuickwitPrefilter(nodes) if prefilter else None
+        )
+        self.max_samples = max_samples
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[Mapping[str, Any]], max_samples: int = 100
+    ) -> "QuickwitQueryEvaluator":
+        """
+        Create an evaluator from query records of the ndjson, fused attribution or search_request
+        output formats, which contain the rule ID and the query.
+        """
+        queries: Dict[str, List[str]] = dict()
+        for record in records:
+            query = record["query"] if "query" in record else record["request"]["query"]
+            rule_id = record.get("rule_id") or record["title"]
+            queries.setdefault(rule_id, []).append(query)
+        return cls(queries, max_samples)
+
+    def match(self, event: Event) -> List[str]:
+        """IDs of rules matching the event."""
+        return [self.rule_ids[index] for index in self._match(event, None)]
+
+    def _match(self, event: Event, report: Optional[EvaluationReport]) -> List[int]:
+        if self.prefilter is None:
+            candidates: Iterable[int] = range(len(self.matchers))
+        else:
+            candidates = sorted(self.prefilter.candidates(event))
+        matches = []
+        evaluations = 0
+        for index in candidates:
+            evaluations += 1
+            if self.matchers[index](event):
+                matches.append(index)
+        if report is not None:
+            report.evaluations += evaluations
+        return matches
+
+    def evaluate(
+        self, events: Iterable[Event], report: Optional[EvaluationReport] = None
+    ) -> EvaluationReport:
+        """Evaluate all rules against the events."""
+        if report is None:
+            report = EvaluationReport()
+        start = time.perf_counter()
+        for event in events:
+            self._record(report, event)
+        report.seconds += time.perf_counter() - start
+        return report
+
+    def _record(self, report: EvaluationReport, event: Event) -> None:
+        position = report.events
+        report.events += 1
+        for index in self._match(event, report):
+            rule_id = self.rule_ids[index]
+            report.matches[rule_id] = report.matches.get(rule_id, 0) + 1
+            samples = report.samples.setdefault(rule_id, [])
+            if len(samples) < self.max_samples:
+                samples.append(position)
+
+    def evaluate_file(
+        self,
+        path: Union[str, Path],
+        batch_size: int = 10000,
+        use_mmap: bool = True,
+    ) -> EvaluationReport:
+        """
+        Evaluate all rules against an NDJSON file, which is read in batches of lines. The file is
+        memory-mapped by default, which avoids copying it through read buffers. Lines that are
+        no valid JSON objects are counted as errors. Sample positions are line numbers starting
+        at 0.
+        """
+        report = EvaluationReport()
+        start = time.perf_counter()
+        for batch in self._read_batches(path, batch_size, use_mmap):
+            for line in batch:
+                if not line.strip():
+                    report.events += 1
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    event = None
+                if not isinstance(event, dict):
+                    report.errors += 1
+                    report.events += 1
+                    continue
+                self._record(report, event)
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def _read_batches(
+        self, path: Union[str, Path], batch_size: int, use_mmap: bool
+    ) -> Iterator[List[bytes]]:
+        with open(path, "rb") as f:
+            if use_mmap and Path(path).stat().st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    yield from self._batches(iter(mapped.readline, b""), batch_size)
+            else:
+                yield from self._batches(f, batch_size)
+
+    def _batches(
+        self, lines: Iterable[bytes], batch_size: int
+    ) -> Iterator[List[bytes]]:
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
@@ -0,0 +1,39 @@
+import json
+from typing import Any, List, Mapping
+
+Event = Mapping[str, Any]
+
+_missing = object()
+
+
+def field_values(event: Event, field_name: str) -> List[Any]:
+    """
+    Values of a field in an event. Dotted field names are looked up as literal key first and as
+    path into nested objects otherwise. Array values are expanded, missing and null values are
+    omitted.
+    """
+    value = event.get(field_name, _missing)
+    if value is _missing:
+        value = event
+        for key in field_name.split("."):
+            if not isinstance(value, Mapping) or key not in value:
+                return []
+            value = value[key]
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [item for item in value if item is not None]
+    return [value]
+
+
+def value_str(value: Any) -> str:
+    """String representation of an event value as it is matched by string clauses."""
+    if value.__class__ is str:
+        return value
+    elif isinstance(value, bool):
+        return "true" if value else "false"
+    elif isinstance(value, str):
+        return value
+    elif isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .cost import QueryCost
+
+PHASES = ("pipeline", "condition", "finalize")
+
+
+@dataclass
+class RuleMetrics:
+    """
+    Conversion metrics of a rule: wall time per phase in seconds and structural metrics of the
+    generated queries, accumulated over all queries of the rule.
+    """
+
+    rule_id: str
+    title: str
+    phases: Dict[str, float] = field(
+        default_factory=lambda: {phase: 0.0 for phase in PHASES}
+    )
+    queries: int = 0
+    cost: QueryCost = field(default_factory=QueryCost)
+    error: Optional[str] = None
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.phases.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat representation, which is used for the JSON and CSV reports."""
+        return {
+            "rule_id": self.rule_id,
+            "title": self.title,
+            "seconds": self.seconds,
+            **{f"{phase}_seconds": seconds for phase, seconds in self.phases.items()},
+            "queries": self.queries,
+            **self.cost.to_dict(),
+            "error": self.error,
+        }
+
+
+class ConversionInstrumentation:
+    """
+    Collects the metrics of converted rules and passes them to subscribed callbacks as soon as a
+    rule is converted, e.g. to export them to a metrics system.
+    """
+
+    def __init__(self) -> None:
+        self.records: List[RuleMetrics] = list()
+        self.callbacks: List[Callable[[RuleMetrics], Any]] = list()
+
+    def subscribe(self, callback: Callable[[RuleMetrics], Any]) -> None:
+        self.callbacks.append(callback)
+
+    def record(self, metrics: RuleMetrics) -> None:
+        self.records.append(metrics)
+        for callback in self.callbacks:
+            callback(metrics)
+
+    def clear(self) -> None:
+        self.records.clear()
+
+    def slowest(self, n: int = 10) -> List[RuleMetrics]:
+        return sorted(self.records, key=lambda metrics: metrics.seconds, reverse=True)[
+            :n
+        ]
+
+    def to_json(self) -> str:
+        return json.dumps([metrics.to_dict() for metrics in self.records], indent=2)
+
+    def to_csv(self) -> str:
+        output = io.StringIO()
+        writer = csv.DictWriter(
+            output, fieldnames=list(RuleMetrics("", "").to_dict()), lineterminator="\n"
+        )
+        writer.writeheader()
+        writer.writerows(metrics.to_dict() for metrics in self.records)
+        return output.getvalue()
+
+    def write(self, path: Union[str, Path]) -> None:
+        """Write the report as CSV if the file name ends with .csv, else as JSON."""
+        path = Path(path)
+        path.write_text(
+            self.to_csv() if path.suffix.lower() == ".csv" else self.to_json(),
+            encoding="utf-8",
+        )
@@ -0,0 +1,184 @@
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import yaml
+
+from sigma.exceptions import SigmaConfigurationError
+
+
+@dataclass(frozen=True)
+class QuickwitFieldMapping:
+    """Mapping of a single field of a Quickwit index as far as it influences query generation."""
+
+    name: str
+    type: str
+    tokenizer: Optional[str] = None
+    fast: bool = False
+    indexed: bool = True
+
+    numeric_types = frozenset(("i64", "u64", "f64", "datetime"))
+
+    @property
+    def is_raw(self) -> bool:
+        """Text field that is indexed as a single token and can be queried with term queries."""
+        return self.type == "text" and self.tokenizer == "raw"
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.type in self.numeric_types
+
+
+class QuickwitDocMapping:
+    """
+    Doc mapping of a Quickwit index, loaded from an index config or a bare doc_mapping. Object
+    fields are flattened into dotted field names as they are used in queries.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, QuickwitFieldMapping],
+        mode: str = "dynamic",
+        index_id: Optional[str] = None,
+        timestamp_field: Optional[str] = None,
+        tokenizers: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        self.fields = fields
+        self.mode = mode
+        self.index_id = index_id
+        self.timestamp_field = timestamp_field
+        self.tokenizers = tokenizers or dict()
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "QuickwitDocMapping":
+        doc_mapping = config.get("doc_mapping", config)
+        if "field_mappings" not in doc_mapping:
+            raise SigmaConfigurationError(
+                "Quickwit index config contains no field mappings"
+            )
+        fields: Dict[str, QuickwitFieldMapping] = dict()
+        cls._add_fields(fields, doc_mapping["field_mappings"], "")
+        return cls(
+            fields,
+            doc_mapping.get("mode", "dynamic"),
+            config.get("index_id"),
+            doc_mapping.get("timestamp_field"),
+            {
+                tokenizer["name"]: tokenizer
+                for tokenizer in doc_mapping.get("tokenizers", [])
+            },
+        )
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "QuickwitDocMapping":
+        """Load an index config from a YAML or JSON file."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                config = yaml.safe_load(f)
+        except (OSError, yaml.YAMLError) as e:
+            raise SigmaConfigurationError(
+                f"Can't load Quickwit index config '{path}': {e}"
+            )
+        if not isinstance(config, dict):
+            raise SigmaConfigurationError(
+                f"Quickwit index config '{path}' is not a mapping"
+            )
+        return cls.from_dict(config)
+
+    @classmethod
+    def _add_fields(
+        cls,
+        fields: Dict[str, QuickwitFieldMapping],
+        field_mappings: List[Dict[str, Any]],
+        prefix: str,
+    ) -> None:
+        for field_mapping in field_mappings:
+            name = prefix + field_mapping["name"]
+            field_type = field_mapping["type"]
+            if field_type.startswith("array<"):
+                field_type = field_type[6:-1]
+            if field_type == "object":
+                cls._add_fields(
+                    fields, field_mapping.get("field_mappings", []), name + "."
+                )
+                continue
+            fast = field_mapping.get("fast", False)
+            fields[name] = QuickwitFieldMapping(
+                name,
+                field_type,
+                field_mapping.get(
+                    "tokenizer", "default" if field_type == "text" else None
+                ),
+                fast is not False,
+                field_mapping.get("indexed", True),
+            )
+
+    def tokenizer(self, field: str) -> Optional[Dict[str, Any]]:
+        """Custom tokenizer of a text field, None for fields with built-in tokenizers."""
+        field_mapping = self[field]
+        if field_mapping is None or field_mapping.type != "text":
+            return None
+        return self.tokenizers.get(field_mapping.tokenizer or "")
+
+    def ngram_size(self, field: str) -> Optional[int]:
+        """Minimum n-gram size of a field with a custom ngram tokenizer, None for other fields."""
+        tokenizer = self.tokenizer(field)
+        if tokenizer is None or tokenizer.get("type") != "ngram":
+            return None
+        return int(tokenizer.get("min_gram", 2))
+
+    def is_lowercase_ngram(self, field: str) -> bool:
+        """Field with a custom ngram tokenizer with the lower_case filter."""
+        tokenizer = self.tokenizer(field)
+        return (
+            tokenizer is not None
+            and tokenizer.get("type") == "ngram"
+            and "lower_case" in tokenizer.get("filters", [])
+        )
+
+    def is_lowercase_raw(self, field: str) -> bool:
+        """
+        Text field indexed as a single lowercased token, with the built-in lowercase tokenizer or
+        a custom raw tokenizer with the lower_case filter.
+        """
+        field_mapping = self[field]
+        if field_mapping is None or field_mapping.type != "text":
+            return False
+        elif field_mapping.tokenizer in ("lowercase", "raw_lowercase"):
+            return True
+        tokenizer = self.tokenizer(field)
+        return (
+            tokenizer is not None
+            and tokenizer.get("type") == "raw"
+            and "lower_case" in tokenizer.get("filters", [])
+        )
+
+    def json_subfield(self, field: str) -> Optional[QuickwitFieldMapping]:
+        """
+        Mapping of a path inside a json field, e.g. attributes.process.name of the json field
+        attributes. Paths inside json fields are queried with the options of the json field.
+        """
+        prefix = field
+        while "." in prefix:
+            prefix = prefix.rsplit(".", 1)[0]
+            field_mapping = self.fields.get(prefix)
+            if field_mapping is not None:
+                return (
+                    replace(field_mapping, name=field)
+                    if field_mapping.type == "json"
+                    else None
+                )
+        return None
+
+    def __getitem__(self, field: str) -> Optional[QuickwitFieldMapping]:
+        """
+        Return the mapping of a field. Unmapped fields return None in dynamic mode and raise an
+        error otherwise, because queries on them would silently return no hits.
+        """
+        field_mapping = self.fields.get(field) or self.json_subfield(field)
+        if field_mapping is None and self.mode != "dynamic":
+            raise SigmaConfigurationError(
+                f"Field '{field}' doesn't exist in the doc mapping"
+                + (f" of index '{self.index_id}'" if self.index_id else "")
+            )
+        return field_mapping
@@ -0,0 +1,424 @@
+import copy
+import hashlib
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Set, Tuple, Union
+
+from sigma.conditions import (
+    ConditionAND,
+    ConditionFieldEqualsValueExpression,
+    ConditionItem,
+    ConditionNOT,
+    ConditionOR,
+    ConditionValueExpression,
+)
+from sigma.types import SigmaExpansion, SigmaNumber, SigmaString, SpecialChars
+
+ConditionType = Union[
+    ConditionItem, ConditionFieldEqualsValueExpression, ConditionValueExpression, None
+]
+
+
+def condition_key(
+    cond: ConditionType, keys: Optional[Dict[int, Tuple[Any, Hashable]]] = None
+) -> Hashable:
+    """
+    Structural key of a condition tree. Equal keys mean equal conditions. Keys of AND, OR and
+    NOT subtrees are recorded in keys, if given, so keys of nested subtrees aren't recomputed
+    for each level, which is quadratic in the depth of the tree.
+    """
+    if keys is not None and isinstance(cond, ConditionItem):
+        entry = keys.get(id(cond))
+        if entry is not None and entry[0] is cond:
+            return entry[1]
+    if isinstance(cond, ConditionNOT):
+        key: Hashable = ("NOT", condition_key(cond.args[0], keys))
+    elif isinstance(cond, (ConditionAND, ConditionOR)):
+        key = (
+            type(cond).__name__,
+            tuple(condition_key(arg, keys) for arg in cond.args),
+        )
+    elif is_list_value(cond):
+        return ("EQ", cond.field, value_key(cond.value))
+    elif isinstance(cond, ConditionFieldEqualsValueExpression):
+        return ("EQ", cond.field, type(cond.value).__name__, repr(cond.value))
+    elif isinstance(cond, ConditionValueExpression):
+        return ("VAL", type(cond.value).__name__, repr(cond.value))
+    else:
+        return repr(cond)
+    if keys is not None:
+        keys[id(cond)] = (cond, key)
+    return key
+
+
+def value_key(value: Union[SigmaString, SigmaNumber]) -> Hashable:
+    """
+    Key of a plain value, which is faster to compute than its repr. Equal keys mean equal values,
+    unlike the string representation, which is equal for an escaped * and a backslash before a
+    wildcard.
+    """
+    if isinstance(value, SigmaString):
+        return repr(value.s)
+    return f"{type(value).__name__}:{value!r}"
+
+
+def condition_digest(
+    cond: ConditionType, digests: Optional[Dict[int, Tuple[Any, bytes]]] = None
+) -> bytes:
+    """
+    Structural hash of a condition tree, which is equal for conditions with equal keys. Digests
+    of AND, OR and NOT subtrees are recorded in digests, if given, so the digests of all
+    subtrees of a tree are computed in linear time.
+    """
+    if digests is not None:
+        entry = digests.get(id(cond))
+        if entry is not None and entry[0] is cond:
+            return entry[1]
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(cond, ConditionItem):
+        h.update(type(cond).__name__.encode())
+        for arg in cond.args:
+            if isinstance(arg, ConditionItem):
+                h.update(b"\x00" + condition_digest(arg, digests))
+            else:
+                key = _leaf_key(arg)
+                h.update(b"\x01%d:" % len(key) + key)
+    else:
+        h.update(_leaf_key(cond))
+    digest = h.digest()
+    if digests is not None:
+        digests[id(cond)] = (cond, digest)
+    return digest
+
+
+def _leaf_key(cond: ConditionType) -> bytes:
+    if isinstance(cond, ConditionFieldEqualsValueExpression) and isinstance(
+        cond.value, SigmaString
+    ):  # Representation of the parts, which is faster than repr of the value
+        return f"{cond.field}\x00{cond.value.s!r}".encode()
+    return repr(condition_key(cond)).encode()
+
+
+def count_clauses(cond: ConditionType) -> int:
+    """
+    Number of field and value expressions in a condition tree. Values expanded by modifiers are
+    converted into one expression per value.
+    """
+    if isinstance(cond, ConditionItem):
+        return sum(count_clauses(arg) for arg in cond.args)
+    elif is_expansion(cond):
+        return len(cond.value.values)
+    return 1
+
+
+def is_expansion(cond: ConditionType) -> bool:
+    """Check if cond has a value expanded by a modifier like windash or base64offset."""
+    return isinstance(
+        cond, (ConditionFieldEqualsValueExpression, ConditionValueExpression)
+    ) and isinstance(cond.value, SigmaExpansion)
+
+
+def is_in_list(cond: ConditionType) -> bool:
+    """Check if cond is an OR of plain values of a single field, which is converted as in-list."""
+    return (
+        isinstance(cond, ConditionOR)
+        and all(is_list_value(arg) for arg in cond.args)
+        and len({arg.field for arg in cond.args}) == 1
+    )
+
+
+def is_list_value(cond: ConditionType) -> bool:
+    return isinstance(cond, ConditionFieldEqualsValueExpression) and isinstance(
+        cond.value, (SigmaString, SigmaNumber)
+    )
+
+
+def subsumes(general: SigmaString, specific: SigmaString) -> bool:
+    """
+    Check if every value matched by the pattern general is also matched by specific, as far as
+    this can be decided cheaply for the common plain, prefix*, *suffix and *infix* patterns.
+    Comparison is case-sensitive, because not all Quickwit tokenizers are case-insensitive.
+    """
+    parts = list(general.s)
+    literals = [part for part in parts if isinstance(part, str)]
+    if general == specific or len(literals) != 1 or not specific.s:
+        return False
+    literal = literals[0]
+    first, last = specific.s[0], specific.s[-1]
+    if parts == [literal, SpecialChars.WILDCARD_MULTI]:
+        return isinstance(first, str) and first.startswith(literal)
+    elif parts == [SpecialChars.WILDCARD_MULTI, literal]:
+        return isinstance(last, str) and last.endswith(literal)
+    elif parts == [SpecialChars.WILDCARD_MULTI, literal, SpecialChars.WILDCARD_MULTI]:
+        return any(isinstance(part, str) and literal in part for part in specific.s)
+    return False
+
+
+def _general_pattern(value: SigmaString) -> Optional[Tuple[str, str]]:
+    """Kind (prefix, suffix or infix) and literal of patterns that can subsume others."""
+    parts = value.s
+    if (
+        len(parts) == 2
+        and isinstance(parts[0], str)
+        and parts[1] == SpecialChars.WILDCARD_MULTI
+    ):
+        return "prefix", parts[0]
+    elif (
+        len(parts) == 2
+        and parts[0] == SpecialChars.WILDCARD_MULTI
+        and isinstance(parts[1], str)
+    ):
+        return "suffix", parts[1]
+    elif (
+        len(parts) == 3
+        and parts[0] == parts[2] == SpecialChars.WILDCARD_MULTI
+        and isinstance(parts[1], str)
+    ):
+        return "infix", parts[1]
+    return None
+
+
+def subsumption_pairs(
+    conds: List[ConditionFieldEqualsValueExpression],
+) -> Iterator[
+    Tuple[ConditionFieldEqualsValueExpression, ConditionFieldEqualsValueExpression]
+]:
+    """
+    Pairs (general, specific) of expressions of the same field, where subsumes(general.value,
+    specific.value). General patterns are indexed by their literals, so the literals of each
+    expression are looked up instead of comparing all pairs, which is quadratic for large lists.
+    """
+    index: Dict[
+        Tuple[str, str], Dict[str, List[ConditionFieldEqualsValueExpression]]
+    ] = {}
+    lengths: Dict[Tuple[str, str], Set[int]] = {}
+    fields: Set[str] = set()
+    for cond in conds:
+        pattern = _general_pattern(cond.value)
+        if pattern is not None and pattern[1]:
+            key = (cond.field, pattern[0])
+            index.setdefault(key, {}).setdefault(pattern[1], []).append(cond)
+            lengths.setdefault(key, set()).add(len(pattern[1]))
+            fields.add(cond.field)
+
+    def candidates(
+        kind: str, cond: ConditionFieldEqualsValueExpression, literals: Iterator[str]
+    ) -> Iterator[ConditionFieldEqualsValueExpression]:
+        literal_index = index.get((cond.field, kind))
+        if literal_index is None:
+            return
+        for literal in literals:
+            for general in literal_index.get(literal, ()):
+                if general is not cond and general.value != cond.value:
+                    yield general
+
+    for cond in conds:
+        parts = cond.value.s
+        if not parts or cond.field not in fields:
+            continue
+        first, last = parts[0], parts[-1]
+        found: Dict[int, ConditionFieldEqualsValueExpression] = {}
+        if isinstance(first, str):
+            for general in candidates(
+                "prefix",
+                cond,
+                (first[:n] for n in lengths.get((cond.field, "prefix"), ())),
+            ):
+                found[id(general)] = general
+        if isinstance(last, str):
+            for general in candidates(
+                "suffix",
+                cond,
+                (
+                    last[len(last) - n :]
+                    for n in lengths.get((cond.field, "suffix"), ())
+                    if n <= len(last)
+                ),
+            ):
+                found[id(general)] = general
+        for general in candidates(
+            "infix",
+            cond,
+            (
+                part[i : i + n]
+                for part in parts
+                if isinstance(part, str)
+                for n in lengths.get((cond.field, "infix"), ())
+                for i in range(len(part) - n + 1)
+            ),
+        ):
+            found[id(general)] = general
+        for general in found.values():
+            yield general, cond
+
+
+class QuickwitConditionOptimizer:
+    """
+    Simplification of condition trees before conversion:
+
+    * Removal of double negations and push-down of negations into AND/OR expressions where the
+      result can be merged into the parent expression.
+    * Flattening of nested AND/OR expressions of the same type and unwrapping of expressions with
+      a single argument.
+    * Removal of duplicate arguments and of arguments absorbed by others (a OR (a AND b) is a).
+    * Wildcard subsumption: x OR x* is x* and x AND x* is x.
+    * Merging of values of the same field from different nesting levels into one OR expression,
+      which is converted into a single in-list.
+
+    The condition tree passed to the optimizer is not modified.
+    """
+
+    def __init__(self, merge_in_lists: bool = True):
+        self.merge_in_lists = merge_in_lists
+        # Structural keys of the subtrees of the condition currently optimized
+        self._keys: Dict[int, Tuple[Any, Hashable]] = dict()
+
+    def optimize(self, cond: ConditionType) -> Tuple[ConditionType, int]:
+        """Return the optimized condition and the number of removed clauses."""
+        self._keys = dict()
+        try:
+            optimized = self._optimize(cond)
+        finally:
+            self._keys = dict()
+        if optimized is cond:
+            return cond, 0
+        return optimized, count_clauses(cond) - count_clauses(optimized)
+
+    def _optimize(self, cond: ConditionType) -> ConditionType:
+        if is_in_list(cond):
+            return self._optimize_in_list(cond)
+        elif isinstance(cond, ConditionNOT):
+            arg = self._optimize(cond.args[0])
+            if isinstance(arg, ConditionNOT):
+                return arg.args[0]
+            return self._new(ConditionNOT, [arg])
+        elif isinstance(cond, (ConditionAND, ConditionOR)):
+            return self._optimize_operator(type(cond), cond.args)
+        else:
+            return cond
+
+    def _optimize_in_list(self, cond: ConditionOR) -> ConditionType:
+        """
+        Fast path for flat OR lists of values of one field, which can't be flattened or merged
+        any further, so only duplicate and subsumed values are removed. Lists without them are
+        returned unchanged.
+        """
+        args = []
+        keys = set()
+        wildcards = False
+        for arg in cond.args:
+            key = value_key(arg.value)
+            if key not in keys:
+                keys.add(key)
+                args.append(arg)
+                wildcards = wildcards or (
+                    isinstance(arg.value, SigmaString)
+                    and SpecialChars.WILDCARD_MULTI in arg.value.s
+                )
+        if wildcards:  # Only values with wildcards can subsume others
+            subsumed = {
+                id(specific)
+                for _, specific in subsumption_pairs(
+                    [arg for arg in args if isinstance(arg.value, SigmaString)]
+                )
+            }
+            args = [arg for arg in args if id(arg) not in subsumed]
+        if len(args) == len(cond.args):
+            return cond
+        return args[0] if len(args) == 1 else self._new(ConditionOR, args)
+
+    def _negate(self, cond: ConditionType) -> ConditionType:
+        if isinstance(cond, ConditionNOT):
+            return cond.args[0]
+        return self._new(ConditionNOT, [cond])
+
+    def _optimize_operator(self, cls: type, args: List[ConditionType]) -> ConditionType:
+        dual = ConditionOR if cls is ConditionAND else ConditionAND
+
+        # Flattening and negation push-down: NOT (a OR b) in AND is NOT a AND NOT b
+        # Pending arguments are a stack in reverse order, so arguments are taken from its end.
+        flat: List[ConditionType] = []
+        pending = [self._optimize(arg) for arg in reversed(args)]
+        while pending:
+            arg = pending.pop()
+            if isinstance(arg, cls):
+                pending.extend(reversed(arg.args))
+            elif (
+                isinstance(arg, ConditionNOT)
+                and isinstance(arg.args[0], dual)
+                and not is_in_list(arg.args[0])
+            ):
+                pending.extend(
+                    self._negate(dual_arg) for dual_arg in reversed(arg.args[0].args)
+                )
+            else:
+                flat.append(arg)
+
+        # Deduplication
+        args = []
+        keys = set()
+        for arg in flat:
+            key = condition_key(arg, self._keys)
+            if key not in keys:
+                keys.add(key)
+                args.append(arg)
+
+        # Absorption: a OR (a AND b) is a, a AND (a OR b) is a
+        args = [
+            arg
+            for arg in args
+            if not (
+                isinstance(arg, dual)
+                and any(
+                    condition_key(dual_arg, self._keys) in keys for dual_arg in arg.args
+                )
+            )
+        ]
+
+        # Wildcard subsumption between values of the same field
+        strings = [
+            arg
+            for arg in args
+            if isinstance(arg, ConditionFieldEqualsValueExpression)
+            and isinstance(arg.value, SigmaString)
+        ]
+        subsumed = set()
+        for general, specific in subsumption_pairs(strings):
+            subsumed.add(id(specific if cls is ConditionOR else general))
+        args = [arg for arg in args if id(arg) not in subsumed]
+
+        # Merge values of the same field into one OR expression at the position of the first one
+        if cls is ConditionOR and self.merge_in_lists:
+            fields = dict()
+            for arg in args:
+                if is_list_value(arg):
+                    fields.setdefault(arg.field, []).append(arg)
+            if (
+                len(fields) > 1
+                or len(fields) == 1
+                and len(args) > len(next(iter(fields.values())))
+            ):
+                merged: List[Any] = []
+                for arg in args:
+                    if is_list_value(arg) and len(fields[arg.field]) > 1:
+                        if arg is fields[arg.field][0]:
+                            merged.append(self._new(ConditionOR, fields[arg.field]))
+                    else:
+                        merged.append(arg)
+                args = merged
+
+        if len(args) == 1:
+            return args[0]
+        return self._new(cls, args)
+
+    def _new(self, cls: type, args: List[ConditionType]) -> ConditionItem:
+        """
+        New condition with args. Conditions among the args are copied before they are linked to
+        the new parent, as they can be part of the input tree.
+        """
+        args = [
+            copy.copy(arg) if isinstance(arg, ConditionItem) else arg for arg in args
+        ]
+        cond = cls(args=args)
+        for arg in args:
+            if isinstance(arg, ConditionItem):
+                arg.parent = cond
+        return cond
@@ -0,0 +1,151 @@
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .events import Event, field_values, value_str
+from .query import QueryAnd, QueryClause, QueryNode, QueryNot, QueryOr, StringPattern
+
+# Disjunction of (field, literal) atoms, one of which must occur in an event matching a query
+LiteralRequirement = FrozenSet[Tuple[str, str]]
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton for finding all patterns occurring in a text with a single scan,
+    independent of the number of patterns.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.goto: List[Dict[str, int]] = [dict()]
+        self.fail: List[int] = [0]
+        self.out: List[Tuple[int, ...]] = [()]
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for c in pattern:
+                next_state = self.goto[state].get(c)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][c] = next_state
+                    self.goto.append(dict())
+                    self.fail.append(0)
+                    self.out.append(())
+                state = next_state
+            self.out[state] += (pattern_id,)
+
+        # Breadth-first computation of failure links, outputs are merged along them
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and c not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(c, 0)
+                self.out[next_state] += self.out[self.fail[next_state]]
+
+    def search(self, text: str) -> Set[int]:
+        """IDs of all patterns occurring in text."""
+        goto, fail, out = self.goto, self.fail, self.out
+        found: Set[int] = set()
+        state = 0
+        for c in text:
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+def pattern_literal(pattern: StringPattern) -> Optional[str]:
+    """Longest literal part of a pattern, which must occur in every value matching it."""
+    literals = [part for part in pattern if isinstance(part, str) and part]
+    if not literals:
+        return None
+    return max(literals, key=len).lower()
+
+
+def required_literals(node: QueryNode) -> Optional[LiteralRequirement]:
+    """
+    Literals of which at least one occurs in every event matching the query, or None if there
+    is no such set, e.g. for negations, regular expressions or ranges. Of the requirements of
+    AND arguments, the one with the longest literals is chosen as most selective.
+    """
+    if isinstance(node, QueryAnd):
+        requirements = [
+            requirement
+            for arg in node.args
+            if (requirement := required_literals(arg)) is not None
+        ]
+        if not requirements:
+            return None
+        return max(
+            requirements,
+            key=lambda requirement: (
+                min(len(literal) for _, literal in requirement),
+                -len(requirement),
+            ),
+        )
+    elif isinstance(node, QueryOr):
+        literals: Set[Tuple[str, str]] = set()
+        for arg in node.args:
+            arg_requirement = required_literals(arg)
+            if arg_requirement is None:
+                return None
+            literals.update(arg_requirement)
+        return frozenset(literals)
+    elif isinstance(node, QueryNot):
+        return None
+    return _clause_literals(node)
+
+
+def _clause_literals(clause: QueryClause) -> Optional[LiteralRequirement]:
+    if clause.kind in ("phrase", "term"):
+        patterns = [clause.value]
+    elif clause.kind == "in":
+        patterns = list(clause.value)
+    else:
+        return None
+    requirement = set()
+    for pattern in patterns:
+        literal = pattern_literal(pattern)
+        if literal is None:
+            return None
+        requirement.add((clause.field, literal))
+    return frozenset(requirement)
+
+
+class QuickwitPrefilter:
+    """
+    Multi-rule literal prefilter. The required literals of all rules are compiled into one
+    Aho-Corasick automaton per field, so each field of an event is scanned once to find the
+    rules that can match it, instead of evaluating every rule against every event. Rules
+    without required literals are always candidates. Matching is case-insensitive, which is a
+    superset of the case-sensitive term matches.
+    """
+
+    def __init__(self, rules: Sequence[Iterable[QueryNode]]):
+        self.unconditional: List[int] = []
+        field_literals: Dict[str, Dict[str, List[int]]] = dict()
+        for index, nodes in enumerate(rules):
+            requirement = required_literals(QueryOr(tuple(nodes)))
+            if requirement is None:
+                self.unconditional.append(index)
+                continue
+            for field_name, literal in requirement:
+                field_literals.setdefault(field_name, dict()).setdefault(
+                    literal, []
+                ).append(index)
+        self.automata: Dict[str, Tuple[AhoCorasick, List[List[int]]]] = {
+            field_name: (AhoCorasick(list(literals)), list(literals.values()))
+            for field_name, literals in field_literals.items()
+        }
+
+    def candidates(self, event: Event) -> Set[int]:
+        """Indexes of rules which can match the event."""
+        candidates = set(self.unconditional)
+        for field_name, (automaton, pattern_rules) in self.automata.items():
+            for value in field_values(event, field_name):
+                for pattern_id in automaton.search(value_str(value).lower()):
+                    candidates.update(pattern_rules[pattern_id])
+        return candidates
@@ -0,0 +1,261 @@
+from dataclasses import dataclass, field
+import re
+from typing import List, Optional, Tuple, Union
+
+from sigma.exceptions import SigmaValueError
+from sigma.types import SpecialChars
+
+# Parsed string values are tuples of plain strings and SpecialChars.WILDCARD_MULTI.
+StringPattern = Tuple[Union[str, SpecialChars], ...]
+
+
+@dataclass(frozen=True)
+class QueryClause:
+    """
+    Single field clause of a Quickwit query. The kind determines the type of value:
+
+    * phrase, term: StringPattern of a quoted phrase or an unquoted term (prefix if ending in *)
+    * regex: regular expression string
+    * in: tuple of StringPatterns
+    * range: (lower, upper, lower inclusive, upper inclusive), unbounded sides are None
+    * compare: (operator, value)
+    * exists: None
+    """
+
+    field: str
+    kind: str
+    value: object = None
+
+
+@dataclass(frozen=True)
+class QueryNot:
+    arg: "QueryNode"
+
+
+@dataclass(frozen=True)
+class QueryAnd:
+    args: Tuple["QueryNode", ...]
+
+
+@dataclass(frozen=True)
+class QueryOr:
+    args: Tuple["QueryNode", ...]
+
+
+QueryNode = Union[QueryClause, QueryNot, QueryAnd, QueryOr]
+
+
+def pattern_str(pattern: StringPattern) -> str:
+    """Render a StringPattern with * as wildcard, e.g. for diagnostics."""
+    return "".join(
+        "*" if part == SpecialChars.WILDCARD_MULTI else part for part in pattern
+    )
+
+
+# Tokens matched at the current position of the parser, without copying the rest of the query
+_EXISTS = re.compile(r"\*(?=$|[\s)])")
+_IN_LIST = re.compile(r"IN \[")
+_COMPARE = re.compile(r"[<>]=?")
+
+
+def _append(parts: List[Union[str, SpecialChars]], c: Union[str, SpecialChars]) -> None:
+    if isinstance(c, str) and parts and isinstance(parts[-1], str):
+        parts[-1] += c
+    else:
+        parts.append(c)
+
+
+@dataclass
+class QueryParser:
+    """
+    Recursive descent parser of the Quickwit query language subset generated by the backend:
+    field:"phrase", field:term, field:prefix*, field:/regex/, field:IN [...], field:[a TO b],
+    field:>value, field:* and AND, OR, NOT with parentheses.
+    """
+
+    query: str
+    pos: int = field(default=0, init=False)
+
+    def parse(self) -> QueryNode:
+        node = self._or()
+        self._skip_ws()
+        if self.pos != len(self.query):
+            self._error("unexpected input")
+        return node
+
+    def _error(self, message: str) -> None:
+        raise SigmaValueError(
+            f"Can't parse Quickwit query at position {self.pos}: {message}"
+        )
+
+    def _skip_ws(self) -> None:
+        while self.pos < len(self.query) and self.query[self.pos].isspace():
+            self.pos += 1
+
+    def _peek(self) -> str:
+        return self.query[self.pos] if self.pos < len(self.query) else ""
+
+    def _keyword(self, keyword: str) -> bool:
+        self._skip_ws()
+        end = self.pos + len(keyword)
+        if self.query.startswith(keyword, self.pos) and (
+            end == len(self.query)
+            or self.query[end].isspace()
+            or self.query[end] == "("
+        ):
+            self.pos = end
+            return True
+        return False
+
+    def _or(self) -> QueryNode:
+        args = [self._and()]
+        while self._keyword("OR"):
+            args.append(self._and())
+        return args[0] if len(args) == 1 else QueryOr(tuple(args))
+
+    def _and(self) -> QueryNode:
+        args = [self._not()]
+        while self._keyword("AND"):
+            args.append(self._not())
+        return args[0] if len(args) == 1 else QueryAnd(tuple(args))
+
+    def _not(self) -> QueryNode:
+        if self._keyword("NOT"):
+            return QueryNot(self._not())
+        return self._primary()
+
+    def _primary(self) -> QueryNode:
+        self._skip_ws()
+        if self._peek() == "(":
+            self.pos += 1
+            node = self._or()
+            self._skip_ws()
+            if self._peek() != ")":
+                self._error("expected )")
+            self.pos += 1
+            return node
+        return self._clause()
+
+    def _clause(self) -> QueryClause:
+        if self._peek() == '"':
+            field_name = pattern_str(self._quoted('"'))
+        else:
+            field_name = pattern_str(self._bare(":"))
+        if not field_name or self._peek() != ":":
+            self._error("expected field:value")
+        self.pos += 1
+        c = self._peek()
+        if match := _EXISTS.match(self.query, self.pos):
+            self.pos = match.end()
+            return QueryClause(field_name, "exists")
+        elif c == '"':
+            return QueryClause(field_name, "phrase", self._quoted('"'))
+        elif c == "/":
+            return QueryClause(field_name, "regex", self._regex())
+        elif c in "[{":
+            return QueryClause(field_name, "range", self._range())
+        elif match := _IN_LIST.match(self.query, self.pos):
+            self.pos = match.end()
+            return QueryClause(field_name, "in", self._list())
+        elif match := _COMPARE.match(self.query, self.pos):
+            self.pos = match.end()
+            return QueryClause(
+                field_name, "compare", (match.group(), pattern_str(self._bare()))
+            )
+        return QueryClause(field_name, "term", self._bare())
+
+    def _quoted(self, quote: str) -> StringPattern:
+        """Quoted string starting at the current position, unescaped * are wildcards."""
+        self.pos += 1
+        parts: List[Union[str, SpecialChars]] = []
+        while True:
+            c = self._peek()
+            if c == "":
+                self._error("unterminated quoted string")
+            self.pos += 1
+            if c == quote:
+                return tuple(parts)
+            elif c == "\\":
+                _append(parts, self._peek())
+                self.pos += 1
+            elif c == "*":
+                _append(parts, SpecialChars.WILDCARD_MULTI)
+            else:
+                _append(parts, c)
+
+    def _bare(self, stop: str = "") -> StringPattern:
+        """Unquoted token up to whitespace, a closing bracket or one of the stop characters."""
+        parts: List[Union[str, SpecialChars]] = []
+        while True:
+            c = self._peek()
+            if c == "" or c.isspace() or c in ")]}" or c in stop:
+                return tuple(parts)
+            self.pos += 1
+            if c == "\\":
+                _append(parts, self._peek())
+                self.pos += 1
+            elif c == "*":
+                _append(parts, SpecialChars.WILDCARD_MULTI)
+            else:
+                _append(parts, c)
+
+    def _regex(self) -> str:
+        self.pos += 1
+        chars = []
+        while True:
+            c = self._peek()
+            if c == "":
+                self._error("unterminated regular expression")
+            self.pos += 1
+            if c == "/":
+                return "".join(chars)
+            elif c == "\\" and self._peek() == "/":
+                chars.append("/")
+                self.pos += 1
+            elif c == "\\":
+                chars.append(c + self._peek())
+                self.pos += 1
+            else:
+                chars.append(c)
+
+    def _range(self) -> Tuple[Optional[str], Optional[str], bool, bool]:
+        lower_inclusive = self._peek() == "["
+        self.pos += 1
+        self._skip_ws()
+        lower = pattern_str(self._bare())
+        if not self._keyword("TO"):
+            self._error("expected TO in range")
+        self._skip_ws()
+        upper = pattern_str(self._bare())
+        c = self._peek()
+        if c not in "]}" or c == "":
+            self._error("unterminated range")
+        self.pos += 1
+        return (
+            None if lower == "*" else lower,
+            None if upper == "*" else upper,
+            lower_inclusive,
+            c == "]",
+        )
+
+    def _list(self) -> Tuple[StringPattern, ...]:
+        values = []
+        while True:
+            self._skip_ws()
+            c = self._peek()
+            if c == "":
+                self._error("unterminated list")
+            elif c == "]":
+                self.pos += 1
+                return tuple(values)
+            elif c == '"':
+                values.append(self._quoted('"'))
+            elif c in ")}":
+                self._error("unexpected character in list")
+            else:
+                values.append(self._bare())
+
+
+def parse_query(query: str) -> QueryNode:
+    """Parse a query generated by the Quickwit backend into a syntax tree."""
+    return QueryParser(query).parse()
@@ -1,5 +1,3 @@
-import ipaddress
-
 from sigma.conditions import (
     ConditionItem,
     ConditionAND,
@@ -7,12 +5,76 @@ from sigma.conditions import (
     ConditionNOT,
     ConditionFieldEqualsValueExpression,
 )
+from sigma.collection import SigmaCollection
 from sigma.conversion.base import TextQueryBackend
-from sigma.types import SigmaCompareExpression, SigmaString
+from sigma.types import (
+    SigmaCIDRExpression,
+    SigmaCompareExpression,
+    SigmaRegularExpression,
+    SigmaString,
+    SpecialChars,
+)
 from sigma.conversion.state import ConversionState
+from sigma.correlations import SigmaCorrelationRule, SigmaRuleReference
+from sigma.exceptions import (
+    SigmaBackendError,
+    SigmaConfigurationError,
+    SigmaFeatureNotSupportedByBackendError,
+    SigmaValueError,
+)
+from sigma.processing.pipeline import ProcessingPipeline
+from sigma.pipelines.quickwit.state import index_state_key
 from sigma.rule import SigmaRule
-from typing import ClassVar, Dict, Union, List, Any, Pattern, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    Union,
+    List,
+    Any,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+)
+from contextlib import contextmanager
+import hashlib
+import io
+import json
 import re
+import time
+import warnings
+
+from .cache import ConversionCache, SubtreeMemo
+from .cidr import IPNetwork, merge_networks
+from .correlation import correlation_aggs, correlation_condition, min_doc_count
+from .optimizer import QuickwitConditionOptimizer, condition_digest, count_clauses
+from .regex import translate_regex
+from .wildcard import classify_wildcard, field_map_option, wildcard_regex
+from .split import QuickwitQuerySplitter
+
+# Imported when used, as they aren't needed by most conversions or only once a backend is created,
+# which keeps the plugin discovery of sigma-cli fast
+if TYPE_CHECKING:
+    from .batch import BatchConversionResult
+    from .cost import QueryCost
+    from .instrumentation import ConversionInstrumentation
+    from .mapping import QuickwitDocMapping, QuickwitFieldMapping
+
+
+class QuickwitQueryCostWarning(UserWarning):
+    """Estimated cost of a generated query exceeds the configured budget."""
+
+
+class QuickwitRegexWarning(UserWarning):
+    """Regular expression is expensive to evaluate, e.g. unanchored or prone to backtracking."""
+
+
+class QuickwitQueryParts(list):
+    """Parts of a query split to fit the split budget. The query is the OR of its parts."""
 
 
 class QuickwitBackend(TextQueryBackend):
@@ -21,6 +83,9 @@ class QuickwitBackend(TextQueryBackend):
     name: ClassVar[str] = "Quickwit backend"
     formats: Dict[str, str] = {
         "default": "Plain Quickwit queries",
+        "search_request": "Quickwit search API request bodies with time range and sorting",
+        "fused": "Queries of multiple rules per log source combined into few OR queries",
+        "ndjson": "One JSON object per query and line, which can be streamed rule by rule",
     }
     requires_pipeline: bool = False
 
@@ -41,7 +106,7 @@ class QuickwitBackend(TextQueryBackend):
     escape_char: ClassVar[str] = "\\"
     wildcard_multi: ClassVar[str] = "*"
     wildcard_single: ClassVar[str] = "*"
-    add_escaped: ClassVar[str] = "\\"
+    add_escaped: ClassVar[str] = '\\"'
     filter_chars: ClassVar[str] = ""
 
     re_expression: ClassVar[str] = "{field}:/{regex}/"
@@ -70,6 +135,401 @@ class QuickwitBackend(TextQueryBackend):
     # Quoting
     field_quote: ClassVar[str] = '"'
     field_quote_pattern: ClassVar[Pattern] = re.compile("^\\w+$")
+    # Characters escaped in unquoted term and prefix queries
+    term_escaped: ClassVar[str] = '\\+-&|!(){}[]^"~*?:/ '
+    # Characters escaped in the unquoted values of in-lists, which end or quote a value
+    in_list_escaped: ClassVar[str] = "\\\"'(){}[] "
+
+    # Search request output format
+    timespan_seconds: ClassVar[Dict[str, int]] = {
+        "s": 1,
+        "m": 60,
+        "h": 3600,
+        "d": 86400,
+        "w": 604800,
+    }
+    default_time_window: ClassVar[str] = "1h"
+    default_max_hits: ClassVar[int] = 100
+    default_timestamp_field: ClassVar[str] = "timestamp"
+
+    # Correlation rules are converted into search requests with aggregations
+    correlation_methods: ClassVar[Dict[str, str]] = {
+        "default": "Search requests with aggregations of matching events evaluated by Quickwit",
+    }
+    default_correlation_bucket_size: ClassVar[int] = 1000
+
+    # Fused output format
+    default_fused_max_clauses: ClassVar[int] = 1024
+    default_fused_max_bytes: ClassVar[int] = 64 * 1024
+
+    def __init__(
+        self,
+        processing_pipeline: Optional[ProcessingPipeline] = None,
+        collect_errors: bool = False,
+        **backend_options: Any,
+    ):
+        super().__init__(processing_pipeline, collect_errors, **backend_options)
+        cache_dir = backend_options.get("cache_dir")
+        self.cache: Optional[ConversionCache] = (
+            ConversionCache(
+                cache_dir,
+                int(backend_options.get("cache_max_bytes", 256 * 1024 * 1024)),
+            )
+            if cache_dir
+            else None
+        )
+        self.canonical: bool = self.option_enabled("canonical")
+        # Current time of the running conversion, shared by the time ranges of all its queries
+        self._now: Optional[float] = None
+        memo_max_entries = int(backend_options.get("memo_max_entries", 10000))
+        self.memo: Optional[SubtreeMemo] = (
+            SubtreeMemo(
+                memo_max_entries,
+                int(backend_options.get("memo_max_bytes", 64 * 1024 * 1024)),
+            )
+            if memo_max_entries > 0
+            else None
+        )
+        # Digests of the subtrees of the condition currently converted and of its state
+        self._digests: Dict[int, Tuple[Any, bytes]] = dict()
+        self._state_digest = b""
+        self.optimizer: Optional[QuickwitConditionOptimizer] = (
+            QuickwitConditionOptimizer(self.convert_or_as_in)
+            if self.option_enabled("optimize", True)
+            else None
+        )
+        # Number of clauses removed by the optimizer per rule
+        self.optimizer_report: Dict[str, int] = dict()
+        self._clauses_removed = 0
+        from .cost import QueryCostEstimator
+
+        self.cost_estimator = QueryCostEstimator()
+        self.cost_budget: Optional[float] = (
+            float(backend_options["cost_budget"])
+            if "cost_budget" in backend_options
+            else None
+        )
+        self.cost_budget_action: str = backend_options.get("cost_budget_action", "warn")
+        if self.cost_budget_action not in ("warn", "reject"):
+            raise SigmaConfigurationError(
+                f"Invalid cost_budget_action '{self.cost_budget_action}', must be warn or reject"
+            )
+        # Queries are only estimated if asked for, as estimation parses the rendered query
+        self.emit_cost = self.option_enabled("query_cost")
+        self._last_cost: Tuple[Optional[str], Optional["QueryCost"]] = (None, None)
+        # Number of clauses of the root queries of the current rule, counted before rendering
+        self._query_clauses: Dict[str, int] = dict()
+        self.instrumentation: Optional["ConversionInstrumentation"] = None
+        if self.option_enabled("instrument") or backend_options.get(
+            "instrument_report"
+        ):
+            from .instrumentation import ConversionInstrumentation
+
+            self.instrumentation = ConversionInstrumentation()
+        # Phase timings and queries of the rule currently converted with instrumentation
+        self._timings: Optional[Dict[str, float]] = None
+        self._phase: Optional[Tuple[str, float]] = None
+        self._rule_queries: List[str] = list()
+        self.regex_guard: str = backend_options.get("regex_guard", "warn")
+        if self.regex_guard not in ("warn", "reject", "off"):
+            raise SigmaConfigurationError(
+                f"Invalid regex_guard '{self.regex_guard}', must be warn, reject or off"
+            )
+        split_max_clauses = backend_options.get("split_max_clauses")
+        split_max_bytes = backend_options.get("split_max_bytes")
+        self.splitter: Optional[QuickwitQuerySplitter] = (
+            QuickwitQuerySplitter(
+                int(split_max_clauses) if split_max_clauses is not None else None,
+                int(split_max_bytes) if split_max_bytes is not None else None,
+            )
+            if split_max_clauses is not None or split_max_bytes is not None
+            else None
+        )
+        self._split_enabled = False
+        self._condition_depth = 0
+        # Number and count of the query part currently finalized, if the query was split
+        self._query_part: Optional[Tuple[int, int]] = None
+        index_config = backend_options.get("index_config")
+        self.doc_mapping: Optional["QuickwitDocMapping"] = None
+        if index_config:
+            from .mapping import QuickwitDocMapping
+
+            self.doc_mapping = QuickwitDocMapping.from_file(index_config)
+        self.wildcard_rewrite: bool = self.option_enabled("wildcard_rewrite")
+        # Companion fields with the reversed value (raw tokenizer) or n-grams of the value
+        self.reversed_fields = field_map_option(backend_options.get("reversed_fields"))
+        self.ngram_fields = field_map_option(backend_options.get("ngram_fields"))
+        # N-gram sizes of companion fields with ngram tokenizers, which are read from the index
+        # config together with the lowercasing ones queried with lowercased literals
+        self.ngram_sizes: Dict[str, int] = dict()
+        self.ngram_lowercase: Set[str] = set()
+        if self.doc_mapping is not None:
+            for companion in self.ngram_fields.values():
+                size = self.doc_mapping.ngram_size(companion)
+                if size is not None:
+                    self.ngram_sizes[companion] = size
+                if self.doc_mapping.is_lowercase_ngram(companion):
+                    self.ngram_lowercase.add(companion)
+        # Reversed companion fields that lowercase the value, queried with lowercased literals
+        self.reversed_lowercase: Set[str] = set()
+        if self.doc_mapping is not None:
+            for companion in self.reversed_fields.values():
+                field_mapping = self.doc_mapping[companion]
+                if self.doc_mapping.is_lowercase_raw(companion):
+                    self.reversed_lowercase.add(companion)
+                elif field_mapping is not None and not field_mapping.is_raw:
+                    raise SigmaConfigurationError(
+                        f"Reversed companion field '{companion}' must use the raw tokenizer "
+                        "or a lowercasing raw tokenizer"
+                    )
+
+    def option_enabled(self, name: str, default: bool = False) -> bool:
+        """Boolean backend option, which is passed as string from the command line."""
+        value = self.backend_options.get(name, default)
+        if isinstance(value, str):
+            return value.lower() in ("true", "yes", "on", "1")
+        return bool(value)
+
+    def convert_rule(
+        self,
+        rule: SigmaRule,
+        output_format: Optional[str] = None,
+        callback: Optional[Callable] = None,
+    ) -> List[Any]:
+        """Convert a single rule, answering from the conversion cache if one is configured."""
+        if self.cache is None or callback is not None or rule._backreferences:
+            return self._convert_rule(rule, output_format, callback)
+
+        if getattr(self, "last_processing_pipeline", None) is None:
+            self.init_processing_pipeline(output_format)
+        key = self.cache.key(
+            rule,
+            self.last_processing_pipeline,
+            {
+                name: value
+                for name, value in self.backend_options.items()
+                if not name.startswith("cache_")
+            },
+            output_format or self.default_format,
+            self.doc_mapping,
+        )
+        queries = self.cache.get(key)
+        if queries is None:
+            queries = self._convert_rule(rule, output_format, callback)
+            if not (self.collect_errors and self.errors and self.errors[-1][0] is rule):
+                self.cache.put(key, self.with_time_range(queries, (None, None)))
+            return queries
+        return self.with_time_range(queries, self.search_time_range())
+
+    def with_time_range(
+        self, queries: List[Any], time_range: Tuple[Optional[int], Optional[int]]
+    ) -> List[Any]:
+        """
+        Replace the time range of the search requests among finalized queries. The conversion
+        cache stores them without time range, which is applied again whenever they are read.
+        """
+        return [
+            {
+                **query,
+                "request": {
+                    **query["request"],
+                    "start_timestamp": time_range[0],
+                    "end_timestamp": time_range[1],
+                },
+            }
+            if isinstance(query, dict) and "start_timestamp" in query.get("request", {})
+            else query
+            for query in queries
+        ]
+
+    @contextmanager
+    def conversion_time(self) -> Iterator[None]:
+        """Fix the current time while converting, so all queries share the same time range."""
+        if self._now is not None:
+            yield
+            return
+        self._now = time.time()
+        try:
+            yield
+        finally:
+            self._now = None
+
+    def convert(
+        self,
+        rule_collection: SigmaCollection,
+        output_format: Optional[str] = None,
+        correlation_method: Optional[str] = None,
+        callback: Optional[Callable] = None,
+    ) -> Any:
+        """Convert a rule collection with a single time range for all search requests."""
+        with self.conversion_time():
+            return super().convert(
+                rule_collection, output_format, correlation_method, callback
+            )
+
+    def _convert_rule(
+        self,
+        rule: SigmaRule,
+        output_format: Optional[str],
+        callback: Optional[Callable],
+    ) -> List[Any]:
+        """
+        Convert a rule and record the number of clauses removed by the optimizer. Queries split into
+        parts are flattened into the query list. Rules referenced by correlation rules aren't split,
+        as correlation conversion requires one query per condition.
+        """
+        self._clauses_removed = 0
+        self._query_clauses = dict()
+        self._split_enabled = self.splitter is not None and not rule._backreferences
+        if self.instrumentation is not None:
+            from .instrumentation import PHASES
+
+            self._timings = {phase: 0.0 for phase in PHASES}
+            self._phase = ("pipeline", time.perf_counter())
+            self._rule_queries = list()
+        error: Optional[Exception] = None
+        try:
+            queries = [
+                part
+                for query in super().convert_rule(rule, output_format, callback)
+                for part in (
+                    query if isinstance(query, QuickwitQueryParts) else [query]
+                )
+            ]
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.instrumentation is not None:
+                self.record_metrics(rule, error)
+        if self.optimizer is not None:
+            self.optimizer_report[
+                str(rule.id) if rule.id is not None else rule.title
+            ] = self._clauses_removed
+        return queries
+
+    def worker_report(self) -> Dict[str, Any]:
+        """
+        Instrumentation records, optimizer report and cache and memo counters collected since
+        the last report. Worker processes of batch conversions send them to the parent process.
+        """
+        report: Dict[str, Any] = {
+            "metrics": list(self.instrumentation.records)
+            if self.instrumentation is not None
+            else [],
+            "optimizer_report": self.optimizer_report,
+        }
+        self.optimizer_report = dict()
+        if self.instrumentation is not None:
+            self.instrumentation.clear()
+        for name, counters in (("cache", self.cache), ("memo", self.memo)):
+            if counters is not None:
+                report[name] = {
+                    counter: getattr(counters, counter)
+                    for counter in ("hits", "misses", "evictions")
+                }
+                counters.hits = counters.misses = counters.evictions = 0
+        return report
+
+    def merge_worker_report(self, report: Dict[str, Any]) -> None:
+        """Add a report of a worker process to the metrics of this backend."""
+        if self.instrumentation is not None:
+            for metrics in report["metrics"]:
+                self.instrumentation.record(metrics)
+        self.optimizer_report.update(report["optimizer_report"])
+        for name, counters in (("cache", self.cache), ("memo", self.memo)):
+            if counters is not None and name in report:
+                for counter, value in report[name].items():
+                    setattr(counters, counter, getattr(counters, counter) + value)
+
+    def enter_phase(self, phase: Optional[str]) -> None:
+        """Switch the timed conversion phase of the instrumented rule, None stops the timing."""
+        if self._timings is None:
+            return
+        now = time.perf_counter()
+        if self._phase is not None:
+            self._timings[self._phase[0]] += now - self._phase[1]
+        self._phase = (phase, now) if phase is not None else None
+
+    def record_metrics(self, rule: SigmaRule, error: Optional[Exception]) -> None:
+        """
+        Record phase timings and the accumulated structural metrics of the queries of a rule.
+        Errors collected instead of raised are recorded as well.
+        """
+        from .instrumentation import RuleMetrics
+
+        self.enter_phase(None)
+        if error is None and self.collect_errors and self.errors:
+            if self.errors[-1][0] is rule:
+                error = self.errors[-1][1]
+        metrics = RuleMetrics(
+            str(rule.id) if rule.id is not None else rule.title,
+            rule.title,
+            self._timings,
+            error=str(error) if error is not None else None,
+        )
+        self._timings = None
+        for query in self._rule_queries:
+            metrics.queries += 1
+            cost = self.query_cost(query)
+            if cost is not None:
+                metrics.cost.add(cost)
+        self.instrumentation.record(metrics)
+
+    def convert_condition(self, cond: Any, state: ConversionState) -> Any:
+        """
+        Optimize the condition tree of a rule before it is converted and split the query into
+        parts if it exceeds the split budget.
+        """
+        if cond is None or self._condition_depth > 0:
+            return self._convert_nested_condition(cond, state)
+        self.enter_phase("condition")
+        if self.memo is not None:
+            self._digests = dict()
+            self._state_digest = hashlib.blake2b(
+                repr(sorted(state.processing_state.items())).encode("utf-8"),
+                digest_size=16,
+            ).digest()
+        if self.optimizer is not None:
+            cond, removed = self.optimizer.optimize(cond)
+            self._clauses_removed += removed
+        if self._split_enabled:
+            parts = self.splitter.split(
+                cond, lambda part: self._convert_root_condition(part, state)
+            )
+            return parts[0] if len(parts) == 1 else QuickwitQueryParts(parts)
+        return self._convert_root_condition(cond, state)
+
+    def _convert_root_condition(self, cond: Any, state: ConversionState) -> Any:
+        """Convert a root condition and keep the number of clauses of the query."""
+        query = self._convert_nested_condition(cond, state)
+        if isinstance(query, str):
+            self._query_clauses[query] = count_clauses(cond)
+        return query
+
+    def _convert_nested_condition(self, cond: Any, state: ConversionState) -> Any:
+        """
+        Convert a condition, tracking the nesting depth to recognize the root condition. Converted
+        AND, OR and NOT expressions are memoized, so subtrees shared by many rules are converted
+        once.
+        """
+        if self.memo is None or not isinstance(cond, ConditionItem):
+            return self._convert_subtree(cond, state)
+        key = (condition_digest(cond, self._digests), self._state_digest)
+        query = self.memo.get(key)
+        if query is None:
+            deferred = len(state.deferred)
+            query = self._convert_subtree(cond, state)
+            if isinstance(query, str) and len(state.deferred) == deferred:
+                self.memo.put(key, query)
+        return query
+
+    def _convert_subtree(self, cond: Any, state: ConversionState) -> Any:
+        self._condition_depth += 1
+        try:
+            return super().convert_condition(cond, state)
+        finally:
+            self._condition_depth -= 1
 
     def convert_condition_field_eq_val_str(
         self, cond: ConditionFieldEqualsValueExpression, state: ConversionState
@@ -78,36 +538,213 @@ class QuickwitBackend(TextQueryBackend):
         field = self.escape_and_quote_field(cond.field)
         if cond.value == "*":  # Handle exists expression
             return f"{field}:*"
+        elif (term := self.convert_condition_field_eq_val_term(cond)) is not None:
+            return term
+        elif self.wildcard_rewrite and (
+            (rewritten := self.convert_condition_field_eq_val_wildcard(cond))
+            is not None
+        ):
+            return rewritten
         elif cond.value.startswith("*") or cond.value.endswith("*"):  # Handle wildcards
             return f'{field}:"{self.convert_value_str(cond.value, state)}"'
         else:
             return f'{field}:"{self.convert_value_str(cond.value, state)}"'
 
+    def convert_condition_field_eq_val_term(
+        self, cond: ConditionFieldEqualsValueExpression
+    ) -> Optional[str]:
+        """
+        Raw, IP and bool fields hold the whole value as single term, which allows cheaper term and
+        prefix queries instead of phrase queries. Returns None if the field mapping doesn't allow
+        a term query for the value.
+        """
+        field_mapping = self.field_mapping(cond.field)
+        if field_mapping is None or not (
+            field_mapping.is_raw or field_mapping.type in ("ip", "bool")
+        ):
+            return None
+        field = self.escape_and_quote_field(cond.field)
+        value = cond.value
+        if not value.contains_special():
+            if field_mapping.type == "ip" and ":" in str(value):  # IPv6 address
+                return f'{field}:"{value}"'
+            return f"{field}:{self.convert_value_term(value)}"
+        elif (
+            field_mapping.is_raw
+            and value.endswith(SpecialChars.WILDCARD_MULTI)
+            and not value[:-1].contains_special()
+        ):
+            return f"{field}:{self.convert_value_term(value)}"
+        return None
+
+    def convert_condition_field_eq_val_wildcard(
+        self, cond: ConditionFieldEqualsValueExpression
+    ) -> Optional[str]:
+        """
+        Rewrite of wildcard patterns into cheaper queries than phrase or regex scans: suffix
+        matches become prefix queries on a companion field with the reversed value, contains
+        matches term queries on a companion field with an n-gram tokenizer, which Quickwit
+        intersects, if the literal is at least as long as the n-grams. Other wildcard patterns
+        on raw fields fall back to regular expressions. Returns None if no rewrite applies.
+
+        Queries on raw or n-gram companion fields are case-sensitive, so matches are only
+        rewritten if the companion lowercases the value, or if the field itself is raw and its
+        matches are case-sensitive anyway.
+        """
+        kind, literal = classify_wildcard(cond.value)
+        if kind == "suffix" and cond.field in self.reversed_fields:
+            companion = self.reversed_fields[cond.field]
+            field_mapping = self.field_mapping(cond.field)
+            if companion in self.reversed_lowercase or (
+                field_mapping is not None and field_mapping.is_raw
+            ):
+                if companion in self.reversed_lowercase:
+                    literal = literal.lower()
+                return (
+                    self.escape_and_quote_field(companion)
+                    + f":{self.escape_term(literal[::-1])}*"
+                )
+        companion = self.ngram_fields.get(cond.field, "")
+        if (
+            kind == "contains"
+            and companion in self.ngram_sizes
+            and len(literal) >= self.ngram_sizes[companion]
+        ):
+            field_mapping = self.field_mapping(cond.field)
+            if companion in self.ngram_lowercase or (
+                field_mapping is not None and field_mapping.is_raw
+            ):
+                if companion in self.ngram_lowercase:
+                    literal = literal.lower()
+                return (
+                    self.escape_and_quote_field(companion)
+                    + f":{self.escape_term(literal)}"
+                )
+        field_mapping = self.field_mapping(cond.field)
+        if kind != "exact" and field_mapping is not None and field_mapping.is_raw:
+            regex = wildcard_regex(cond.value).replace("/", "\\/")
+            return f"{self.escape_and_quote_field(cond.field)}:/{regex}/"
+        return None
+
+    def decide_convert_condition_as_in_expression(
+        self, cond: Union[ConditionOR, ConditionAND], state: ConversionState
+    ) -> bool:
+        """Values rewritten into cheaper queries are converted separately instead of in-lists."""
+        if not super().decide_convert_condition_as_in_expression(cond, state):
+            return False
+        return not self.wildcard_rewrite or all(
+            not isinstance(arg.value, SigmaString)
+            or not arg.value.contains_special()
+            or self.convert_condition_field_eq_val_wildcard(arg) is None
+            for arg in cond.args
+        )
+
     def convert_condition_or(
         self, cond: ConditionOR, state: ConversionState
     ) -> Union[str, Any]:
         """Conversion of OR conditions"""
         return f" {self.or_token} ".join(
-            self.group_expression.format(expr=self.convert_condition(arg, state))
-            if isinstance(arg, ConditionAND)
-            else self.convert_condition(arg, state)
-            for arg in cond.args
+            self.canonicalize(list(self.convert_or_args(cond, state)))
         )
 
+    def convert_or_args(
+        self, cond: ConditionOR, state: ConversionState
+    ) -> Iterator[str]:
+        """
+        Convert the arguments of an OR condition. CIDR matches of the same field are merged into
+        the minimal set of address ranges at the position of the first one.
+        """
+        args = self.flatten_condition(cond, state)
+        cidrs: Dict[str, List[ConditionFieldEqualsValueExpression]] = dict()
+        for arg in args:
+            if isinstance(arg, ConditionFieldEqualsValueExpression) and isinstance(
+                arg.value, SigmaCIDRExpression
+            ):
+                cidrs.setdefault(arg.field, []).append(arg)
+        for arg in args:
+            if isinstance(arg, ConditionFieldEqualsValueExpression) and isinstance(
+                arg.value, SigmaCIDRExpression
+            ):
+                if arg is cidrs[arg.field][0]:
+                    yield self.convert_cidr_list(
+                        arg.field, [cidr.value.network for cidr in cidrs[arg.field]]
+                    )
+            elif isinstance(
+                arg, ConditionAND
+            ) and not self.decide_convert_condition_as_in_expression(arg, state):
+                yield self.group_expression.format(
+                    expr=self.convert_condition(arg, state)
+                )
+            else:
+                yield self.convert_condition(arg, state)
+
     def convert_condition_and(
         self, cond: ConditionAND, state: ConversionState
     ) -> Union[str, Any]:
         """Conversion of AND conditions"""
         return f" {self.and_token} ".join(
-            self.convert_condition(arg, state) for arg in cond.args
+            self.canonicalize(
+                [
+                    self.group_expression.format(
+                        expr=self.convert_condition(arg, state)
+                    )
+                    if isinstance(arg, ConditionOR)
+                    and not self.decide_convert_condition_as_in_expression(arg, state)
+                    else self.convert_condition(arg, state)
+                    for arg in self.flatten_condition(cond, state)
+                ]
+            )
         )
 
+    def flatten_condition(
+        self, cond: Union[ConditionAND, ConditionOR], state: ConversionState
+    ) -> List[ConditionItem]:
+        """
+        Arguments of an AND or OR condition. In canonical mode, arguments of the same type are
+        flattened into their parent, unless they are converted into in-expressions.
+        """
+        if not self.canonical:
+            return cond.args
+        args = []
+        for arg in cond.args:
+            if isinstance(
+                arg, type(cond)
+            ) and not self.decide_convert_condition_as_in_expression(arg, state):
+                args.extend(self.flatten_condition(arg, state))
+            else:
+                args.append(arg)
+        return args
+
+    def canonicalize(self, items: Iterable[str]) -> Iterable[str]:
+        """
+        Deduplicate and sort converted arguments of commutative expressions in canonical mode, so
+        that semantically equal conditions are converted into byte-identical queries. Otherwise
+        the items are passed through unchanged, which keeps iterators unmaterialized.
+        """
+        if not self.canonical:
+            return items
+        return sorted(dict.fromkeys(items))
+
     def convert_condition_field_eq_val_cidr(
         self, cond: ConditionFieldEqualsValueExpression, state: ConversionState
     ) -> Union[str, Any]:
         """Conversion of CIDR expressions"""
-        cidr = ipaddress.ip_network(cond.value.cidr)
-        return f"{cond.field}:[{cidr.network_address} TO {cidr.broadcast_address}]"
+        return self.convert_cidr_list(cond.field, [cond.value.network])
+
+    def convert_cidr_list(self, field_name: str, networks: List[IPNetwork]) -> str:
+        """
+        Conversion of CIDR matches of a field into ranges. Overlapping and adjacent networks are
+        merged, so each range is evaluated only once.
+        """
+        field_mapping = self.field_mapping(field_name)
+        if field_mapping is not None and field_mapping.type != "ip":
+            raise SigmaFeatureNotSupportedByBackendError(
+                f"CIDR match on field '{field_name}' of type {field_mapping.type} is not supported"
+            )
+        field = self.escape_and_quote_field(field_name)
+        return f" {self.or_token} ".join(
+            f"{field}:[{start} TO {end}]" for start, end in merge_networks(networks)
+        )
 
     def escape_and_quote_field(self, field_name: str) -> str:
         """Escape and quote field names if they contain spaces or special characters."""
@@ -121,12 +758,76 @@ class QuickwitBackend(TextQueryBackend):
         self, cond: ConditionFieldEqualsValueExpression, state: ConversionState
     ) -> Union[str, Any]:
         """Conversion of field matches compare operation value expressions"""
+        field_mapping = self.field_mapping(cond.field, indexed=False)
+        if field_mapping is not None and not field_mapping.fast:
+            raise SigmaFeatureNotSupportedByBackendError(
+                f"Range query on field '{cond.field}' requires a fast field"
+            )
+        if field_mapping is not None and not (
+            field_mapping.is_numeric or field_mapping.type == "json"
+        ):  # Numbers in json fields are indexed as numbers
+            raise SigmaFeatureNotSupportedByBackendError(
+                f"Numeric comparison on field '{cond.field}' of type {field_mapping.type} is not supported"
+            )
         return self.compare_op_expression.format(
-            field=cond.field + self.eq_token,
+            field=self.escape_and_quote_field(cond.field) + self.eq_token,
             operator=self.compare_operators[cond.value.op],
             value=cond.value.number,
         )
 
+    def convert_condition_field_eq_val(
+        self, cond: ConditionFieldEqualsValueExpression, state: ConversionState
+    ) -> Union[str, Any]:
+        """Check that the field exists in the doc mapping before conversion of the expression."""
+        self.field_mapping(
+            cond.field, indexed=not isinstance(cond.value, SigmaCompareExpression)
+        )
+        return super().convert_condition_field_eq_val(cond, state)
+
+    def convert_condition_field_eq_expansion(
+        self, cond: ConditionFieldEqualsValueExpression, state: ConversionState
+    ) -> Union[str, Any]:
+        """
+        Values expanded by modifiers like windash or base64offset are converted into an OR, which
+        is grouped, as it would otherwise bind weaker than an enclosing AND or NOT.
+        """
+        expr = super().convert_condition_field_eq_expansion(cond, state)
+        if isinstance(expr, str) and len(cond.value.values) > 1:
+            return self.group_expression.format(expr=expr)
+        return expr
+
+    def field_mapping(
+        self, field: str, indexed: bool = True
+    ) -> Optional["QuickwitFieldMapping"]:
+        """
+        Mapping of field in the configured index config, if there is one. Fields that aren't
+        indexed can't be searched, only range queries work on them if they are fast fields.
+        """
+        if self.doc_mapping is None:
+            return None
+        field_mapping = self.doc_mapping[field]
+        if indexed and field_mapping is not None and not field_mapping.indexed:
+            raise SigmaFeatureNotSupportedByBackendError(
+                f"Field '{field}' isn't indexed and can't be searched"
+            )
+        return field_mapping
+
+    def convert_value_term(self, value: SigmaString) -> str:
+        """Convert a SigmaString into an unquoted term, keeping a trailing prefix wildcard."""
+        return value.convert(
+            self.escape_char,
+            self.wildcard_multi,
+            self.wildcard_single,
+            self.term_escaped,
+            self.filter_chars,
+        )
+
+    def escape_term(self, value: str) -> str:
+        """Escape a plain string as unquoted term."""
+        return "".join(
+            self.escape_char + c if c in self.term_escaped else c for c in value
+        )
+
     def convert_value_str(self, value: SigmaString, state: ConversionState) -> str:
         """Convert a SigmaString into a plain string which can be used in query"""
         converted = value.convert(
@@ -138,24 +839,120 @@ class QuickwitBackend(TextQueryBackend):
         )
         return converted
 
+    def convert_value_re(
+        self, r: SigmaRegularExpression, state: ConversionState
+    ) -> str:
+        """
+        Translate a regular expression into the tantivy dialect and check it for expensive
+        patterns, which cause a warning or, with regex_guard=reject, a conversion error.
+        """
+        translated = translate_regex(
+            str(r.regexp), frozenset(r.sigma_to_re_flag[flag] for flag in r.flags)
+        )
+        if translated.findings and self.regex_guard != "off":
+            message = f"Regular expression '{str(r.regexp)}': " + ", ".join(
+                translated.findings
+            )
+            if self.regex_guard == "reject":
+                raise SigmaBackendError(message)
+            warnings.warn(message, QuickwitRegexWarning)
+        return translated.regex.replace("/", "\\/")
+
     def convert_condition_as_in_expression(
         self, cond: Union[ConditionOR, ConditionAND], state: ConversionState
     ) -> Union[str, Any]:
-        """Conversion of OR or AND conditions into in-expressions"""
-        return self.field_in_list_expression.format(
-            field=cond.args[0].field,
-            list=self.list_separator.join(
-                [self.convert_value_str(arg.value, state) for arg in cond.args]
-            ),
-        )
+        """
+        Conversion of OR or AND conditions into in-expressions. Values are converted one by one
+        and written directly into the query, so no list of converted values is built for huge
+        value lists, unless they have to be sorted in canonical mode.
+        """
+        field = cond.args[0].field
+        self.field_mapping(field)
+        prefix, suffix = self.field_in_list_expression.split("{list}")
+        query = io.StringIO()
+        query.write(prefix.format(field=field))
+        for i, value in enumerate(
+            self.canonicalize(self.convert_in_expression_values(cond, state))
+        ):
+            if i > 0:
+                query.write(self.list_separator)
+            query.write(value)
+        query.write(suffix.format(field=field))
+        return query.getvalue()
+
+    def convert_in_expression_values(
+        self, cond: Union[ConditionOR, ConditionAND], state: ConversionState
+    ) -> Iterator[str]:
+        """Lazily convert the values of an in-expression."""
+        for arg in cond.args:
+            if isinstance(arg.value, SigmaString):
+                yield arg.value.convert(
+                    self.escape_char,
+                    self.wildcard_multi,
+                    self.wildcard_single,
+                    self.in_list_escaped,
+                    self.filter_chars,
+                )
+            else:
+                yield str(arg.value)
 
     def convert_condition_not(
         self, cond: ConditionNOT, state: ConversionState
     ) -> Union[str, Any]:
         """Conversion of NOT conditions"""
-        expr = self.convert_condition(cond.args[0], state)
+        arg = cond.args[0]
+        expr = self.convert_condition(arg, state)
+        if isinstance(
+            arg, (ConditionAND, ConditionOR)
+        ) and not self.decide_convert_condition_as_in_expression(arg, state):
+            expr = self.group_expression.format(expr=expr)
         return f"NOT {expr}"
 
+    def query_cost(self, query: str) -> Optional["QueryCost"]:
+        """
+        Estimated cost of a query, None if the estimator can't parse it. The last estimate is kept,
+        as it's needed multiple times.
+        """
+        if self._last_cost[0] != query:
+            try:
+                cost = self.cost_estimator.estimate(query)
+            except SigmaValueError:
+                cost = None
+            self._last_cost = (query, cost)
+        return self._last_cost[1]
+
+    def query_cost_tags(self, query: str) -> Dict[str, Optional[float]]:
+        """Estimated cost added to finalized queries if requested with the query_cost option."""
+        if not self.emit_cost:
+            return {}
+        cost = self.query_cost(query)
+        return {"cost": cost.score if cost is not None else None}
+
+    def finish_query(self, rule: SigmaRule, query: Any, state: ConversionState) -> Any:
+        """Check the estimated cost of the query against the cost budget."""
+        if isinstance(
+            rule, SigmaCorrelationRule
+        ):  # Aggregation search, see correlation_search
+            return query
+        if isinstance(query, QuickwitQueryParts):
+            return QuickwitQueryParts(
+                self.finish_query(rule, part, state) for part in query
+            )
+        query = super().finish_query(rule, query, state)
+        if self.cost_budget is not None and isinstance(query, str):
+            cost = self.query_cost(query)
+            if cost is not None and cost.score > self.cost_budget:
+                message = (
+                    f"Estimated query cost {cost.score:g} of rule '{rule.title}' exceeds "
+                    f"budget {self.cost_budget:g}"
+                )
+                if self.cost_budget_action == "reject":
+                    raise SigmaBackendError(message, source=rule.source)
+                warnings.warn(message, QuickwitQueryCostWarning)
+        if self._timings is not None and isinstance(query, str):
+            self._rule_queries.append(query)
+        return query
+
     def finalize_query(
         self,
         rule: SigmaRule,
@@ -165,8 +962,495 @@ class QuickwitBackend(TextQueryBackend):
         output_format: str,
     ) -> Any:
         """Finalize query by adding any necessary prefixes or suffixes."""
-        return query
+        self.enter_phase("finalize")
+        if isinstance(rule, SigmaCorrelationRule):
+            return self.finalize_correlation_query(rule, query, output_format)
+        if isinstance(query, QuickwitQueryParts):
+            parts = QuickwitQueryParts()
+            try:
+                for i, part in enumerate(query):
+                    self._query_part = (i, len(query))
+                    parts.append(
+                        self.finalize_query(rule, part, index, state, output_format)
+                    )
+            finally:
+                self._query_part = None
+            return parts
+        if output_format == "default":
+            return query
+        return super().finalize_query(rule, query, index, state, output_format)
+
+    def finalize(self, queries: List[Any], output_format: str) -> Any:
+        """Finalize the output and write the instrumentation report if configured."""
+        output = super().finalize(queries, output_format)
+        report = self.backend_options.get("instrument_report")
+        if report and self.instrumentation is not None:
+            self.instrumentation.write(report)
+        return output
 
     def finalize_output_default(self, queries: List[Any]) -> Any:
         """Finalize the output for the default format."""
         return queries
+
+    def query_hash(self, query: str) -> str:
+        """Stable hash of a query, which is equal for canonicalized equivalent conditions."""
+        return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+    def parse_timespan(self, timespan: Union[str, int]) -> int:
+        """Convert a timespan like 15m or 1h into seconds. Plain numbers are taken as seconds."""
+        timespan = str(timespan).strip()
+        if timespan.isdigit():
+            return int(timespan)
+        try:
+            return int(timespan[:-1]) * self.timespan_seconds[timespan[-1]]
+        except (KeyError, ValueError):
+            raise SigmaConfigurationError(f"Invalid timespan '{timespan}'")
+
+    def search_time_range(self, min_window: int = 0) -> Tuple[int, int]:
+        """
+        Time range of search requests as (start, end) Unix timestamps. The end defaults to the
+        current time, which is fixed for a conversion, and the start to the end minus the
+        time_window backend option, but at least min_window seconds.
+        """
+        end = int(
+            self.backend_options.get(
+                "end_timestamp", self._now if self._now is not None else time.time()
+            )
+        )
+        start = self.backend_options.get("start_timestamp")
+        if start is None:
+            start = end - max(
+                self.parse_timespan(
+                    self.backend_options.get("time_window", self.default_time_window)
+                ),
+                min_window,
+            )
+        return int(start), end
+
+    def timestamp_field(self) -> str:
+        """Timestamp field of the searched index, used for sorting and time windows."""
+        return self.backend_options.get(
+            "timestamp_field",
+            (self.doc_mapping is not None and self.doc_mapping.timestamp_field)
+            or self.default_timestamp_field,
+        )
+
+    def index_id(self, state: ConversionState) -> Optional[str]:
+        """
+        Quickwit index ID or pattern targeted by a query, as routed by the index routing pipeline
+        or configured with the index_id backend option.
+        """
+        return state.processing_state.get(
+            index_state_key,
+            self.backend_options.get(
+                "index_id",
+                self.doc_mapping.index_id if self.doc_mapping is not None else None,
+            ),
+        )
+
+    def finalize_query_search_request(
+        self, rule: SigmaRule, query: Any, index: int, state: ConversionState
+    ) -> Dict[str, Any]:
+        """
+        Embed query into a request body for the Quickwit search API (/api/v1/<index>/search).
+        """
+        return {
+            "rule_id": str(rule.id) if rule.id is not None else None,
+            "title": rule.title,
+            "index_id": self.index_id(state),
+            "query_hash": self.query_hash(query),
+            **self.query_cost_tags(query),
+            "request": self.search_request(query),
+            **self.query_part_tags(),
+        }
+
+    def search_request(self, query: str) -> Dict[str, Any]:
+        """
+        Request body of the Quickwit search API for a query. The time range lets Quickwit prune
+        splits by their timestamp metadata.
+        """
+        start, end = self.search_time_range()
+        request = {
+            "query": query,
+            "start_timestamp": start,
+            "end_timestamp": end,
+            "max_hits": int(
+                self.backend_options.get("max_hits", self.default_max_hits)
+            ),
+            "sort_by": f"-{self.timestamp_field()}",
+        }
+        search_field = self.backend_options.get("search_field")
+        if search_field:
+            request["search_field"] = (
+                search_field.split(",")
+                if isinstance(search_field, str)
+                else list(search_field)
+            )
+        return request
+
+    def finalize_output_search_request(
+        self, queries: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Finalize the output for the search request format."""
+        return queries
+
+    def query_part_tags(self) -> Dict[str, int]:
+        """Part number and count added to finalized queries of rules split into parts."""
+        if self._query_part is None:
+            return {}
+        return {"part": self._query_part[0], "parts": self._query_part[1]}
+
+    def query_record(
+        self, rule: SigmaRule, query: str, state: ConversionState
+    ) -> Dict[str, Any]:
+        """Query together with the rule and index information needed to run and attribute it."""
+        return {
+            "rule_id": str(rule.id) if rule.id is not None else rule.title,
+            "title": rule.title,
+            "index_id": self.index_id(state),
+            "logsource": {
+                attribute: value
+                for attribute in ("product", "category", "service")
+                if (value := getattr(rule.logsource, attribute)) is not None
+            },
+            "query": query,
+            "query_hash": self.query_hash(query),
+            **self.query_cost_tags(query),
+            **self.query_part_tags(),
+        }
+
+    def finalize_query_fused(
+        self, rule: SigmaRule, query: Any, index: int, state: ConversionState
+    ) -> Dict[str, Any]:
+        """
+        Keep the query together with the information needed for grouping and attribution. In-list
+        values are counted as clauses, as each of them matches a term like a separate clause. The
+        clauses are counted in the condition tree, only queries changed after conversion (e.g. by
+        query templates of the pipeline) are counted by the cost estimator.
+        """
+        clauses = self._query_clauses.get(query)
+        if clauses is None:
+            cost = self.query_cost(query)
+            clauses = (
+                cost.clauses - cost.in_lists + cost.in_list_values
+                if cost is not None
+                else 1
+            )
+        return {
+            **self.query_record(rule, query, state),
+            "clauses": clauses,
+        }
+
+    def finalize_output_fused(
+        self, queries: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Group rule queries by target index (or log source if rules aren't routed to an index) and
+        combine each group into as few OR queries as the fused_max_clauses (clauses and in-list
+        values per fused query) and fused_max_bytes budgets allow. The attribution list of each
+        fused query contains the individual rule queries, which are used to assign hits back to the
+        matching rules. Each fused query has a search request like the search_request format.
+        """
+        max_clauses = int(
+            self.backend_options.get(
+                "fused_max_clauses", self.default_fused_max_clauses
+            )
+        )
+        max_bytes = int(
+            self.backend_options.get("fused_max_bytes", self.default_fused_max_bytes)
+        )
+        separator = f" {self.or_token} "
+
+        groups: Dict[Any, List[Dict[str, Any]]] = dict()
+        correlations = []
+        for query in queries:
+            if "correlation" in query:  # Aggregations can't be fused
+                correlations.append(query)
+                continue
+            key = (
+                query["index_id"]
+                if query["index_id"] is not None
+                else tuple(sorted(query["logsource"].items()))
+            )
+            groups.setdefault(key, []).append(query)
+
+        fused = []
+        for group in groups.values():
+            batches: List[List[Dict[str, Any]]] = [[]]
+            size = clauses = 0
+            for query in group:
+                clause = self.group_expression.format(expr=query["query"])
+                if batches[-1] and (
+                    clauses + query["clauses"] > max_clauses
+                    or size + len(separator) + len(clause) > max_bytes
+                ):
+                    batches.append([])
+                    size = clauses = 0
+                size += len(clause) + (len(separator) if batches[-1] else 0)
+                clauses += query["clauses"]
+                batches[-1].append(query)
+            for batch in batches:
+                fused_query = (
+                    separator.join(
+                        self.group_expression.format(expr=query["query"])
+                        for query in batch
+                    )
+                    if len(batch) > 1
+                    else batch[0]["query"]
+                )
+                fused.append(
+                    {
+                        "title": f"Fused query of {len(batch)} rules"
+                        if len(batch) > 1
+                        else batch[0]["title"],
+                        "index_id": batch[0]["index_id"],
+                        "logsource": batch[0]["logsource"],
+                        "query": fused_query,
+                        "query_hash": self.query_hash(fused_query),
+                        "request": self.search_request(fused_query),
+                        "attribution": [
+                            {
+                                "rule_id": query["rule_id"],
+                                "title": query["title"],
+                                "query": query["query"],
+                                "query_hash": query["query_hash"],
+                                **{
+                                    key: query[key]
+                                    for key in ("cost", "part", "parts")
+                                    if key in query
+                                },
+                            }
+                            for query in batch
+                        ],
+                    }
+                )
+        return fused + correlations
+
+    def convert_correlation_event_count_rule(
+        self,
+        rule: SigmaCorrelationRule,
+        output_format: Optional[str] = None,
+        method: str = "default",
+    ) -> List[Dict[str, Any]]:
+        """
+        Count events per group and time window with a date histogram. Windows with fewer events
+        than required by the condition are dropped by Quickwit with min_doc_count.
+        """
+        return [
+            self.correlation_search(
+                rule,
+                rule.referenced_rules,
+                window_min_doc_count=min_doc_count(rule.condition),
+            )
+        ]
+
+    def convert_correlation_value_count_rule(
+        self,
+        rule: SigmaCorrelationRule,
+        output_format: Optional[str] = None,
+        method: str = "default",
+    ) -> List[Dict[str, Any]]:
+        """Count distinct values per group and time window with a cardinality aggregation."""
+        fieldref = rule.condition.fieldref
+        if not isinstance(fieldref, str):
+            raise SigmaFeatureNotSupportedByBackendError(
+                "Value count correlation is only supported for a single field",
+                source=rule.source,
+            )
+        return [
+            self.correlation_search(
+                rule,
+                rule.referenced_rules,
+                window_aggs={"value_count": {"cardinality": {"field": fieldref}}},
+                correlation={"field": fieldref},
+            )
+        ]
+
+    def convert_correlation_temporal_rule(
+        self,
+        rule: SigmaCorrelationRule,
+        output_format: Optional[str] = None,
+        method: str = "default",
+    ) -> List[Dict[str, Any]]:
+        """
+        One aggregation per referenced rule, as Quickwit can't tell which rule matched an event.
+        Groups and windows present in the results of enough rules satisfy the condition.
+        """
+        return [
+            self.correlation_search(
+                rule, [rule_reference], correlation={"rule": rule_reference.reference}
+            )
+            for rule_reference in rule.referenced_rules
+        ]
+
+    def correlation_search(
+        self,
+        rule: SigmaCorrelationRule,
+        rule_references: List[SigmaRuleReference],
+        window_min_doc_count: int = 1,
+        window_aggs: Optional[Dict[str, Any]] = None,
+        correlation: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Aggregation search over the events matched by the referenced rules. Their queries are
+        combined with OR and the indexes they are routed to are searched together.
+        """
+        queries = [
+            query
+            for rule_reference in rule_references
+            for query in rule_reference.rule.get_conversion_result()
+        ]
+        index_ids = sorted(
+            {
+                index_id
+                for rule_reference in rule_references
+                for state in rule_reference.rule.get_conversion_states()
+                if (index_id := self.index_id(state)) is not None
+            }
+        )
+        group_by = {
+            field: self.correlation_group_field(rule, field, rule_references)
+            for field in rule.group_by or []
+        }
+        return {
+            "query": queries[0]
+            if len(queries) == 1
+            else f" {self.or_token} ".join(
+                self.group_expression.format(expr=query) for query in queries
+            ),
+            "index_id": ",".join(index_ids) if index_ids else None,
+            "aggs": correlation_aggs(
+                group_by,
+                self.timestamp_field(),
+                rule.timespan.seconds,
+                int(
+                    self.backend_options.get(
+                        "correlation_bucket_size", self.default_correlation_bucket_size
+                    )
+                ),
+                window_min_doc_count,
+                window_aggs,
+            ),
+            "correlation": {
+                "type": str(rule.type),
+                "group_by": list(group_by),
+                "timespan": rule.timespan.seconds,
+                "condition": correlation_condition(rule.condition),
+                "rules": [
+                    rule_reference.reference for rule_reference in rule.referenced_rules
+                ],
+                **(correlation or {}),
+            },
+        }
+
+    def correlation_group_field(
+        self,
+        rule: SigmaCorrelationRule,
+        field: str,
+        rule_references: List[SigmaRuleReference],
+    ) -> str:
+        """
+        Resolve a group-by field alias. A single aggregation can only group by one field, so all
+        referenced rules of the search must map the alias to the same field.
+        """
+        alias = rule.aliases.aliases.get(field)
+        if alias is None:
+            return field
+        fields = {
+            alias.mapping[rule_reference]
+            for rule_reference in rule_references
+            if rule_reference in alias.mapping
+        }
+        if len(fields) != 1:
+            raise SigmaFeatureNotSupportedByBackendError(
+                f"Field alias '{field}' maps to different fields, which can't be aggregated "
+                "in a single Quickwit search",
+                source=rule.source,
+            )
+        return fields.pop()
+
+    def finalize_correlation_query(
+        self, rule: SigmaCorrelationRule, query: Dict[str, Any], output_format: str
+    ) -> Any:
+        """
+        Search request record of a correlation aggregation in all output formats. No hits are
+        returned, only the aggregation buckets, which are checked against the condition. The
+        time range covers at least the timespan of the correlation.
+        """
+        start, end = self.search_time_range(rule.timespan.seconds)
+        record = {
+            "rule_id": str(rule.id) if rule.id is not None else None,
+            "title": rule.title,
+            "index_id": query["index_id"],
+            "query_hash": self.query_hash(query["query"]),
+            **self.query_cost_tags(query["query"]),
+            "correlation": query["correlation"],
+            "request": {
+                "query": query["query"],
+                "start_timestamp": start,
+                "end_timestamp": end,
+                "max_hits": 0,
+                "aggs": query["aggs"],
+            },
+        }
+        if output_format == "ndjson":
+            return json.dumps(record)
+        return record
+
+    def finalize_query_ndjson(
+        self, rule: SigmaRule, query: Any, index: int, state: ConversionState
+    ) -> str:
+        """Serialize the query record into a single JSON line."""
+        return json.dumps(self.query_record(rule, query, state))
+
+    def finalize_output_ndjson(self, queries: List[str]) -> str:
+        """Finalize the output for the NDJSON format."""
+        return "\n".join(queries)
+
+    def convert_iter(
+        self,
+        rule_collection: SigmaCollection,
+        output_format: Optional[str] = None,
+        correlation_method: Optional[str] = None,
+    ) -> Iterator[Any]:
+        """
+        Convert a rule collection lazily and yield the finalized queries rule by rule instead of
+        collecting all of them, e.g. to write the ndjson format to a file while converting. Formats
+        whose output combines queries of multiple rules, like fused, can't be streamed.
+        """
+        output_format = output_format or self.default_format
+        if output_format == "fused":
+            raise SigmaConfigurationError(
+                f"Output format '{output_format}' can't be converted iteratively"
+            )
+        self.init_processing_pipeline(output_format)
+        rule_collection.resolve_rule_references()
+        with self.conversion_time():
+            for rule in rule_collection.rules:
+                if isinstance(rule, SigmaRule):
+                    yield from self.convert_rule(rule, output_format)
+                else:
+                    yield from self.convert_correlation_rule(
+                        rule, output_format, correlation_method
+                    )
+
+    def convert_batch(
+        self,
+        rule_collection: SigmaCollection,
+        output_format: Optional[str] = None,
+        correlation_method: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        chunksize: Optional[int] = None,
+    ) -> "BatchConversionResult":
+        """Convert a rule collection in parallel, collecting per-rule errors instead of aborting."""
+        from .batch import convert_batch
+
+        with self.conversion_time():
+            return convert_batch(
+                self,
+                rule_collection,
+                output_format,
+                correlation_method,
+                max_workers,
+                chunksize,
+            )
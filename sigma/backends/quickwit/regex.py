@@ -0,0 +1,456 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple
+
+from sigma.exceptions import (
+    SigmaFeatureNotSupportedByBackendError,
+    SigmaRegularExpressionError,
+)
+
+# Characters that are escaped in tantivy regular expressions. Escapes of other punctuation,
+# which Python accepts, are rejected by older versions of the regex-syntax crate.
+META_CHARS = "\\.+*?()|[]{}^$#&-~"
+# Python-only inline flags: ASCII and locale dependent matching
+UNSUPPORTED_FLAGS = "aL"
+SUPPORTED_FLAGS = "imsux-"
+# Regular expressions with counted repetitions above this size compile into huge automata
+MAX_REPETITION = 1000
+
+
+def escape_regex(s: str) -> str:
+    """Escape a literal string for tantivy regular expressions."""
+    return "".join("\\" + c if c in META_CHARS else c for c in s)
+
+
+@dataclass
+class _Node:
+    """Syntax tree node: atom (char, class, any), group of alternatives or repetition."""
+
+    kind: str
+    text: str
+    alternatives: List[List["_Node"]] = field(default_factory=list)
+    min: int = 1
+    max: Optional[int] = 1
+
+
+@dataclass(frozen=True)
+class TranslatedRegex:
+    """
+    Regular expression in the tantivy dialect, which matches whole terms. Findings are
+    descriptions of patterns that are expensive to evaluate.
+    """
+
+    regex: str
+    anchored: bool
+    findings: Tuple[str, ...] = ()
+
+
+class _RegexTranslator:
+    """
+    Recursive descent parser of Python regular expressions, which emits the equivalent tantivy
+    regular expression and builds a syntax tree for the ReDoS analysis.
+    """
+
+    def __init__(self, regex: str):
+        self.regex = regex
+        self.pos = 0
+
+    def error(self, message: str) -> SigmaRegularExpressionError:
+        return SigmaRegularExpressionError(
+            f"Invalid regular expression '{self.regex}': {message} at position {self.pos}"
+        )
+
+    def unsupported(self, construct: str) -> SigmaFeatureNotSupportedByBackendError:
+        return SigmaFeatureNotSupportedByBackendError(
+            f"{construct} in regular expression '{self.regex}' is not supported by Quickwit"
+        )
+
+    def peek(self, n: int = 1) -> str:
+        return self.regex[self.pos : self.pos + n]
+
+    def alternatives(
+        self, top_level: bool = False
+    ) -> List[Tuple[List[_Node], bool, bool]]:
+        """Alternatives with flags whether they are anchored at the start and the end."""
+        alternatives = []
+        while True:
+            start = end = False
+            leading = self.leading_flags() if top_level and not alternatives else []
+            if top_level and self.peek() == "^" or self.peek(2) == "\\A":
+                if not top_level:
+                    raise self.unsupported("Anchor inside of group")
+                start = True
+                self.pos += 1 if self.peek() == "^" else 2
+            sequence = leading + self.sequence(top_level)
+            if top_level and sequence and sequence[-1].kind == "end":
+                sequence.pop()
+                end = True
+            alternatives.append((sequence, start, end))
+            if self.peek() != "|":
+                return alternatives
+            self.pos += 1
+
+    def leading_flags(self) -> List[_Node]:
+        """Inline flags at the start of the expression, which may precede the start anchor."""
+        nodes: List[_Node] = []
+        while self.peek(2) == "(?":
+            pos = self.pos
+            node = self.group()
+            if node is not None and node.kind != "flags":
+                self.pos = pos
+                break
+            elif node is not None:
+                nodes.append(node)
+        return nodes
+
+    def sequence(self, top_level: bool) -> List[_Node]:
+        nodes: List[_Node] = []
+        while self.pos < len(self.regex) and self.peek() not in "|)":
+            if nodes and nodes[-1].kind == "end":
+                raise self.unsupported("Anchor inside of pattern")
+            node = self.atom()
+            if node is None:
+                continue
+            if node.kind == "end":
+                if not top_level:
+                    raise self.unsupported("Anchor inside of group")
+                nodes.append(node)
+                continue
+            nodes.append(self.quantifier(node))
+        if not top_level and self.pos >= len(self.regex):
+            raise self.error("missing )")
+        return nodes
+
+    def atom(self) -> Optional[_Node]:
+        c = self.peek()
+        if c == "(":
+            return self.group()
+        elif c == "[":
+            return self.char_class()
+        elif c == "\\":
+            return self.escape()
+        elif c == "$":
+            self.pos += 1
+            return _Node("end", "")
+        elif c == "^":
+            raise self.unsupported("Anchor inside of pattern")
+        elif c in "*+?":
+            raise self.error("nothing to repeat")
+        self.pos += 1
+        if c == ".":
+            return _Node("any", c)
+        elif c == "{" and self.counted_repetition() is None or c in "]}":
+            return _Node("char", "\\" + c)
+        return _Node("char", c)
+
+    def group(self) -> Optional[_Node]:
+        self.pos += 1
+        prefix = "("
+        if self.peek() == "?":
+            self.pos += 1
+            c = self.peek()
+            if c == ":":
+                self.pos += 1
+                prefix = "(?:"
+            elif c == "#":  # Comment, which is dropped
+                end = self.regex.find(")", self.pos)
+                if end < 0:
+                    raise self.error("missing ), unterminated comment")
+                self.pos = end + 1
+                return None
+            elif c in "=!" or self.peek(2) in ("<=", "<!"):
+                raise self.unsupported("Lookaround")
+            elif self.peek(2) == "P=":
+                raise self.unsupported("Backreference")
+            elif c == "(":
+                raise self.unsupported("Conditional group")
+            elif c == ">":
+                raise self.unsupported("Atomic group")
+            elif c in ("P", "<"):
+                self.pos += 2 if c == "P" else 1
+                end = self.regex.find(">", self.pos)
+                if self.regex[self.pos - 1] != "<" or end < 0:
+                    raise self.error("invalid group name")
+                prefix = f"(?P<{self.regex[self.pos : end]}>"
+                self.pos = end + 1
+            else:
+                start = self.pos
+                while self.peek() and self.peek() not in ":)":
+                    if self.peek() in UNSUPPORTED_FLAGS:
+                        raise self.unsupported(f"Flag '{self.peek()}'")
+                    elif self.peek() not in SUPPORTED_FLAGS:
+                        raise self.error(f"unknown flag '{self.peek()}'")
+                    self.pos += 1
+                flags = self.regex[start : self.pos]
+                if self.peek() == ")":  # Flags of the enclosing group
+                    self.pos += 1
+                    return _Node("flags", f"(?{flags})", min=0, max=0)
+                elif not self.peek():
+                    raise self.error("missing ), unterminated flags")
+                self.pos += 1
+                prefix = f"(?{flags}:"
+        alternatives = [sequence for sequence, _, _ in self.alternatives()]
+        self.pos += 1
+        return _Node(
+            "group",
+            prefix + "|".join(_text(sequence) for sequence in alternatives) + ")",
+            alternatives,
+        )
+
+    def char_class(self) -> _Node:
+        start = self.pos
+        self.pos += 1
+        text = ["["]
+        if self.peek() == "^":
+            text.append("^")
+            self.pos += 1
+        first = True
+        while True:
+            c = self.peek()
+            if not c:
+                self.pos = start
+                raise self.error("unterminated character set")
+            self.pos += 1
+            if c == "]" and not first:
+                break
+            elif c == "\\":
+                text.append(self.class_escape())
+            elif (
+                c == "]" or c == "["
+            ):  # Literal, nested classes are Rust set operations
+                text.append("\\" + c)
+            elif c in "&~-" and self.peek() == c:  # Rust set operators && ~~ --
+                text.append(c + "\\" + c)
+                self.pos += 1
+            else:
+                text.append(c)
+            first = False
+        text.append("]")
+        return _Node("class", "".join(text))
+
+    def class_escape(self) -> str:
+        c = self.peek()
+        self.pos += 1
+        if c in "dDsSwWtnrfvax" or c in "uU" or not c.isalnum():
+            if c == "x" or c in "uU":
+                return "\\" + c + self.hex_digits(c)
+            return "\\" + c if c in META_CHARS or c.isalnum() else c
+        elif c == "0":
+            return self.octal()
+        elif c == "b":  # Backspace in character classes
+            return "\\x08"
+        raise self.error(f"bad escape \\{c}")
+
+    def escape(self) -> Optional[_Node]:
+        self.pos += 1
+        c = self.peek()
+        if not c:
+            raise self.error("bad escape (end of pattern)")
+        self.pos += 1
+        if c in "Zz":
+            return _Node("end", "")
+        elif c == "A":
+            raise self.unsupported("Anchor inside of pattern")
+        elif c in "bB":
+            raise self.unsupported("Word boundary")
+        elif c in "123456789":
+            raise self.unsupported("Backreference")
+        elif c == "N":
+            raise self.unsupported("Named Unicode character")
+        elif c == "0":
+            return _Node("char", self.octal())
+        elif c in "dDsSwW":
+            return _Node("class", "\\" + c)
+        elif c == "x" or c in "uU":
+            return _Node("char", "\\" + c + self.hex_digits(c))
+        elif c in "tnrfva":
+            return _Node("char", "\\" + c)
+        elif c.isalnum():
+            raise self.error(f"bad escape \\{c}")
+        return _Node("char", "\\" + c if c in META_CHARS or c.isspace() else c)
+
+    def hex_digits(self, c: str) -> str:
+        n = {"x": 2, "u": 4, "U": 8}[c]
+        digits = self.peek(n)
+        if len(digits) != n or any(d not in "0123456789abcdefABCDEF" for d in digits):
+            raise self.error(f"incomplete escape \\{c}{digits}")
+        self.pos += n
+        return digits
+
+    def octal(self) -> str:
+        digits = "0"
+        while len(digits) < 3 and self.peek() and self.peek() in "01234567":
+            digits += self.peek()
+            self.pos += 1
+        return f"\\x{int(digits, 8):02x}"
+
+    def counted_repetition(self) -> Optional[Tuple[int, Optional[int], int]]:
+        """Bounds of a {m,n} repetition at the current position and its length or None."""
+        end = self.regex.find("}", self.pos)
+        if end < 0:
+            return None
+        body = self.regex[self.pos : end]
+        lower, comma, upper = body.partition(",")
+        if not (lower.isdigit() or comma and lower == "") or not (
+            upper.isdigit() or upper == ""
+        ):
+            return None
+        if not lower and not upper:
+            return None
+        return (
+            int(lower) if lower else 0,
+            int(upper) if upper else (None if comma else int(lower)),
+            end + 1 - self.pos,
+        )
+
+    def quantifier(self, node: _Node) -> _Node:
+        c = self.peek()
+        if c in ("*", "+", "?"):
+            self.pos += 1
+            bounds: Tuple[int, Optional[int]] = {
+                "*": (0, None),
+                "+": (1, None),
+                "?": (0, 1),
+            }[c]
+            text = c
+        elif c == "{":
+            self.pos += 1
+            repetition = self.counted_repetition()
+            if repetition is None:
+                self.pos -= 1
+                return node
+            lower, upper, length = repetition
+            self.pos += length
+            bounds = (lower, upper)
+            if upper is None:
+                text = f"{{{lower},}}"
+            elif lower == upper:
+                text = f"{{{lower}}}"
+            else:
+                text = f"{{{lower},{upper}}}"
+        else:
+            return node
+        if node.kind in ("flags", "end"):
+            raise self.error("nothing to repeat")
+        if self.peek() == "?":
+            self.pos += 1
+            text += "?"
+        elif self.peek() == "+":
+            raise self.unsupported("Possessive quantifier")
+        return _Node("repeat", node.text + text, [[node]], *bounds)
+
+
+def _text(sequence: List[_Node]) -> str:
+    return "".join(node.text for node in sequence)
+
+
+def _repeats(node: _Node) -> List[_Node]:
+    """Repetitions contained in node, including node itself."""
+    repeats = [node] if node.kind == "repeat" else []
+    for sequence in node.alternatives:
+        for child in sequence:
+            repeats.extend(_repeats(child))
+    return repeats
+
+
+def _is_any(node: _Node) -> bool:
+    """Node is .*, which matches everything."""
+    return (
+        node.kind == "repeat"
+        and node.min == 0
+        and node.max is None
+        and node.alternatives[0][0].kind == "any"
+    )
+
+
+def _first(sequence: List[_Node]) -> Optional[str]:
+    """First atom of a sequence, which is None if the sequence can start with anything."""
+    for node in sequence:
+        if node.kind == "flags":
+            continue
+        elif node.kind in ("group", "repeat"):
+            firsts = {_first(alternative) for alternative in node.alternatives}
+            return firsts.pop() if len(firsts) == 1 else None
+        elif node.kind == "char":
+            return node.text
+        return None
+    return ""
+
+
+def _findings(node: _Node, factor: int = 1) -> List[str]:
+    """
+    Patterns causing catastrophic backtracking in backtracking engines (like the local
+    evaluator) or automata explosion in tantivy: nested unbounded quantifiers, unbounded
+    repetition of overlapping alternatives and large counted repetitions.
+    """
+    findings = []
+    if node.kind == "repeat":
+        (child,) = node.alternatives[0]
+        if node.max is None:
+            if any(repeat.max is None for repeat in _repeats(child)):
+                findings.append(f"nested quantifier in '{node.text}'")
+            elif child.kind == "group" and len(child.alternatives) > 1:
+                firsts = [_first(alternative) for alternative in child.alternatives]
+                if None in firsts or len(set(firsts)) < len(firsts):
+                    findings.append(
+                        f"repetition of overlapping alternatives in '{node.text}'"
+                    )
+        factor *= node.max if node.max is not None else max(node.min, 1)
+        if factor > MAX_REPETITION and (node.max or node.min) > 1:
+            findings.append(f"repetition of {factor} states in '{node.text}'")
+            factor = 1  # Report each large repetition once
+    for sequence in node.alternatives:
+        for child in sequence:
+            findings.extend(_findings(child, factor))
+    return findings
+
+
+@lru_cache(maxsize=4096)
+def translate_regex(regex: str, flags: FrozenSet[str] = frozenset()) -> TranslatedRegex:
+    """
+    Translate a Sigma (Python) regular expression into the dialect of tantivy, which is used
+    by Quickwit regex queries. Tantivy regular expressions always match whole terms and don't
+    support anchors, so anchors are removed and unanchored ends are padded with .*. Unsupported
+    constructs like lookarounds, backreferences, word boundaries or possessive quantifiers
+    raise an error. Flags are the single-letter Python flags of the Sigma modifiers (i, m, s),
+    of which multi-line matching is irrelevant without anchors. Inline flags at the start of the
+    expression are merged into them. The translation only uses syntax shared by Rust and Python,
+    so it can still be evaluated locally.
+
+    Translations are memoized, as the same regular expressions are used in many rules.
+    """
+    translator = _RegexTranslator(regex)
+    alternatives = translator.alternatives(top_level=True)
+    if translator.pos < len(regex):
+        raise translator.error("unbalanced parenthesis")
+
+    # Python only accepts inline flags at the start of the expression, where they apply to all of
+    # it. They are moved into the flags prefix, as the padding with .* would precede them.
+    first = alternatives[0][0]
+    while first and first[0].kind == "flags" and "-" not in first[0].text:
+        flags = flags | frozenset(first.pop(0).text[2:-1])
+
+    translated = []
+    anchored = True
+    for sequence, start, end in alternatives:
+        anchored = anchored and start and end
+        text = _text(sequence)
+        if not start and not (sequence and _is_any(sequence[0])):
+            text = ".*" + text
+        if not end and not (sequence and _is_any(sequence[-1])) and text != ".*":
+            text += ".*"
+        translated.append(text)
+    prefix = "".join(sorted(flags & {"i", "s", "u", "x"}))
+    findings = [
+        finding
+        for sequence, _, _ in alternatives
+        for node in sequence
+        for finding in _findings(node)
+    ]
+    if not anchored:
+        findings.append("unanchored pattern scans the whole term dictionary")
+    return TranslatedRegex(
+        (f"(?{prefix})" if prefix else "") + "|".join(translated),
+        anchored,
+        tuple(findings),
+    )
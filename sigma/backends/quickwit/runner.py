@@ -0,0 +1,320 @@
+import asyncio
+import http.client
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Union,
+)
+from urllib.parse import quote, urlsplit
+
+from sigma.exceptions import SigmaConfigurationError
+
+
+class QuickwitSearchError(Exception):
+    """Search request failed, retryable if caused by a transient condition."""
+
+    def __init__(
+        self, message: str, status: Optional[int] = None, retryable: bool = False
+    ):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+class QuickwitSearchClient:
+    """
+    Client of the Quickwit REST search API with a pool of persistent HTTP connections, which are
+    reused across requests instead of opening a connection per search. Blocking requests run in
+    a dedicated thread pool of the same size, so the client can be used from asyncio code.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = 8,
+        timeout: float = 30.0,
+        headers: Optional[Mapping[str, str]] = None,
+    ):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise SigmaConfigurationError(f"Invalid Quickwit URL '{url}'")
+        self.connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.headers = {
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+            **(headers or {}),
+        }
+        self.pool_size = pool_size
+        self.connections_opened = 0
+        self._idle: List[http.client.HTTPConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="quickwit-search"
+        )
+
+    def _connection(self) -> http.client.HTTPConnection:
+        try:
+            return self._idle.pop()
+        except IndexError:
+            pass
+        self.connections_opened += 1
+        return self.connection_class(self.host, self.port, timeout=self.timeout)
+
+    def _request(self, path: str, body: bytes) -> Dict[str, Any]:
+        connection = self._connection()
+        try:
+            connection.request("POST", self.base_path + path, body, self.headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise QuickwitSearchError(f"Search request failed: {e}", retryable=True)
+        if response.will_close:
+            connection.close()
+        else:
+            self._idle.append(connection)
+        if response.status != 200:
+            raise QuickwitSearchError(
+                f"Search request failed with status {response.status}: "
+                + data.decode("utf-8", "replace")[:200],
+                response.status,
+                response.status == 429 or response.status >= 500,
+            )
+        return json.loads(data)
+
+    async def search(self, index_id: str, request: Mapping[str, Any]) -> Dict[str, Any]:
+        """Run a search request (body of /api/v1/<index_id>/search) and return the response."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.pool_size)
+            self._slots_loop = loop
+        async with self._slots:
+            return await loop.run_in_executor(
+                self._executor,
+                self._request,
+                f"/api/v1/{quote(index_id, safe='*,')}/search",
+                json.dumps(request).encode("utf-8"),
+            )
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "QuickwitSearchClient":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        self.close()
+
+
+class CheckpointStore:
+    """
+    End timestamps of the last successful search per rule, persisted as JSON file. Updates are
+    kept in memory until they are flushed, which replaces the file atomically, so an interrupted
+    run never leaves a corrupt store.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path is not None else None
+        self.checkpoints: Dict[str, int] = dict()
+        self.modified = False
+        if self.path is not None and self.path.exists():
+            try:
+                self.checkpoints = json.loads(self.path.read_text(encoding="utf-8"))
+            except ValueError as e:
+                raise SigmaConfigurationError(
+                    f"Can't load checkpoints from '{self.path}': {e}"
+                )
+
+    def get(self, key: str) -> Optional[int]:
+        return self.checkpoints.get(key)
+
+    def set(self, key: str, timestamp: int) -> None:
+        self.checkpoints[key] = timestamp
+        self.modified = True
+
+    def flush(self) -> None:
+        """Write the checkpoints to the file if they were updated since they were last written."""
+        if self.path is None or not self.modified:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.checkpoints, f, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.modified = False
+
+
+@dataclass
+class RuleHits:
+    """Result of the search of a rule query in a time window."""
+
+    rule_id: Optional[str]
+    title: str
+    index_id: Optional[str]
+    query: str
+    start_timestamp: int
+    end_timestamp: int
+    num_hits: int = 0
+    hits: List[Dict[str, Any]] = field(default_factory=list)
+    aggregations: Optional[Dict[str, Any]] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    part: Optional[int] = None
+    truncated: bool = False
+
+
+class QuickwitRunner:
+    """
+    Scheduled execution of search_request records generated by the backend. Searches run
+    concurrently (bounded by the connection pool of the client), transient failures are retried
+    with exponential backoff and jitter. Each rule searches from the end of its last successful
+    search, as recorded in the checkpoint store, to the current time, so repeated runs only
+    search new data. Correlation searches start at least their timespan before the current time,
+    as their time windows need all events of the timespan. Results are yielded as soon as each
+    search completes and the checkpoints are written once at the end of the run.
+
+    Rules with more hits than max_hits of their request are searched again with start_offset
+    until all hits are fetched, up to max_pages requests. Results with more hits are marked as
+    truncated and their checkpoint isn't advanced, so the hits aren't skipped by the next run.
+    """
+
+    def __init__(
+        self,
+        client: QuickwitSearchClient,
+        checkpoints: Optional[CheckpointStore] = None,
+        default_index: Optional[str] = None,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        max_pages: int = 100,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.client = client
+        self.checkpoints = checkpoints if checkpoints is not None else CheckpointStore()
+        self.default_index = default_index
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_pages = max_pages
+        self.clock = clock
+
+    @staticmethod
+    def checkpoint_key(record: Mapping[str, Any]) -> str:
+        """
+        Key of a record in the checkpoint store: rule ID (or title) and part of split queries.
+        Fused queries of multiple rules are identified by their query hash.
+        """
+        if "attribution" in record:
+            return f"fused:{record['query_hash']}"
+        key = record.get("rule_id") or record["title"]
+        if "part" in record:
+            key += f"#{record['part']}"
+        return key
+
+    async def run(
+        self, records: Iterable[Mapping[str, Any]]
+    ) -> AsyncIterator[RuleHits]:
+        """Search all records and yield their hits in order of completion."""
+        end = int(self.clock())
+        tasks = [asyncio.ensure_future(self._search(record, end)) for record in records]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.checkpoints.flush()
+
+    async def _search(self, record: Mapping[str, Any], end: int) -> RuleHits:
+        key = self.checkpoint_key(record)
+        request = dict(record["request"])
+        checkpoint = self.checkpoints.get(key)
+        if checkpoint is not None:
+            request["start_timestamp"] = checkpoint
+            if "correlation" in record:  # Windows need the events of the whole timespan
+                request["start_timestamp"] = min(
+                    checkpoint, end - record["correlation"]["timespan"]
+                )
+        request["end_timestamp"] = end
+        index_id = record.get("index_id") or self.default_index
+        result = RuleHits(
+            record.get("rule_id"),
+            record["title"],
+            index_id,
+            request["query"],
+            request["start_timestamp"],
+            end,
+            part=record.get("part"),
+        )
+        if index_id is None:
+            result.error = "No index ID for rule and no default index configured"
+            return result
+        if request["start_timestamp"] >= end:  # Nothing new since last run
+            return result
+
+        response = await self._search_with_retries(index_id, request, result)
+        if response is None:
+            return result
+        result.num_hits = response.get("num_hits", 0)
+        result.hits = response.get("hits", [])
+        result.aggregations = response.get("aggregations")
+
+        offset = request.get("start_offset", 0)
+        pages = 1
+        while offset + len(result.hits) < result.num_hits and request.get("max_hits"):
+            if pages >= self.max_pages:
+                result.truncated = True
+                return result
+            request["start_offset"] = offset + len(result.hits)
+            response = await self._search_with_retries(index_id, request, result)
+            if response is None:
+                return result
+            page = response.get("hits", [])
+            if not page:  # Hits were deleted in the meantime
+                break
+            result.hits.extend(page)
+            pages += 1
+        self.checkpoints.set(key, end)
+        return result
+
+    async def _search_with_retries(
+        self, index_id: str, request: Mapping[str, Any], result: RuleHits
+    ) -> Optional[Dict[str, Any]]:
+        """Search response, or None if the search failed, which is recorded in the result."""
+        attempts = 0
+        while True:
+            attempts += 1
+            result.attempts += 1
+            try:
+                return await self.client.search(index_id, request)
+            except QuickwitSearchError as e:
+                if not e.retryable or attempts > self.retries:
+                    result.error = str(e)
+                    return None
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
@@ -0,0 +1,145 @@
+import copy
+import math
+from typing import Callable, List, Optional
+
+from sigma.conditions import ConditionAND, ConditionItem, ConditionNOT, ConditionOR
+from sigma.types import SigmaExpansion, SigmaType
+
+from .optimizer import ConditionType, count_clauses, is_expansion
+
+
+class QuickwitQuerySplitter:
+    """
+    Splitting of conditions whose converted query exceeds a clause or size budget into several
+    conditions whose disjunction is equivalent to the original condition:
+
+    * OR expressions (including in-lists) are split into chunks of their arguments, values
+      expanded by modifiers like windash or base64offset into chunks of their values.
+    * AND expressions are split by distributing over their largest splittable argument:
+      a AND (b OR c) is (a AND b) OR (a AND c). The other arguments are copied into each part,
+      so an AND is only distributed if they fit into the budget. Otherwise no part could fit
+      and repeated distribution would grow the parts exponentially.
+    * NOT (a AND b) is split into NOT a OR NOT b.
+
+    Conditions that can't be split this way, like single clauses or negated in-lists, are kept
+    even if they exceed the budget. The condition tree passed to the splitter is not modified.
+    """
+
+    def __init__(
+        self, max_clauses: Optional[int] = None, max_bytes: Optional[int] = None
+    ):
+        self.max_clauses = max_clauses
+        self.max_bytes = max_bytes
+
+    def split(
+        self, cond: ConditionType, convert: Callable[[ConditionType], str]
+    ) -> List[str]:
+        """Convert cond with convert and split it until each query fits into the budget."""
+        query = convert(cond)
+        parts = self._parts(cond, query)
+        if parts < 2:
+            return [query]
+        conds = self._partition(cond, parts, self._clause_budget(cond, query))
+        if conds is None or len(conds) < 2:
+            return [query]
+        return [piece for part in conds for piece in self.split(part, convert)]
+
+    def _parts(self, cond: ConditionType, query: str) -> int:
+        """Number of parts needed to fit cond into the budget, 1 if it already fits."""
+        parts = 1
+        if self.max_clauses is not None:
+            parts = max(parts, math.ceil(count_clauses(cond) / self.max_clauses))
+        if self.max_bytes is not None:
+            parts = max(parts, math.ceil(len(query.encode("utf-8")) / self.max_bytes))
+        return parts
+
+    def _clause_budget(self, cond: ConditionType, query: str) -> float:
+        """Budget in clauses, with the size budget converted by the average size of a clause."""
+        budget = math.inf
+        if self.max_clauses is not None:
+            budget = self.max_clauses
+        if self.max_bytes is not None:
+            size = len(query.encode("utf-8"))
+            budget = min(budget, self.max_bytes * count_clauses(cond) / max(size, 1))
+        return budget
+
+    def _partition(
+        self, cond: ConditionType, parts: int, budget: float
+    ) -> Optional[List[ConditionType]]:
+        """
+        Split cond into at most parts conditions whose disjunction is equivalent to cond. Budget
+        is the number of clauses available for each part, minus clauses copied by enclosing ANDs.
+        """
+        if isinstance(cond, ConditionOR):
+            return [
+                self._new(ConditionOR, chunk) if len(chunk) > 1 else chunk[0]
+                for chunk in self._chunks(cond.args, parts)
+            ]
+        elif isinstance(cond, ConditionAND):
+            clauses = [count_clauses(arg) for arg in cond.args]
+            total = sum(clauses)
+            candidates = sorted(
+                range(len(cond.args)), key=lambda i: clauses[i], reverse=True
+            )
+            for i in candidates:
+                copied = total - clauses[i]
+                if copied >= budget:
+                    continue
+                arg_parts = self._partition(cond.args[i], parts, budget - copied)
+                if arg_parts is not None:
+                    return [
+                        self._new(
+                            ConditionAND,
+                            cond.args[:i] + [arg_part] + cond.args[i + 1 :],
+                        )
+                        for arg_part in arg_parts
+                    ]
+            return None
+        elif is_expansion(cond):
+            return [
+                self._expansion(cond, chunk)
+                for chunk in self._chunks(cond.value.values, parts)
+            ]
+        elif isinstance(cond, ConditionNOT) and isinstance(cond.args[0], ConditionAND):
+            return [
+                self._new(
+                    ConditionNOT,
+                    [self._new(ConditionAND, chunk) if len(chunk) > 1 else chunk[0]],
+                )
+                for chunk in self._chunks(cond.args[0].args, parts)
+            ]
+        return None
+
+    def _chunks(
+        self, args: List[ConditionType], parts: int
+    ) -> List[List[ConditionType]]:
+        """Split args into at most parts chunks of nearly equal size."""
+        parts = min(parts, len(args))
+        size, rest = divmod(len(args), parts)
+        chunks = []
+        start = 0
+        for i in range(parts):
+            end = start + size + (1 if i < rest else 0)
+            chunks.append(args[start:end])
+            start = end
+        return chunks
+
+    def _expansion(self, cond: ConditionType, values: List[SigmaType]) -> ConditionType:
+        """Copy of an expression with a modifier expansion, reduced to some of its values."""
+        part = copy.copy(cond)
+        part.value = SigmaExpansion(values) if len(values) > 1 else values[0]
+        return part
+
+    def _new(self, cls: type, args: List[ConditionType]) -> ConditionItem:
+        """
+        New condition with args. Conditions among the args are copied before they are linked to
+        the new parent, as they can be part of the input tree.
+        """
+        args = [
+            copy.copy(arg) if isinstance(arg, ConditionItem) else arg for arg in args
+        ]
+        cond = cls(args=args)
+        for arg in args:
+            if isinstance(arg, ConditionItem):
+                arg.parent = cond
+        return cond
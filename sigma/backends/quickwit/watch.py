@@ -0,0 +1,370 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import yaml
+from sigma.collection import SigmaCollection
+from sigma.correlations import SigmaCorrelationRule
+from sigma.exceptions import SigmaConfigurationError, SigmaError
+from sigma.processing.pipeline import ProcessingPipeline
+from sigma.rule import SigmaRule
+
+from .batch import _convert_one
+from .quickwit import QuickwitBackend
+
+# Modification time (ns) and size of a file, which are compared before its content is hashed
+FileStat = Tuple[int, int]
+
+
+def _digest(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _stat(path: Path) -> Optional[FileStat]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class WatchedRuleFile:
+    """Content of a rule file together with its conversion result."""
+
+    stat: FileStat
+    digest: str
+    content: str
+    # IDs and names of the rules and rules referenced by correlation rules of the file
+    names: FrozenSet[str] = frozenset()
+    references: FrozenSet[str] = frozenset()
+    queries: List[Any] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class WatchCycle:
+    """Changes detected and converted by one polling cycle."""
+
+    converted: List[Path] = field(default_factory=list)
+    removed: List[Path] = field(default_factory=list)
+    pipeline_changed: bool = False
+    pipeline_error: Optional[str] = None
+    manifest_written: bool = False
+    seconds: float = 0.0
+
+
+class QuickwitWatcher:
+    """
+    Incremental conversion of a rule directory. Each poll compares modification time and size
+    of the rule and pipeline files with the previous cycle and hashes only the content of
+    files that changed. Only rule files with changed content are converted again, all of them
+    if the content of a pipeline file changed. Files with correlation rules are converted again
+    if a rule they reference changed. The manifest with the queries of all rule files is
+    replaced atomically whenever a cycle converted or removed a file.
+    """
+
+    def __init__(
+        self,
+        rules_path: Union[str, Path],
+        manifest_path: Union[str, Path],
+        pipeline_files: Sequence[Union[str, Path]] = (),
+        pipelines: Sequence[ProcessingPipeline] = (),
+        output_format: str = "default",
+        backend_options: Optional[Dict[str, Any]] = None,
+        patterns: Sequence[str] = ("*.yml", "*.yaml"),
+    ):
+        self.rules_path = Path(rules_path)
+        self.manifest_path = Path(manifest_path)
+        self.pipeline_files = [Path(path) for path in pipeline_files]
+        self.pipelines = list(pipelines)
+        self.output_format = output_format
+        self.backend_options = dict(backend_options or {})
+        self.patterns = patterns
+        self.files: Dict[Path, WatchedRuleFile] = dict()
+        self.backend: Optional[QuickwitBackend] = None
+        self.pipeline_digest: Optional[str] = None
+        self.pipeline_error: Optional[str] = None
+        self._pipeline_stats: List[Optional[FileStat]] = list()
+
+    def rule_paths(self) -> List[Path]:
+        if self.rules_path.is_file():
+            return [self.rules_path]
+        return sorted(
+            {
+                path
+                for pattern in self.patterns
+                for path in self.rules_path.rglob(pattern)
+            }
+        )
+
+    def update_pipeline(self) -> bool:
+        """
+        Rebuild the backend if the content of a pipeline file changed. A pipeline that can't be
+        loaded is reported and the previous one is kept, unless there is none yet.
+        """
+        stats = [_stat(path) for path in self.pipeline_files]
+        if self.backend is not None and stats == self._pipeline_stats:
+            return False
+        self._pipeline_stats = stats
+        try:
+            contents = [
+                path.read_text(encoding="utf-8") for path in self.pipeline_files
+            ]
+            digest = _digest("\0".join(contents))
+            if self.backend is not None and digest == self.pipeline_digest:
+                self.pipeline_error = None
+                return False
+            # Pipelines are applied in the order of their priority, like by sigma-cli
+            pipeline = ProcessingPipeline()
+            for item in sorted(
+                [ProcessingPipeline.from_yaml(content) for content in contents]
+                + self.pipelines,
+                key=lambda item: item.priority,
+            ):
+                pipeline += item
+            backend = QuickwitBackend(pipeline, **self.backend_options)
+            backend.init_processing_pipeline(self.output_format)
+        except (OSError, SigmaError, yaml.YAMLError) as e:
+            if self.backend is None:
+                raise SigmaConfigurationError(f"Can't load processing pipeline: {e}")
+            self.pipeline_error = str(e)
+            return False
+        self.backend = backend
+        self.pipeline_digest = digest
+        self.pipeline_error = None
+        return True
+
+    def poll(self) -> WatchCycle:
+        """Convert changed rule files and rewrite the manifest if anything changed."""
+        start = time.perf_counter()
+        cycle = WatchCycle(pipeline_changed=self.update_pipeline())
+        cycle.pipeline_error = self.pipeline_error
+
+        paths = self.rule_paths()
+        changed_names = set()
+        for path in set(self.files) - set(paths):
+            changed_names |= self.files.pop(path).names
+            cycle.removed.append(path)
+        for path in paths:
+            stat = _stat(path)
+            watched = self.files.get(path)
+            if stat is None or (
+                watched is not None
+                and watched.stat == stat
+                and not cycle.pipeline_changed
+            ):
+                continue
+            try:
+                content = path.read_text(encoding="utf-8")
+            except OSError:  # Removed while polling, handled by the next cycle
+                continue
+            digest = _digest(content)
+            if watched is not None:
+                watched.stat = stat
+                if watched.digest == digest and not cycle.pipeline_changed:
+                    continue
+                changed_names |= watched.names
+            self.files[path] = WatchedRuleFile(stat, digest, content)
+            cycle.converted.append(path)
+
+        parsed = {path: self.parse_file(path) for path in cycle.converted}
+        for path in cycle.converted:
+            changed_names |= self.files[path].names
+        for path, watched in self.files.items():
+            if path not in parsed and watched.references & changed_names:
+                parsed[path] = self.parse_file(path)
+                cycle.converted.append(path)
+        # Files with correlation rules last, as they need the names of all parsed files
+        for path in sorted(parsed, key=lambda path: bool(self.files[path].references)):
+            self.convert_file(path, parsed[path])
+
+        if cycle.converted or cycle.removed:
+            self.write_manifest()
+            cycle.manifest_written = True
+        cycle.seconds = time.perf_counter() - start
+        return cycle
+
+    def parse_file(self, path: Path) -> List[Union[SigmaRule, SigmaCorrelationRule]]:
+        """Parse the rules of a file and record their names and references."""
+        watched = self.files[path]
+        watched.queries = list()
+        watched.errors = list()
+        try:
+            rules = SigmaCollection.from_yaml(
+                watched.content, resolve_references=False
+            ).rules
+        except (SigmaError, yaml.YAMLError) as e:
+            watched.names = watched.references = frozenset()
+            watched.errors.append(str(e))
+            return []
+        watched.names = frozenset(
+            str(name)
+            for rule in rules
+            if isinstance(rule, SigmaRule)
+            for name in (rule.id, rule.name)
+            if name is not None
+        )
+        watched.references = frozenset(
+            reference.reference
+            for rule in rules
+            if isinstance(rule, SigmaCorrelationRule)
+            for reference in rule.rules
+        )
+        return rules
+
+    def convert_file(
+        self, path: Path, rules: List[Union[SigmaRule, SigmaCorrelationRule]]
+    ) -> None:
+        """
+        Convert the parsed rules of a file. Rules referenced by its correlation rules are parsed
+        from the files defining them and converted together with the file, but only the queries
+        of the file's own rules are kept.
+        """
+        watched = self.files[path]
+        own = {id(rule) for rule in rules}
+        try:
+            collection = SigmaCollection(
+                rules
+                + [
+                    rule
+                    for other_path, other in self.files.items()
+                    if other_path != path and other.names & watched.references
+                    for rule in SigmaCollection.from_yaml(
+                        other.content, resolve_references=False
+                    ).rules
+                ]
+            )
+        except SigmaError as e:  # Referenced rule doesn't exist
+            watched.errors.append(str(e))
+            return
+        # Correlation rules need the conversion results of the rules they reference
+        for rule in sorted(
+            collection.rules, key=lambda rule: isinstance(rule, SigmaCorrelationRule)
+        ):
+            queries, error = _convert_one(self.backend, rule, self.output_format)
+            if id(rule) in own:
+                watched.queries.extend(queries)
+                if error is not None:
+                    watched.errors.append(f"{rule.title}: {error}")
+
+    def manifest(self) -> Dict[str, Any]:
+        paths = sorted(self.files)
+        return {
+            "format": self.output_format,
+            "pipeline_digest": self.pipeline_digest,
+            "pipeline_error": self.pipeline_error,
+            "rules": {
+                str(path.relative_to(self.rules_path))
+                if path != self.rules_path
+                else path.name: {
+                    "digest": self.files[path].digest,
+                    "queries": self.files[path].queries,
+                    "errors": self.files[path].errors,
+                }
+                for path in paths
+            },
+            "output": self.backend.finalize(
+                [query for path in paths for query in self.files[path].queries],
+                self.output_format,
+            ),
+        }
+
+    def write_manifest(self) -> None:
+        """Replace the manifest atomically, so readers never see a partially written file."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.manifest_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.manifest(), f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def run(
+        self,
+        interval: float = 1.0,
+        cycles: Optional[int] = None,
+        callback: Optional[Callable[[WatchCycle], Any]] = None,
+    ) -> None:
+        """Poll every interval seconds, forever or for the given number of cycles."""
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            if cycle > 0:
+                time.sleep(interval)
+            result = self.poll()
+            if callback is not None:
+                callback(result)
+            cycle += 1
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from sigma.pipelines.quickwit import pipelines
+
+    parser = argparse.ArgumentParser(
+        prog="python -m sigma.backends.quickwit.watch",
+        description="Convert rules incrementally whenever rule or pipeline files change.",
+    )
+    parser.add_argument("rules", type=Path, help="Rule file or directory")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="Manifest")
+    parser.add_argument("-f", "--format", default="default")
+    parser.add_argument(
+        "-p",
+        "--pipeline",
+        action="append",
+        default=[],
+        help="Pipeline file or name of a Quickwit pipeline",
+    )
+    parser.add_argument(
+        "-O", "--backend-option", action="append", default=[], metavar="KEY=VALUE"
+    )
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    options = dict(option.partition("=")[::2] for option in args.backend_option)
+    watcher = QuickwitWatcher(
+        args.rules,
+        args.output,
+        [pipeline for pipeline in args.pipeline if pipeline not in pipelines],
+        [pipelines[pipeline]() for pipeline in args.pipeline if pipeline in pipelines],
+        args.format,
+        options,
+    )
+
+    def report(cycle: WatchCycle) -> None:
+        if cycle.pipeline_error is not None:
+            print(f"Pipeline error: {cycle.pipeline_error}", file=sys.stderr)
+        if cycle.manifest_written:
+            print(
+                f"Converted {len(cycle.converted)}, removed {len(cycle.removed)} rule "
+                f"files in {cycle.seconds * 1000:.1f}ms",
+                file=sys.stderr,
+            )
+
+    try:
+        watcher.run(args.interval, callback=report)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
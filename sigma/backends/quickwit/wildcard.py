@@ -0,0 +1,68 @@
+from typing import Any, Dict, Tuple
+
+from sigma.exceptions import SigmaConfigurationError, SigmaValueError
+from sigma.types import SigmaString, SpecialChars
+
+from .regex import escape_regex
+
+
+def classify_wildcard(value: SigmaString) -> Tuple[str, str]:
+    """
+    Kind of a wildcard pattern and its literal part. Kinds are exact (no wildcards), prefix
+    (foo*), suffix (*foo), contains (*foo*) and complex for all other patterns, whose literal
+    part is empty.
+    """
+    parts = list(value.s)
+    kind = "exact"
+    if parts and parts[-1] == SpecialChars.WILDCARD_MULTI:
+        parts.pop()
+        kind = "prefix"
+    if parts and parts[0] == SpecialChars.WILDCARD_MULTI:
+        parts.pop(0)
+        kind = "contains" if kind == "prefix" else "suffix"
+    if (
+        not all(isinstance(part, str) for part in parts)
+        or not parts
+        and kind != "exact"
+    ):
+        return "complex", ""
+    return kind, "".join(parts)
+
+
+def wildcard_regex(value: SigmaString) -> str:
+    """Regular expression in the tantivy dialect matching whole values like the pattern."""
+    regex = []
+    for part in value.s:
+        if part == SpecialChars.WILDCARD_MULTI:
+            regex.append(".*")
+        elif part == SpecialChars.WILDCARD_SINGLE:
+            regex.append(".")
+        elif isinstance(part, str):
+            regex.append(escape_regex(part))
+        else:
+            raise SigmaValueError(
+                f"Placeholder in '{value}' must be resolved by the processing pipeline"
+            )
+    return "".join(regex)
+
+
+def field_map_option(value: Any) -> Dict[str, str]:
+    """
+    Mapping of fields to companion fields from a backend option, which is a dict or, from the
+    command line, a comma-separated list of field=companion pairs.
+    """
+    if value is None:
+        return dict()
+    elif isinstance(value, dict):
+        return {str(name): str(companion) for name, companion in value.items()}
+    elif isinstance(value, str):
+        value = value.split(",")
+    mapping = dict()
+    for pair in value:
+        name, sep, companion = pair.partition("=")
+        if not sep or not name.strip() or not companion.strip():
+            raise SigmaConfigurationError(
+                f"Invalid companion field mapping '{pair}', must be field=companion"
+            )
+        mapping[name.strip()] = companion.strip()
+    return mapping
@@ -1,5 +1,36 @@
-from .quickwit import quickwit_windows_pipeline
+"""
+Quickwit processing pipelines. The modules defining them import the processing transformations
+of pySigma, so they are only imported when a pipeline is created or accessed by name. The
+registry holds wrappers without type hints, which plugin discovery accepts as pipelines without
+resolving them.
+"""
 
-pipelines = {
-    "quickwit_windows_pipeline": quickwit_windows_pipeline,
+import importlib
+
+# Module defining each pipeline, relative to this package
+_pipeline_modules = {
+    "quickwit_windows_pipeline": ".quickwit",
+    "quickwit_index_routing_pipeline": ".quickwit",
+    "quickwit_mapping_pipeline": ".mapping",
 }
+
+
+def _resolve(name: str):
+    return getattr(importlib.import_module(_pipeline_modules[name], __name__), name)
+
+
+def _lazy_pipeline(name: str):
+    def pipeline(*args, **kwargs):
+        return _resolve(name)(*args, **kwargs)
+
+    pipeline.__name__ = pipeline.__qualname__ = name
+    return pipeline
+
+
+def __getattr__(name: str):
+    if name in _pipeline_modules:
+        return _resolve(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+pipelines = {name: _lazy_pipeline(name) for name in _pipeline_modules}
@@ -0,0 +1,158 @@
+import itertools
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import yaml
+from sigma.correlations import SigmaCorrelationRule
+from sigma.exceptions import SigmaConfigurationError
+from sigma.pipelines.common import windows_logsource_mapping
+from sigma.processing.pipeline import ProcessingItem, ProcessingPipeline
+from sigma.processing.transformations.base import FieldMappingTransformationBase
+from sigma.rule import SigmaRule
+
+# Log source attributes (product, category, service), None matches any value
+LogsourceKey = Tuple[Optional[str], Optional[str], Optional[str]]
+FieldMapping = Dict[str, Union[str, List[str]]]
+
+logsource_attributes = ("product", "category", "service")
+
+# Field mapping of the Windows pipeline, applied to rules of the Windows services
+windows_field_mapping: FieldMapping = {
+    "EventID": "winlog.event_id",
+    "Image": "process.executable",
+    "CommandLine": "process.command_line",
+    "OriginalFileName": "process.pe.original_file_name",
+}
+
+
+@dataclass
+class LogsourceIndexedFieldMappingTransformation(FieldMappingTransformationBase):
+    """
+    Field mappings indexed by log source. Unspecified attributes of a mapping's log source match
+    any value, like in LogsourceCondition, so a rule only looks up the at most 8 keys its log
+    source can match instead of evaluating one processing item per mapping. Mappings of more
+    specific log sources take precedence. The merged mapping of each log source is resolved once.
+    """
+
+    mappings: Dict[LogsourceKey, FieldMapping]
+    _resolved: Dict[LogsourceKey, FieldMapping] = field(
+        init=False, compare=False, repr=False, default_factory=dict
+    )
+    _mapping: FieldMapping = field(
+        init=False, compare=False, repr=False, default_factory=dict
+    )
+
+    def resolve(self, key: LogsourceKey) -> FieldMapping:
+        """Merged field mapping of all mappings matching a log source."""
+        mapping = self._resolved.get(key)
+        if mapping is None:
+            candidates = sorted(
+                itertools.product(
+                    *((None,) if value is None else (None, value) for value in key)
+                ),
+                key=lambda candidate: sum(value is not None for value in candidate),
+            )
+            mapping = dict()
+            for candidate in candidates:
+                mapping.update(self.mappings.get(candidate, {}))
+            self._resolved[key] = mapping
+        return mapping
+
+    def apply(self, rule: Union[SigmaRule, SigmaCorrelationRule]) -> None:
+        logsource = getattr(rule, "logsource", None)
+        self._mapping = self.resolve(
+            tuple(getattr(logsource, attribute) for attribute in logsource_attributes)
+            if logsource is not None
+            else (None, None, None)
+        )
+        if self._mapping:
+            super().apply(rule)
+
+    def apply_field_name(self, field: Optional[str]) -> Union[None, str, List[str]]:
+        return self._mapping.get(field)
+
+
+def load_field_mappings(
+    mapping: Union[str, Path, Dict[str, Any]],
+) -> Dict[LogsourceKey, FieldMapping]:
+    """
+    Load field mappings from a YAML or JSON file or its parsed content. The top-level fields
+    apply to all rules, each entry of mappings to the rules of its log source:
+
+        fields:
+            EventID: event.code
+        mappings:
+            - logsource:
+                product: windows
+                category: process_creation
+              fields:
+                Image: process.executable
+    """
+    if isinstance(mapping, (str, Path)):
+        try:
+            with open(mapping, "r", encoding="utf-8") as f:
+                mapping = yaml.safe_load(f)
+        except (OSError, yaml.YAMLError) as e:
+            raise SigmaConfigurationError(f"Can't load field mapping '{mapping}': {e}")
+    if not isinstance(mapping, dict):
+        raise SigmaConfigurationError("Field mapping must be a mapping")
+
+    mappings: Dict[LogsourceKey, FieldMapping] = dict()
+    entries = [{"logsource": {}, "fields": mapping.get("fields") or {}}]
+    entries.extend(mapping.get("mappings") or [])
+    for entry in entries:
+        if isinstance(entry, dict):
+            logsource, fields = entry.get("logsource") or {}, entry.get("fields")
+        else:
+            logsource, fields = None, None
+        if (
+            not isinstance(logsource, dict)
+            or not isinstance(fields, dict)
+            or set(logsource) - set(logsource_attributes)
+        ):
+            raise SigmaConfigurationError(
+                f"Invalid field mapping entry {entry!r}, must contain logsource with "
+                "product, category or service and fields"
+            )
+        key = tuple(logsource.get(attribute) for attribute in logsource_attributes)
+        mappings.setdefault(key, dict()).update(
+            {
+                str(name): [str(target) for target in targets]
+                if isinstance(targets, list)
+                else str(targets)
+                for name, targets in fields.items()
+            }
+        )
+    return {key: fields for key, fields in mappings.items() if fields}
+
+
+# Not decorated with @Pipeline: the decorator is a singleton and would replace the windows pipeline.
+def quickwit_mapping_pipeline(
+    mapping: Union[str, Path, Dict[str, Any], None] = None,
+) -> ProcessingPipeline:
+    """
+    Map fields with mappings indexed by log source, loaded from a YAML or JSON mapping file (see
+    load_field_mappings). By default, the fields of the Windows pipeline are mapped for rules of
+    the Windows services. Construction and per-rule cost don't grow with the number of log
+    sources, unlike one processing item per log source.
+    """
+    mappings = (
+        {
+            ("windows", None, service): windows_field_mapping
+            for service in windows_logsource_mapping
+        }
+        if mapping is None
+        else load_field_mappings(mapping)
+    )
+    return ProcessingPipeline(
+        name="Quickwit field mapping",
+        allowed_backends=frozenset({"quickwit"}),
+        priority=20,
+        items=[
+            ProcessingItem(
+                identifier="quickwit_field_mapping",
+                transformation=LogsourceIndexedFieldMappingTransformation(mappings),
+            )
+        ],
+    )
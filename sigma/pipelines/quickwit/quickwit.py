@@ -1,12 +1,28 @@
 from sigma.pipelines.common import logsource_windows, windows_logsource_mapping
 from sigma.pipelines.base import Pipeline
+from sigma.processing.conditions import LogsourceCondition
 from sigma.processing.transformations import (
     FieldMappingTransformation,
+    SetStateTransformation,
 )
 from sigma.processing.pipeline import (
     ProcessingItem,
     ProcessingPipeline,
 )
+from typing import Dict, List, Optional
+
+from .mapping import windows_field_mapping
+from .state import index_state_key
+
+# Default routing of Sigma log sources to Quickwit indexes. Each entry consists of log source
+# attributes (product, category, service) and the index ID or pattern, more specific entries win.
+default_index_routing: List[Dict[str, str]] = [
+    {"product": "windows", "index": "windows-*"},
+    *(
+        {"product": "windows", "service": service, "index": f"windows-{service}"}
+        for service in windows_logsource_mapping
+    ),
+]
 
 # TODO: the following code is just an example extend/adapt as required.
 # See https://sigmahq-pysigma.readthedocs.io/en/latest/Processing_Pipelines.html for further documentation.
@@ -21,16 +37,59 @@ def quickwit_windows_pipeline() -> ProcessingPipeline:
         items=[
             ProcessingItem(  # This is an example for processing items generated from the mapping above.
                 identifier=f"quickwit_windows_{service}",
-                transformation=FieldMappingTransformation(
-                    {
-                        "EventID": "winlog.event_id",
-                        "Image": "process.executable",
-                        "CommandLine": "process.command_line",
-                        "OriginalFileName": "process.pe.original_file_name",
-                    }
-                ),
+                transformation=FieldMappingTransformation(windows_field_mapping),
                 rule_conditions=[logsource_windows(service)],
             )
             for service, source in windows_logsource_mapping.items()
         ],
     )
+
+
+# Not decorated with @Pipeline: the decorator is a singleton and would replace the windows pipeline.
+def quickwit_index_routing_pipeline(
+    index_routing: Optional[List[Dict[str, str]]] = None,
+    default_index: Optional[str] = None,
+) -> ProcessingPipeline:
+    """
+    Route rules to the Quickwit indexes of their log source. The index is stored in the pipeline
+    state and emitted by the search request output format of the backend.
+    """
+    routes = sorted(
+        default_index_routing if index_routing is None else index_routing,
+        key=lambda route: len(route) - ("index" in route),
+    )
+    items = (
+        [
+            ProcessingItem(
+                identifier="quickwit_index_default",
+                transformation=SetStateTransformation(index_state_key, default_index),
+            )
+        ]
+        if default_index is not None
+        else []
+    )
+    items.extend(
+        ProcessingItem(
+            identifier="quickwit_index_"
+            + "_".join(
+                route[attribute]
+                for attribute in ("product", "category", "service")
+                if attribute in route
+            ),
+            transformation=SetStateTransformation(index_state_key, route["index"]),
+            rule_conditions=[
+                LogsourceCondition(
+                    category=route.get("category"),
+                    product=route.get("product"),
+                    service=route.get("service"),
+                )
+            ],
+        )
+        for route in routes
+    )
+    return ProcessingPipeline(
+        name="Quickwit index routing",
+        allowed_backends=frozenset({"quickwit"}),
+        priority=20,
+        items=items,
+    )
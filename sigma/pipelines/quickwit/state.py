@@ -0,0 +1,2 @@
+# Pipeline state key holding the Quickwit index ID or index pattern a rule is routed to.
+index_state_key = "quickwit_index_id"
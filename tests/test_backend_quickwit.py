@@ -1,6 +1,10 @@
+import hashlib
+import json
+
 import pytest
 from sigma.collection import SigmaCollection
 from sigma.backends.quickwit import QuickwitBackend
+from sigma.exceptions import SigmaConfigurationError
 
 
 @pytest.fixture
@@ -119,7 +123,7 @@ def test_quickwit_regex_query(quickwit_backend: QuickwitBackend):
                     fieldB: foo
                 condition: sel
         """)
-    ) == ['fieldA:/foo.*bar/ AND fieldB:"foo"']
+    ) == ['fieldA:/.*foo.*bar.*/ AND fieldB:"foo"']
 
 
 def test_quickwit_cidr_query(quickwit_backend: QuickwitBackend):
@@ -138,6 +142,34 @@ def test_quickwit_cidr_query(quickwit_backend: QuickwitBackend):
     ) == ["field:[192.168.0.0 TO 192.168.255.255]"]
 
 
+def test_quickwit_cidr_list_merged(quickwit_backend: QuickwitBackend):
+    assert quickwit_backend.convert(
+        SigmaCollection.from_yaml("""
+            title: Test
+            status: test
+            logsource:
+                category: test_category
+                product: test_product
+            detection:
+                sel:
+                    field name|cidr:
+                        - 10.0.1.0/24
+                        - 10.0.0.0/24
+                        - 10.0.0.128/25
+                        - 10.0.2.0/23
+                        - 192.168.0.0/16
+                        - 2001:db8::/33
+                        - 2001:db8:8000::/33
+                filter:
+                    other: x
+                condition: sel and not filter
+        """)
+    ) == [
+        '("field name":[10.0.0.0 TO 10.0.3.255] OR "field name":[192.168.0.0 TO 192.168.255.255] '
+        'OR "field name":[2001:db8:: TO 2001:db8:ffff:ffff:ffff:ffff:ffff:ffff]) AND NOT other:"x"'
+    ]
+
+
 def test_quickwit_field_name_with_whitespace(quickwit_backend: QuickwitBackend):
     assert quickwit_backend.convert(
         SigmaCollection.from_yaml("""
@@ -187,6 +219,22 @@ def test_quickwit_range_query(quickwit_backend: QuickwitBackend):
     ) == ["fieldA:>100 AND fieldB:<200"]
 
 
+def test_quickwit_range_query_quoted_field(quickwit_backend: QuickwitBackend):
+    assert quickwit_backend.convert(
+        SigmaCollection.from_yaml("""
+            title: Test
+            status: test
+            logsource:
+                category: test_category
+                product: test_product
+            detection:
+                sel:
+                    field name|gte: 5
+                condition: sel
+        """)
+    ) == ['"field name":>=5']
+
+
 def test_quickwit_not_query(quickwit_backend: QuickwitBackend):
     assert quickwit_backend.convert(
         SigmaCollection.from_yaml("""
@@ -289,6 +337,41 @@ def test_quickwit_value_with_spaces(quickwit_backend: QuickwitBackend):
     ) == ['fieldA:"value with spaces"']
 
 
+def test_quickwit_value_with_quotes(quickwit_backend: QuickwitBackend):
+    assert quickwit_backend.convert(
+        SigmaCollection.from_yaml("""
+            title: Test
+            status: test
+            logsource:
+                category: test_category
+                product: test_product
+            detection:
+                sel:
+                    fieldA: 'say "hi"'
+                condition: sel
+        """)
+    ) == ['fieldA:"say \\"hi\\""']
+
+
+def test_quickwit_in_expression_escaped(quickwit_backend: QuickwitBackend):
+    assert quickwit_backend.convert(
+        SigmaCollection.from_yaml("""
+            title: Test
+            status: test
+            logsource:
+                category: test_category
+                product: test_product
+            detection:
+                sel:
+                    fieldA:
+                        - 'a b'
+                        - 'f(x)'
+                        - '"q"*'
+                condition: sel
+        """)
+    ) == ['fieldA:IN [a\\ b f\\(x\\) \\"q\\"*]']
+
+
 def test_quickwit_multiple_values(quickwit_backend: QuickwitBackend):
     assert quickwit_backend.convert(
         SigmaCollection.from_yaml("""
@@ -340,3 +423,397 @@ def test_quickwit_null_values(quickwit_backend: QuickwitBackend):
                 condition: sel
         """)
     ) == ["NOT fieldA:*"]
+
+
+search_request_rule = """
+    title: Test
+    id: 5013332f-8a70-4e04-bcc1-06a98a2cca2e
+    status: test
+    logsource:
+        category: test_category
+        product: test_product
+    detection:
+        sel:
+            fieldA: valueA
+        condition: sel
+"""
+
+
+def test_quickwit_search_request_output():
+    backend = QuickwitBackend(end_timestamp=1700000000, time_window="15m")
+    assert backend.convert(
+        SigmaCollection.from_yaml(search_request_rule), "search_request"
+    ) == [
+        {
+            "rule_id": "5013332f-8a70-4e04-bcc1-06a98a2cca2e",
+            "title": "Test",
+            "index_id": None,
+            "query_hash": hashlib.sha256(b'fieldA:"valueA"').hexdigest(),
+            "request": {
+                "query": 'fieldA:"valueA"',
+                "start_timestamp": 1699999100,
+                "end_timestamp": 1700000000,
+                "max_hits": 100,
+                "sort_by": "-timestamp",
+            },
+        }
+    ]
+
+
+def test_quickwit_search_request_options():
+    backend = QuickwitBackend(
+        start_timestamp="1600000000",
+        end_timestamp="1700000000",
+        max_hits="10",
+        timestamp_field="@timestamp",
+        search_field="message,body",
+    )
+    request = backend.convert(
+        SigmaCollection.from_yaml(search_request_rule), "search_request"
+    )[0]["request"]
+    assert request["start_timestamp"] == 1600000000
+    assert request["max_hits"] == 10
+    assert request["sort_by"] == "-@timestamp"
+    assert request["search_field"] == ["message", "body"]
+
+
+def test_quickwit_search_request_default_window():
+    request = QuickwitBackend().convert(
+        SigmaCollection.from_yaml(search_request_rule), "search_request"
+    )[0]["request"]
+    assert request["end_timestamp"] - request["start_timestamp"] == 3600
+
+
+def test_quickwit_search_request_invalid_window():
+    with pytest.raises(SigmaConfigurationError, match="Invalid timespan"):
+        QuickwitBackend(time_window="soon").convert(
+            SigmaCollection.from_yaml(search_request_rule), "search_request"
+        )
+
+
+def fused_rules(*logsources: str) -> SigmaCollection:
+    return SigmaCollection.from_yaml(
+        "\n---\n".join(
+            f"""
+title: Rule {i}
+id: 00000000-0000-0000-0000-00000000000{i}
+status: test
+logsource:
+    {logsource}
+detection:
+    sel:
+        fieldA: value{i}
+        fieldB: value{i}
+    condition: sel
+"""
+            for i, logsource in enumerate(logsources)
+        )
+    )
+
+
+def without_metadata(fused):
+    for query in fused:
+        assert (
+            query.pop("query_hash")
+            == hashlib.sha256(query["query"].encode()).hexdigest()
+        )
+        query.pop("cost", None)
+        without_metadata(query.get("attribution", []))
+    return fused
+
+
+def test_quickwit_fused_output():
+    fused = QuickwitBackend().convert(
+        fused_rules("{product: linux}", "{product: windows}", "{product: linux}"),
+        "fused",
+    )
+    for query in fused:
+        assert query.pop("request")["query"] == query["query"]
+    assert without_metadata(fused) == [
+        {
+            "title": "Fused query of 2 rules",
+            "index_id": None,
+            "logsource": {"product": "linux"},
+            "query": '(fieldA:"value0" AND fieldB:"value0") OR (fieldA:"value2" AND fieldB:"value2")',
+            "attribution": [
+                {
+                    "rule_id": "00000000-0000-0000-0000-000000000000",
+                    "title": "Rule 0",
+                    "query": 'fieldA:"value0" AND fieldB:"value0"',
+                },
+                {
+                    "rule_id": "00000000-0000-0000-0000-000000000002",
+                    "title": "Rule 2",
+                    "query": 'fieldA:"value2" AND fieldB:"value2"',
+                },
+            ],
+        },
+        {
+            "title": "Rule 1",
+            "index_id": None,
+            "logsource": {"product": "windows"},
+            "query": 'fieldA:"value1" AND fieldB:"value1"',
+            "attribution": [
+                {
+                    "rule_id": "00000000-0000-0000-0000-000000000001",
+                    "title": "Rule 1",
+                    "query": 'fieldA:"value1" AND fieldB:"value1"',
+                },
+            ],
+        },
+    ]
+
+
+def test_quickwit_fused_groups_by_index():
+    fused = QuickwitBackend(index_id="logs").convert(
+        fused_rules("{product: linux}", "{product: windows}"), "fused"
+    )
+    assert len(fused) == 1
+    assert fused[0]["index_id"] == "logs"
+
+
+@pytest.mark.parametrize(
+    "options,sizes",
+    [
+        ({"fused_max_clauses": "4"}, [2, 2, 1]),
+        ({"fused_max_clauses": "5"}, [2, 2, 1]),
+        ({"fused_max_clauses": "2"}, [1, 1, 1, 1, 1]),
+        ({"fused_max_bytes": "80"}, [2, 2, 1]),
+        ({"fused_max_bytes": "10"}, [1, 1, 1, 1, 1]),
+    ],
+)
+def test_quickwit_fused_budget(options, sizes):
+    fused = QuickwitBackend(**options).convert(
+        fused_rules(*["{product: linux}"] * 5), "fused"
+    )
+    assert [len(query["attribution"]) for query in fused] == sizes
+
+
+def test_quickwit_fused_in_list_clauses():
+    rules = SigmaCollection.from_yaml(
+        "\n---\n".join(
+            f"""
+title: Rule {i}
+status: test
+logsource:
+    product: linux
+detection:
+    sel:
+        fieldA: [a{i}, b{i}, c{i}]
+    condition: sel
+"""
+            for i in range(3)
+        )
+    )
+    fused = QuickwitBackend(fused_max_clauses="6").convert(rules, "fused")
+    assert [len(query["attribution"]) for query in fused] == [2, 1]
+
+
+def test_quickwit_fused_search_request():
+    (fused,) = QuickwitBackend(
+        end_timestamp=1700000000, time_window="15m", index_id="logs"
+    ).convert(fused_rules("{product: linux}", "{product: linux}"), "fused")
+    assert fused["request"] == {
+        "query": fused["query"],
+        "start_timestamp": 1699999100,
+        "end_timestamp": 1700000000,
+        "max_hits": 100,
+        "sort_by": "-timestamp",
+    }
+
+
+def test_quickwit_ndjson_output():
+    lines = (
+        QuickwitBackend()
+        .convert(fused_rules("{product: linux}", "{service: sshd}"), "ndjson")
+        .split("\n")
+    )
+    assert without_metadata([json.loads(line) for line in lines]) == [
+        {
+            "rule_id": "00000000-0000-0000-0000-000000000000",
+            "title": "Rule 0",
+            "index_id": None,
+            "logsource": {"product": "linux"},
+            "query": 'fieldA:"value0" AND fieldB:"value0"',
+        },
+        {
+            "rule_id": "00000000-0000-0000-0000-000000000001",
+            "title": "Rule 1",
+            "index_id": None,
+            "logsource": {"service": "sshd"},
+            "query": 'fieldA:"value1" AND fieldB:"value1"',
+        },
+    ]
+
+
+def test_quickwit_convert_iter():
+    backend = QuickwitBackend()
+    queries = backend.convert_iter(fused_rules(*["{product: linux}"] * 3))
+    assert next(queries) == 'fieldA:"value0" AND fieldB:"value0"'
+    assert list(queries) == [
+        'fieldA:"value1" AND fieldB:"value1"',
+        'fieldA:"value2" AND fieldB:"value2"',
+    ]
+
+
+def test_quickwit_convert_iter_ndjson():
+    rules = fused_rules(*["{product: linux}"] * 3)
+    assert "\n".join(QuickwitBackend().convert_iter(rules, "ndjson")) == (
+        QuickwitBackend().convert(rules, "ndjson")
+    )
+
+
+def test_quickwit_convert_iter_fused():
+    with pytest.raises(SigmaConfigurationError, match="can't be converted iteratively"):
+        next(QuickwitBackend().convert_iter(fused_rules("{product: linux}"), "fused"))
+
+
+def test_quickwit_and_with_or_grouped(quickwit_backend: QuickwitBackend):
+    assert quickwit_backend.convert(
+        SigmaCollection.from_yaml("""
+            title: Test
+            status: test
+            logsource:
+                category: test_category
+                product: test_product
+            detection:
+                sel1:
+                    fieldA: valueA
+                sel2:
+                    fieldB: valueB
+                sel3:
+                    fieldC: valueC
+                condition: sel1 and (sel2 or sel3)
+        """)
+    ) == ['fieldA:"valueA" AND (fieldB:"valueB" OR fieldC:"valueC")']
+
+
+def test_quickwit_not_group(quickwit_backend: QuickwitBackend):
+    assert quickwit_backend.convert(
+        SigmaCollection.from_yaml("""
+            title: Test
+            status: test
+            logsource:
+                category: test_category
+                product: test_product
+            detection:
+                sel:
+                    fieldA: valueA
+                    fieldB: valueB
+                condition: not sel
+        """)
+    ) == ['NOT (fieldA:"valueA" AND fieldB:"valueB")']
+
+
+def test_quickwit_in_expression_numbers(quickwit_backend: QuickwitBackend):
+    assert quickwit_backend.convert(
+        SigmaCollection.from_yaml("""
+            title: Test
+            status: test
+            logsource:
+                category: test_category
+                product: test_product
+            detection:
+                sel:
+                    EventID:
+                        - 4624
+                        - 4625
+                condition: sel
+        """)
+    ) == ["EventID:IN [4624 4625]"]
+
+
+def canonical_query(condition: str, sel1: str, sel2: str) -> str:
+    return QuickwitBackend(canonical="true", optimize="false").convert(
+        SigmaCollection.from_yaml(f"""
+            title: Test
+            status: test
+            logsource:
+                category: test_category
+                product: test_product
+            detection:
+                sel1:
+                    {sel1}
+                sel2:
+                    {sel2}
+                sel3:
+                    fieldC: valueC
+                condition: {condition}
+        """)
+    )[0]
+
+
+def test_quickwit_canonical_order():
+    assert (
+        canonical_query("sel1 or sel2", "fieldA: [c, a, b, a]", "fieldB: x")
+        == canonical_query("sel2 or sel1", "fieldA: [a, b, c]", "fieldB: x")
+        == 'fieldA:IN [a b c] OR fieldB:"x"'
+    )
+
+
+def test_quickwit_canonical_flatten_and_dedupe():
+    assert (
+        canonical_query("(sel3 and (sel1 and sel2)) and sel1", "fieldA: a", "fieldB: b")
+        == canonical_query("sel2 and sel3 and sel1", "fieldA: a", "fieldB: b")
+        == 'fieldA:"a" AND fieldB:"b" AND fieldC:"valueC"'
+    )
+
+
+def test_quickwit_canonical_nested_or():
+    assert (
+        canonical_query("sel3 or (sel2 or sel1)", "{fieldA: a, fieldB: b}", "fieldB: b")
+        == '(fieldA:"a" AND fieldB:"b") OR fieldB:"b" OR fieldC:"valueC"'
+    )
+
+
+def test_quickwit_canonical_query_hash():
+    rules = [
+        f"""
+title: Test
+status: test
+logsource:
+    product: test_product
+detection:
+    sel:
+        fieldA: {values}
+    condition: sel
+"""
+        for values in ("[x, y]", "[y, x]")
+    ]
+    hashes = {
+        QuickwitBackend(canonical=True).convert(
+            SigmaCollection.from_yaml(rule), "search_request"
+        )[0]["query_hash"]
+        for rule in rules
+    }
+    assert len(hashes) == 1
+
+
+@pytest.mark.parametrize(
+    "condition,expected",
+    [
+        ("sel and not filter", '({}) AND NOT User:"admin"'),
+        ("not sel", "NOT ({})"),
+        ("sel or filter", '({}) OR User:"admin"'),
+    ],
+)
+def test_quickwit_modifier_expansion_grouped(condition, expected):
+    (query,) = QuickwitBackend().convert(
+        SigmaCollection.from_yaml(f"""
+            title: Test
+            status: test
+            logsource:
+                category: test_category
+                product: test_product
+            detection:
+                sel:
+                    CommandLine|windash|contains: ' -enc '
+                filter:
+                    User: admin
+                condition: {condition}
+        """)
+    )
+    variants = " OR ".join(
+        f'CommandLine:"* {dash}enc *"' for dash in ("-", "/", "–", "—", "―")
+    )
+    assert query == expected.format(variants)
@@ -0,0 +1,90 @@
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.pipelines.quickwit import quickwit_windows_pipeline
+
+
+def rule_yaml(i: int, field: str = "fieldA") -> str:
+    return f"""
+title: Test {i}
+status: test
+logsource:
+    product: windows
+    service: sysmon
+detection:
+    sel:
+        {field}: value{i}
+    condition: sel
+"""
+
+
+@pytest.fixture
+def rule_collection():
+    return SigmaCollection.from_yaml("\n---\n".join(rule_yaml(i) for i in range(20)))
+
+
+def test_quickwit_batch_matches_sequential(rule_collection):
+    expected = QuickwitBackend(quickwit_windows_pipeline()).convert(rule_collection)
+    result = QuickwitBackend(quickwit_windows_pipeline()).convert_batch(
+        rule_collection, max_workers=2, chunksize=3
+    )
+    assert result.output == expected
+    assert result.errors == []
+
+
+def test_quickwit_batch_in_process(rule_collection):
+    result = QuickwitBackend().convert_batch(rule_collection, max_workers=1)
+    assert result.output == [f'fieldA:"value{i}"' for i in range(20)]
+
+
+def test_quickwit_batch_collects_errors():
+    rule_collection = SigmaCollection.from_yaml(
+        "\n---\n".join(
+            [
+                rule_yaml(0),
+                """
+title: Unsupported
+status: test
+logsource:
+    product: windows
+    service: sysmon
+detection:
+    sel:
+        fieldA|fieldref: fieldB
+    condition: sel
+""",
+                rule_yaml(2),
+            ]
+        )
+    )
+    result = QuickwitBackend().convert_batch(
+        rule_collection, max_workers=2, chunksize=1
+    )
+    assert result.output == ['fieldA:"value0"', 'fieldA:"value2"']
+    assert [rule.title for rule, _ in result.errors] == ["Unsupported"]
+
+
+def test_quickwit_batch_worker_metrics():
+    rule_collection = SigmaCollection.from_yaml(
+        "\n---\n".join(
+            rule_yaml(i).replace(
+                "condition: sel",
+                "filter:\n        fieldB: [x, x]\n    condition: sel and not filter",
+            )
+            for i in range(8)
+        )
+    )
+    sequential = QuickwitBackend(instrument=True)
+    sequential.convert(rule_collection)
+    backend = QuickwitBackend(instrument=True)
+    backend.convert_batch(rule_collection, max_workers=2, chunksize=3)
+    assert [metrics.title for metrics in backend.instrumentation.records] == [
+        f"Test {i}" for i in range(8)
+    ]
+    assert all(metrics.queries == 1 for metrics in backend.instrumentation.records)
+    assert backend.optimizer_report == sequential.optimizer_report
+    assert set(backend.optimizer_report.values()) == {1}
+    assert (
+        backend.memo.hits + backend.memo.misses
+        == sequential.memo.hits + sequential.memo.misses
+    )
@@ -0,0 +1,236 @@
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.backends.quickwit.cache import (
+    ConversionCache,
+    SubtreeMemo,
+    pipeline_fingerprint,
+)
+from sigma.pipelines.quickwit import quickwit_windows_pipeline
+
+
+def rules(*values: str) -> SigmaCollection:
+    return SigmaCollection.from_yaml(
+        "\n---\n".join(
+            f"""
+title: Test {value}
+status: test
+logsource:
+    product: windows
+    service: sysmon
+detection:
+    sel:
+        Image: {value}
+    condition: sel
+"""
+            for value in values
+        )
+    )
+
+
+def test_quickwit_cache_hits(tmp_path):
+    backend = QuickwitBackend(quickwit_windows_pipeline(), cache_dir=str(tmp_path))
+    expected = ['process.executable:"a"', 'process.executable:"b"']
+    assert backend.convert(rules("a", "b")) == expected
+    assert backend.cache.stats()["misses"] == 2
+
+    backend = QuickwitBackend(quickwit_windows_pipeline(), cache_dir=str(tmp_path))
+    assert backend.convert(rules("a", "b")) == expected
+    assert backend.convert(rules("a", "c")) == [
+        'process.executable:"a"',
+        'process.executable:"c"',
+    ]
+    assert backend.cache.stats()["hits"] == 3
+    assert backend.cache.stats()["misses"] == 1
+
+
+def test_quickwit_cache_keyed_by_pipeline_and_options(tmp_path):
+    QuickwitBackend(quickwit_windows_pipeline(), cache_dir=str(tmp_path)).convert(
+        rules("a")
+    )
+
+    backend = QuickwitBackend(cache_dir=str(tmp_path))
+    assert backend.convert(rules("a")) == ['Image:"a"']
+    assert backend.cache.hits == 0
+
+    backend = QuickwitBackend(
+        quickwit_windows_pipeline(), cache_dir=str(tmp_path), option="x"
+    )
+    backend.convert(rules("a"))
+    assert backend.cache.hits == 0
+
+
+def test_quickwit_cache_pipeline_fingerprint_ignores_runtime_state():
+    pipeline = quickwit_windows_pipeline()
+    fingerprint = pipeline_fingerprint(pipeline)
+    QuickwitBackend(pipeline).convert(rules("a"))
+    assert pipeline_fingerprint(pipeline) == fingerprint
+
+
+def test_quickwit_cache_eviction(tmp_path):
+    cache = ConversionCache(tmp_path, max_bytes=40)
+    cache.put("aa01", ["x" * 10])
+    cache.put("aa02", ["y" * 10])
+    cache.put("aa03", ["z" * 10])
+    assert cache.evictions == 1
+    assert cache.size <= 40
+    assert cache.get("aa03") == ["z" * 10]
+
+
+def test_quickwit_cache_eviction_low_water(tmp_path):
+    cache = ConversionCache(tmp_path, max_bytes=100)
+    for i in range(8):
+        cache.put(f"aa0{i}", ["x" * 10])
+    # 8 entries of 14 bytes are evicted down to 80 bytes, the next put doesn't evict again
+    assert cache.evictions == 3
+    assert cache.size == 70
+    cache.put("aa08", ["x" * 10])
+    assert cache.evictions == 3
+
+
+def test_quickwit_cache_eviction_shared_directory(tmp_path, monkeypatch):
+    cache = ConversionCache(tmp_path, max_bytes=40)
+    cache.put("aa01", ["x" * 10])
+    cache.put("aa02", ["y" * 10])
+    entries = cache._entries()
+    # Another process evicts the entries after they were listed
+    monkeypatch.setattr(cache, "_entries", lambda: entries)
+    for entry in entries:
+        entry.unlink()
+    cache.put("aa03", ["z" * 10])
+    assert cache.get("aa03") == ["z" * 10]
+    cache.evict()
+    assert cache.size == 0
+
+
+def test_quickwit_cache_search_request_time_range(tmp_path, monkeypatch):
+    clock = iter(range(1000000, 2000000, 100))
+    monkeypatch.setattr(
+        "sigma.backends.quickwit.quickwit.time.time", lambda: next(clock)
+    )
+    backend = QuickwitBackend(cache_dir=str(tmp_path), time_window="10m")
+    first = backend.convert(rules("a", "b"), "search_request")
+    assert [record["request"]["end_timestamp"] for record in first] == [1000000] * 2
+    assert first[0]["request"]["start_timestamp"] == 1000000 - 600
+
+    backend = QuickwitBackend(cache_dir=str(tmp_path), time_window="10m")
+    second = backend.convert(rules("a", "b"), "search_request")
+    assert backend.cache.hits == 2
+    assert [record["request"]["end_timestamp"] for record in second] == [1000100] * 2
+    assert second[0]["request"]["start_timestamp"] == 1000100 - 600
+    assert [record["request"]["query"] for record in second] == [
+        'Image:"a"',
+        'Image:"b"',
+    ]
+
+
+@pytest.mark.parametrize("content", ["{", "not json"])
+def test_quickwit_cache_corrupt_entry(tmp_path, content):
+    cache = ConversionCache(tmp_path)
+    cache.put("aa01", ["x"])
+    (tmp_path / "aa" / "aa01.json").write_text(content)
+    assert cache.get("aa01") is None
+    assert cache.misses == 1
+
+
+def shared_filter_rules(*values: str) -> SigmaCollection:
+    return SigmaCollection.from_yaml(
+        "\n---\n".join(
+            f"""
+title: Test {value}
+status: test
+logsource:
+    product: windows
+    service: sysmon
+detection:
+    sel:
+        Image|endswith: {value}
+    filter:
+        ParentImage|endswith:
+            - '\\explorer.exe'
+            - '\\svchost.exe'
+        User: SYSTEM
+    condition: sel and not filter
+"""
+            for value in values
+        )
+    )
+
+
+def test_quickwit_subtree_memo():
+    backend = QuickwitBackend(quickwit_windows_pipeline())
+    queries = backend.convert(shared_filter_rules("a", "b", "c"))
+    assert queries == [
+        f'process.executable:"*{value}" AND NOT (ParentImage:IN '
+        '[*\\\\explorer.exe *\\\\svchost.exe] AND User:"SYSTEM")'
+        for value in "abc"
+    ]
+    stats = backend.memo.stats()
+    # The negated filter is converted once, only the root expression differs between rules
+    assert (stats["hits"], stats["misses"]) == (2, 6)
+    assert stats["hit_rate"] == pytest.approx(0.25)
+    assert (
+        QuickwitBackend(quickwit_windows_pipeline(), memo_max_entries="0").convert(
+            shared_filter_rules("a", "b", "c")
+        )
+        == queries
+    )
+
+
+def test_quickwit_subtree_memo_escaped_values():
+    # An escaped * and a backslash before a wildcard are different values
+    backend = QuickwitBackend()
+    assert backend.convert(
+        SigmaCollection.from_yaml(
+            "\n---\n".join(
+                f"""
+title: Test
+status: test
+logsource:
+    product: windows
+detection:
+    sel:
+        Image: ['{value}', x]
+    condition: sel
+"""
+                for value in (r"a\*", r"a\\*")
+            )
+        )
+    ) == [r"Image:IN [a\* x]", r"Image:IN [a\\* x]"]
+    assert backend.memo.hits == 0
+
+
+def test_quickwit_subtree_memo_eviction():
+    memo = SubtreeMemo(max_entries=2, max_bytes=10)
+    memo.put("a", "1234")
+    memo.put("b", "1234")
+    assert memo.get("a") == "1234"
+    memo.put("c", "1234")  # Evicts b, the least recently used entry
+    assert memo.get("b") is None
+    memo.put("d", "123456")  # Exceeds max_bytes
+    assert list(memo.entries) == ["c", "d"]
+    assert memo.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 2,
+        "entries": 2,
+        "size": 10,
+        "hit_rate": 0.5,
+    }
+
+
+def test_quickwit_cache_keyed_by_doc_mapping(tmp_path):
+    index_config = tmp_path / "index_config.yaml"
+    cache_dir = str(tmp_path / "cache")
+    index_config.write_text(
+        "doc_mapping:\n  field_mappings:\n    - {name: Image, type: text}\n"
+    )
+    backend = QuickwitBackend(cache_dir=cache_dir, index_config=str(index_config))
+    assert backend.convert(rules("a")) == ['Image:"a"']
+
+    index_config.write_text(
+        "doc_mapping:\n  field_mappings:\n    - {name: Image, type: text, tokenizer: raw}\n"
+    )
+    backend = QuickwitBackend(cache_dir=cache_dir, index_config=str(index_config))
+    assert backend.convert(rules("a")) == ["Image:a"]
+    assert backend.cache.hits == 0
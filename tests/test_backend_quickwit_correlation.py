@@ -0,0 +1,202 @@
+import json
+
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.exceptions import SigmaFeatureNotSupportedByBackendError
+
+base_rules = """
+title: Failed logon
+name: failed_logon
+status: test
+logsource:
+    product: windows
+    service: security
+detection:
+    sel:
+        EventID: 4625
+    condition: sel
+---
+title: Successful logon
+name: successful_logon
+status: test
+logsource:
+    product: windows
+    service: security
+detection:
+    sel:
+        EventID: 4624
+    condition: sel
+---
+"""
+
+
+def convert(correlation: str, output_format: str = "search_request", **options):
+    """Converted correlation records, without queries of rules not referenced by it."""
+    output = QuickwitBackend(end_timestamp=10000, time_window="1h", **options).convert(
+        SigmaCollection.from_yaml(
+            base_rules
+            + f"""
+title: Correlation
+id: 0e95725d-7320-415d-80f7-004da920fc11
+status: test
+correlation:
+{correlation}
+"""
+        ),
+        output_format,
+    )
+    if output_format == "ndjson":
+        output = [json.loads(line) for line in output.splitlines()]
+    return [record for record in output if "correlation" in record]
+
+
+event_count = """
+    type: event_count
+    rules:
+        - failed_logon
+    group-by:
+        - TargetUserName
+        - IpAddress
+    timespan: 5m
+    condition:
+        gte: 10
+"""
+
+
+def test_quickwit_correlation_event_count():
+    (record,) = convert(event_count)
+    assert record["correlation"] == {
+        "type": "event_count",
+        "group_by": ["TargetUserName", "IpAddress"],
+        "timespan": 300,
+        "condition": {"op": "gte", "count": 10},
+        "rules": ["failed_logon"],
+    }
+    assert record["request"] == {
+        "query": "EventID:4625",
+        "start_timestamp": 6400,
+        "end_timestamp": 10000,
+        "max_hits": 0,
+        "aggs": {
+            "TargetUserName": {
+                "terms": {"field": "TargetUserName", "size": 1000},
+                "aggs": {
+                    "IpAddress": {
+                        "terms": {"field": "IpAddress", "size": 1000},
+                        "aggs": {
+                            "window": {
+                                "date_histogram": {
+                                    "field": "timestamp",
+                                    "fixed_interval": "300s",
+                                    "min_doc_count": 10,
+                                }
+                            }
+                        },
+                    }
+                },
+            }
+        },
+    }
+
+
+def test_quickwit_correlation_time_range_covers_timespan():
+    (record,) = convert(event_count.replace("timespan: 5m", "timespan: 2h"))
+    assert (
+        record["request"]["start_timestamp"],
+        record["request"]["end_timestamp"],
+    ) == (2800, 10000)
+
+
+@pytest.mark.parametrize(
+    "condition,expected", [("gt: 10", 11), ("eq: 3", 3), ("lte: 3", 1)]
+)
+def test_quickwit_correlation_event_count_min_doc_count(condition, expected):
+    (record,) = convert(
+        f"""
+    type: event_count
+    rules:
+        - failed_logon
+        - successful_logon
+    timespan: 1h
+    condition:
+        {condition}
+""",
+        correlation_bucket_size="10",
+        timestamp_field="ts",
+    )
+    assert record["request"]["query"] == "(EventID:4625) OR (EventID:4624)"
+    assert record["request"]["aggs"] == {
+        "window": {
+            "date_histogram": {
+                "field": "ts",
+                "fixed_interval": "3600s",
+                "min_doc_count": expected,
+            }
+        }
+    }
+
+
+def test_quickwit_correlation_value_count():
+    (record,) = convert("""
+    type: value_count
+    rules:
+        - failed_logon
+    group-by:
+        - IpAddress
+    timespan: 1h
+    condition:
+        field: TargetUserName
+        gt: 5
+""")
+    assert record["correlation"]["field"] == "TargetUserName"
+    assert record["request"]["aggs"]["IpAddress"]["aggs"]["window"]["aggs"] == {
+        "value_count": {"cardinality": {"field": "TargetUserName"}}
+    }
+
+
+temporal = """
+    type: temporal
+    rules:
+        - failed_logon
+        - successful_logon
+    group-by:
+        - user
+    aliases:
+        user:
+            failed_logon: TargetUserName
+            successful_logon: SubjectUserName
+    timespan: 10m
+    condition:
+        gte: 2
+"""
+
+
+def test_quickwit_correlation_temporal():
+    records = convert(temporal)
+    assert [
+        (record["correlation"]["rule"], record["request"]["query"])
+        for record in records
+    ] == [("failed_logon", "EventID:4625"), ("successful_logon", "EventID:4624")]
+    assert [
+        record["request"]["aggs"]["user"]["terms"]["field"] for record in records
+    ] == ["TargetUserName", "SubjectUserName"]
+
+
+def test_quickwit_correlation_alias_conflict():
+    with pytest.raises(SigmaFeatureNotSupportedByBackendError, match="alias 'user'"):
+        convert(temporal.replace("temporal", "event_count"))
+
+
+def test_quickwit_correlation_index_routing():
+    (record,) = convert(event_count, index_id="logs")
+    assert record["index_id"] == "logs"
+
+
+@pytest.mark.parametrize("output_format", ["default", "fused"])
+def test_quickwit_correlation_output_formats(output_format):
+    assert convert(event_count, output_format) == convert(event_count)
+
+
+def test_quickwit_correlation_ndjson():
+    assert convert(event_count, "ndjson") == convert(event_count)
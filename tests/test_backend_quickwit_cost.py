@@ -0,0 +1,181 @@
+import json
+import time
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.backends.quickwit.cost import QueryCostEstimator
+from sigma.backends.quickwit.quickwit import QuickwitQueryCostWarning
+from sigma.backends.quickwit.query import (
+    QueryAnd,
+    QueryClause,
+    QueryNot,
+    QueryOr,
+    parse_query,
+)
+from sigma.exceptions import SigmaBackendError, SigmaConfigurationError, SigmaValueError
+from sigma.types import SpecialChars
+
+W = SpecialChars.WILDCARD_MULTI
+
+
+def test_quickwit_query_parser():
+    assert parse_query(
+        'a:"x*" AND (b:IN [1 c*] OR NOT "d e":/f\\/g/) AND NOT c:[1 TO 2} OR d:>=5 AND e:*'
+    ) == QueryOr(
+        (
+            QueryAnd(
+                (
+                    QueryClause("a", "phrase", ("x", W)),
+                    QueryOr(
+                        (
+                            QueryClause("b", "in", (("1",), ("c", W))),
+                            QueryNot(QueryClause("d e", "regex", "f/g")),
+                        )
+                    ),
+                    QueryNot(QueryClause("c", "range", ("1", "2", True, False))),
+                )
+            ),
+            QueryAnd(
+                (
+                    QueryClause("d", "compare", (">=", "5")),
+                    QueryClause("e", "exists"),
+                )
+            ),
+        )
+    )
+
+
+def test_quickwit_query_parser_escapes():
+    assert parse_query('a:C\\:\\\\x\\ y* AND b:"q\\"\\*"') == QueryAnd(
+        (
+            QueryClause("a", "term", ("C:\\x y", W)),
+            QueryClause("b", "phrase", ('q"*',)),
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "query", ['a:"x', "a:/x", "(a:x", "a:x b", "a", "a:[1 2]", "a:IN [x", "a:IN [x)]"]
+)
+def test_quickwit_query_parser_errors(query):
+    with pytest.raises(SigmaValueError):
+        parse_query(query)
+
+
+def test_quickwit_query_cost_metrics():
+    cost = QueryCostEstimator().estimate(
+        'a:"*x*" AND b:/.*y/ AND c:IN [1 2 3] AND (d:"x*" OR e:[1 TO 2])'
+    )
+    assert cost.clauses == 5
+    assert cost.leading_wildcards == 1
+    assert cost.prefix_wildcards == 1
+    assert cost.regexes == 1
+    assert cost.in_list_values == 3
+    assert cost.max_in_list_size == 3
+    assert cost.ranges == 1
+    assert cost.depth == 3
+    assert cost.score == 50 + 100 + (1 + 3 * 0.5) + 5 + 10 + 3 * 2
+
+
+def test_quickwit_query_cost_ordering():
+    estimator = QueryCostEstimator()
+    assert (
+        estimator.estimate('a:"x"').score
+        < estimator.estimate('a:"x*"').score
+        < estimator.estimate('a:"*x"').score
+        < estimator.estimate("a:/x/").score
+    )
+
+
+def rule_collection(detection: str) -> SigmaCollection:
+    return SigmaCollection.from_yaml(f"""
+        title: Expensive
+        status: test
+        logsource:
+            product: test_product
+        detection:
+            sel:
+                {detection}
+            condition: sel
+    """)
+
+
+def test_quickwit_cost_budget_warning():
+    backend = QuickwitBackend(cost_budget="20")
+    with pytest.warns(QuickwitQueryCostWarning, match="'Expensive' exceeds budget 20"):
+        assert backend.convert(rule_collection("fieldA|contains: x")) == [
+            'fieldA:"*x*"'
+        ]
+
+
+def test_quickwit_cost_budget_within():
+    backend = QuickwitBackend(cost_budget="20", cost_budget_action="reject")
+    assert backend.convert(rule_collection("fieldA: x")) == ['fieldA:"x"']
+
+
+def test_quickwit_cost_budget_reject():
+    backend = QuickwitBackend(cost_budget="20", cost_budget_action="reject")
+    with pytest.raises(SigmaBackendError, match="exceeds budget"):
+        backend.convert(rule_collection("fieldA|re: .*x"))
+
+
+def test_quickwit_cost_budget_reject_collected():
+    backend = QuickwitBackend(
+        collect_errors=True, cost_budget="20", cost_budget_action="reject"
+    )
+    assert backend.convert(rule_collection("fieldA|re: .*x")) == []
+    assert len(backend.errors) == 1
+
+
+def test_quickwit_cost_budget_invalid_action():
+    with pytest.raises(SigmaConfigurationError, match="cost_budget_action"):
+        QuickwitBackend(cost_budget_action="ignore")
+
+
+def test_quickwit_query_cost_option():
+    assert (
+        "cost"
+        not in QuickwitBackend().convert(
+            rule_collection("fieldA: x"), "search_request"
+        )[0]
+    )
+    assert (
+        QuickwitBackend(query_cost="true").convert(
+            rule_collection("fieldA: x"), "search_request"
+        )[0]["cost"]
+        == 4
+    )
+
+
+def test_quickwit_query_cost_unparsable():
+    backend = QuickwitBackend(query_cost="true", cost_budget="20", instrument="true")
+    record = json.loads(
+        backend.convert(rule_collection("'a\"b': x"), "ndjson").splitlines()[0]
+    )
+    assert record["query"] == '"a"b":"x"'
+    assert record["cost"] is None
+    assert backend.instrumentation.records[0].queries == 1
+
+
+def test_quickwit_fused_clauses_without_estimate():
+    fused = QuickwitBackend().convert(
+        rule_collection("""'a"b': x
+                fieldA:
+                    - x
+                    - y"""),
+        "fused",
+    )
+    assert [query["query"] for query in fused] == ['"a"b":"x" AND fieldA:IN [x y]']
+    assert "cost" not in fused[0]["attribution"][0]
+
+
+@pytest.mark.benchmark
+def test_quickwit_query_parser_linear_time():
+    def parse_time(clauses):
+        query = " OR ".join(f'f{i}:"v{i}"' for i in range(clauses))
+        start = time.perf_counter()
+        parse_query(query)
+        return time.perf_counter() - start
+
+    # Lenient bound against timing noise, quadratic growth would be 16 times slower
+    assert parse_time(40000) < 8 * parse_time(10000)
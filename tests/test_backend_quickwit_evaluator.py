@@ -0,0 +1,137 @@
+import json
+
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.backends.quickwit.evaluator import QuickwitQueryEvaluator, compile_query
+
+
+def convert(detection: str, condition: str = "sel", **options) -> str:
+    return QuickwitBackend(**options).convert(
+        SigmaCollection.from_yaml(f"""
+            title: Test
+            status: test
+            logsource:
+                product: test_product
+            detection:
+                {detection}
+                condition: {condition}
+        """)
+    )[0]
+
+
+@pytest.mark.parametrize(
+    "detection,event,expected",
+    [
+        ("sel: {fieldA: valueA}", {"fieldA": "VALUEA"}, True),
+        ("sel: {fieldA: valueA}", {"fieldA": "valueA2"}, False),
+        ("sel: {fieldA: valueA}", {"fieldB": "valueA"}, False),
+        ("sel: {fieldA|contains: 'x y'}", {"fieldA": "a x y b"}, True),
+        ("sel: {fieldA|startswith: abc}", {"fieldA": "abcd"}, True),
+        ("sel: {fieldA|endswith: abc}", {"fieldA": "abcd"}, False),
+        ("sel: {fieldA: 'a*b*c'}", {"fieldA": "axxbyyc"}, True),
+        ("sel: {fieldA: [x, y, 'z*']}", {"fieldA": "zz"}, True),
+        ("sel: {fieldA: [x, y, 'z*']}", {"fieldA": "w"}, False),
+        ("sel: {EventID: [4624, 4625]}", {"EventID": 4625}, True),
+        ("sel: {fieldA|re: 'fo+b'}", {"fieldA": "xfoooba"}, True),
+        ("sel: {fieldA|gt: 10}", {"fieldA": 10}, False),
+        ("sel: {fieldA|gte: 10}", {"fieldA": "10"}, True),
+        ("sel: {fieldA|lt: 10}", {"fieldA": "a"}, False),
+        ("sel: {ip|cidr: 10.0.0.0/8}", {"ip": "10.1.2.3"}, True),
+        ("sel: {ip|cidr: 10.0.0.0/8}", {"ip": "11.1.2.3"}, False),
+        ("sel: {fieldA: '*'}", {"fieldA": ""}, True),
+        ("sel: {fieldA: null}", {"fieldA": None}, True),
+        ("sel: {fieldA: null}", {"fieldA": "x"}, False),
+        ("sel: {a.b: x}", {"a": {"b": "x"}}, True),
+        ("sel: {a.b: x}", {"a.b": "x"}, True),
+        ("sel: {fieldA: x}", {"fieldA": ["y", "x"]}, True),
+        ("sel: {fieldA: 'C:\\Windows\\\\*'}", {"fieldA": "c:\\windows\\x.exe"}, True),
+        ("sel: {fieldA: 'x\\*'}", {"fieldA": "x*"}, True),
+        ("sel: {fieldA: 'x\\*'}", {"fieldA": "xy"}, False),
+        ("sel: {fieldA: 'a \"b'}", {"fieldA": 'a "B'}, True),
+        ("sel: {fieldA: ['a b', 'c)']}", {"fieldA": "c)"}, True),
+        ("sel: {fieldA: ['a b', 'c)']}", {"fieldA": "a"}, False),
+    ],
+)
+def test_quickwit_evaluator_semantics(detection, event, expected):
+    assert compile_query(convert(detection))(event) is expected
+
+
+@pytest.mark.parametrize(
+    "condition,expected",
+    [
+        ("sel and not filter", [True, False, False, False]),
+        ("sel or filter", [True, True, True, False]),
+        ("not (sel or filter)", [False, False, False, True]),
+    ],
+)
+def test_quickwit_evaluator_boolean(condition, expected):
+    matcher = compile_query(
+        convert("sel: {fieldA: a}\n                filter: {fieldB: b}", condition)
+    )
+    events = [
+        {"fieldA": "a"},
+        {"fieldA": "a", "fieldB": "b"},
+        {"fieldB": "b"},
+        {},
+    ]
+    assert [matcher(event) for event in events] == expected
+
+
+def test_quickwit_evaluator_raw_term():
+    matcher = compile_query("fieldA:Value* AND fieldB:1.2.3.4")
+    assert matcher({"fieldA": "ValueX", "fieldB": "1.2.3.4"})
+    assert not matcher({"fieldA": "valueX", "fieldB": "1.2.3.4"})
+
+
+def test_quickwit_evaluator_split_records():
+    records = QuickwitBackend(split_max_clauses=2).convert(
+        SigmaCollection.from_yaml("""
+            title: IOC
+            id: 5013332f-8a70-4e04-bcc1-06a98a2cca2e
+            status: test
+            logsource:
+                product: test_product
+            detection:
+                sel:
+                    hash: [h1, h2, h3, h4]
+                condition: sel
+        """),
+        "search_request",
+    )
+    evaluator = QuickwitQueryEvaluator.from_records(records)
+    assert evaluator.match({"hash": "h4"}) == ["5013332f-8a70-4e04-bcc1-06a98a2cca2e"]
+    assert evaluator.match({"hash": "h5"}) == []
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_quickwit_evaluator_file(tmp_path, use_mmap):
+    path = tmp_path / "events.ndjson"
+    path.write_text(
+        "\n".join(
+            [json.dumps({"fieldA": f"value{i % 3}"}) for i in range(10)]
+            + ["not json", "[1]", ""]
+        )
+    )
+    evaluator = QuickwitQueryEvaluator(
+        {"r0": 'fieldA:"value0"', "r1": ['fieldA:"value1"', 'fieldA:"value2"']},
+        max_samples=2,
+    )
+    report = evaluator.evaluate_file(path, batch_size=4, use_mmap=use_mmap)
+    assert report.events_per_second > 0
+    assert {
+        key: value
+        for key, value in report.to_dict().items()
+        if key not in ("evaluations", "seconds", "events_per_second")
+    } == {
+        "events": 12,
+        "errors": 2,
+        "matches": {"r0": 4, "r1": 6},
+        "samples": {"r0": [0, 3], "r1": [1, 2]},
+    }
+
+
+def test_quickwit_evaluator_empty_file(tmp_path):
+    path = tmp_path / "events.ndjson"
+    path.write_text("")
+    assert QuickwitQueryEvaluator({"r": "a:b"}).evaluate_file(path).events == 0
@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.backends.quickwit.instrumentation import PHASES, RuleMetrics
+from sigma.exceptions import SigmaFeatureNotSupportedByBackendError
+
+
+@pytest.fixture
+def rules():
+    return SigmaCollection.from_yaml("""
+title: List
+id: 5013332f-8a70-4e04-bcc1-06a98a2cca2e
+status: test
+logsource:
+    product: test_product
+detection:
+    sel:
+        fieldA:
+            - a
+            - b
+            - c
+        fieldB|re: '^x.*$'
+    filter:
+        fieldC|contains: foo
+    condition: sel and not filter
+---
+title: Invalid
+status: test
+logsource:
+    product: test_product
+detection:
+    sel:
+        fieldA|re: 'a(?=b)'
+    condition: sel
+""")
+
+
+def test_quickwit_instrumentation_disabled(rules):
+    backend = QuickwitBackend(collect_errors=True)
+    backend.convert(rules)
+    assert backend.instrumentation is None
+
+
+def test_quickwit_instrumentation_metrics(rules):
+    backend = QuickwitBackend(collect_errors=True, instrument=True)
+    backend.convert(rules)
+    first, second = backend.instrumentation.records
+    assert first.rule_id == "5013332f-8a70-4e04-bcc1-06a98a2cca2e"
+    assert set(first.phases) == set(PHASES)
+    assert all(seconds > 0 for seconds in first.phases.values())
+    assert first.seconds == pytest.approx(sum(first.phases.values()))
+    assert first.queries == 1
+    assert first.error is None
+    assert (
+        first.cost.clauses,
+        first.cost.in_lists,
+        first.cost.max_in_list_size,
+        first.cost.regexes,
+        first.cost.leading_wildcards,
+        first.cost.negations,
+    ) == (3, 1, 3, 1, 1, 1)
+    assert first.cost.query_bytes == len(
+        backend.convert_rule(rules.rules[0])[0].encode()
+    )
+    assert second.rule_id == "Invalid"
+    assert second.queries == 0
+    assert "Lookaround" in second.error
+
+
+def test_quickwit_instrumentation_raised_error(rules):
+    backend = QuickwitBackend(instrument=True)
+    with pytest.raises(SigmaFeatureNotSupportedByBackendError):
+        backend.convert(rules)
+    assert "Lookaround" in backend.instrumentation.records[-1].error
+
+
+def test_quickwit_instrumentation_callback(rules):
+    backend = QuickwitBackend(collect_errors=True, instrument=True)
+    received = []
+    backend.instrumentation.subscribe(received.append)
+    backend.convert(rules)
+    assert received == backend.instrumentation.records
+    assert backend.instrumentation.slowest(1)[0] in received
+
+
+def test_quickwit_instrumentation_report(rules, tmp_path):
+    report = tmp_path / "metrics.csv"
+    backend = QuickwitBackend(collect_errors=True, instrument_report=str(report))
+    backend.convert(rules)
+    rows = list(csv.DictReader(io.StringIO(report.read_text())))
+    assert [row["title"] for row in rows] == ["List", "Invalid"]
+    assert list(rows[0]) == list(RuleMetrics("", "").to_dict())
+    assert rows[0]["in_list_values"] == "3"
+
+    records = json.loads(backend.instrumentation.to_json())
+    assert records[0]["pipeline_seconds"] > 0
+    assert records[1]["error"] is not None
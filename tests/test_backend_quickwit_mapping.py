@@ -0,0 +1,276 @@
+import json
+
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.backends.quickwit.mapping import QuickwitDocMapping
+from sigma.exceptions import (
+    SigmaConfigurationError,
+    SigmaFeatureNotSupportedByBackendError,
+)
+
+index_config = "tests/files/index_config.yaml"
+
+
+@pytest.fixture
+def quickwit_backend():
+    return QuickwitBackend(index_config=index_config)
+
+
+def convert(backend: QuickwitBackend, detection: str, output_format: str = "default"):
+    return backend.convert(
+        SigmaCollection.from_yaml(f"""
+            title: Test
+            status: test
+            logsource:
+                product: windows
+                category: process_creation
+            detection:
+                {detection}
+                condition: sel
+        """),
+        output_format,
+    )
+
+
+def test_quickwit_mapping_flattened_fields():
+    doc_mapping = QuickwitDocMapping.from_file(index_config)
+    assert doc_mapping.index_id == "windows-sysmon"
+    assert doc_mapping.fields["process.executable"].is_raw
+    assert doc_mapping.fields["tags"].type == "text"
+    assert not doc_mapping.fields["message"].is_raw
+    assert doc_mapping.fields["process.pid"].fast
+
+
+def test_quickwit_mapping_raw_term(quickwit_backend):
+    assert convert(
+        quickwit_backend, "sel: {process.executable: 'C:\\Windows\\cmd.exe'}"
+    ) == ["process.executable:C\\:\\\\Windows\\\\cmd.exe"]
+
+
+def test_quickwit_mapping_raw_prefix(quickwit_backend):
+    assert convert(quickwit_backend, "sel: {tags|startswith: 'attack t'}") == [
+        "tags:attack\\ t*"
+    ]
+
+
+def test_quickwit_mapping_raw_contains_keeps_phrase(quickwit_backend):
+    assert convert(quickwit_backend, "sel: {process.executable|contains: cmd}") == [
+        'process.executable:"*cmd*"'
+    ]
+
+
+def test_quickwit_mapping_tokenized_phrase(quickwit_backend):
+    assert convert(quickwit_backend, "sel: {message: failed login}") == [
+        'message:"failed login"'
+    ]
+
+
+def test_quickwit_mapping_ip(quickwit_backend):
+    assert convert(quickwit_backend, "sel: {source_ip: 10.0.0.1}") == [
+        "source_ip:10.0.0.1"
+    ]
+    assert convert(quickwit_backend, "sel: {source_ip: '::1'}") == ['source_ip:"::1"']
+
+
+def test_quickwit_mapping_fast_range(quickwit_backend):
+    assert convert(quickwit_backend, "sel: {process.pid|gte: 4}") == ["process.pid:>=4"]
+
+
+def test_quickwit_mapping_range_requires_fast_field(quickwit_backend):
+    with pytest.raises(SigmaFeatureNotSupportedByBackendError, match="fast field"):
+        convert(quickwit_backend, "sel: {process.parent_pid|gt: 4}")
+
+
+def test_quickwit_mapping_range_requires_numeric_field():
+    backend = QuickwitBackend(index_config=index_config)
+    with pytest.raises(SigmaFeatureNotSupportedByBackendError, match="type ip"):
+        convert(backend, "sel: {source_ip|gt: 4}")
+
+
+def test_quickwit_mapping_not_indexed(quickwit_backend):
+    with pytest.raises(SigmaFeatureNotSupportedByBackendError, match="isn't indexed"):
+        convert(quickwit_backend, "sel: {body: foo}")
+    assert convert(quickwit_backend, "sel: {size|gt: 4}") == ["size:>4"]
+
+
+def test_quickwit_mapping_cidr_requires_ip_field(quickwit_backend):
+    with pytest.raises(SigmaFeatureNotSupportedByBackendError, match="CIDR"):
+        convert(quickwit_backend, "sel: {message|cidr: 10.0.0.0/8}")
+
+
+def test_quickwit_mapping_unknown_field(quickwit_backend):
+    with pytest.raises(SigmaConfigurationError, match="'Image' doesn't exist"):
+        convert(quickwit_backend, "sel: {Image: cmd.exe}")
+
+
+def test_quickwit_mapping_unknown_field_collected():
+    backend = QuickwitBackend(collect_errors=True, index_config=index_config)
+    assert convert(backend, "sel: {Image: [a, b]}") == []
+    assert len(backend.errors) == 1
+
+
+def test_quickwit_mapping_json_subfields(quickwit_backend):
+    doc_mapping = QuickwitDocMapping.from_file(index_config)
+    assert doc_mapping["attributes.process.name"].type == "json"
+    assert convert(
+        quickwit_backend,
+        "sel: {attributes.process.name: cmd.exe, attributes.process.pid|gt: 4}",
+    ) == ['attributes.process.name:"cmd.exe" AND attributes.process.pid:>4']
+    with pytest.raises(SigmaConfigurationError, match="'process.pid.x' doesn't exist"):
+        convert(quickwit_backend, "sel: {process.pid.x: 1}")
+
+
+def test_quickwit_mapping_dynamic_mode(tmp_path):
+    config = tmp_path / "index.json"
+    config.write_text(
+        json.dumps({"doc_mapping": {"field_mappings": [{"name": "a", "type": "text"}]}})
+    )
+    assert convert(QuickwitBackend(index_config=str(config)), "sel: {Image: x}") == [
+        'Image:"x"'
+    ]
+
+
+def test_quickwit_mapping_search_request_defaults(quickwit_backend):
+    result = convert(quickwit_backend, "sel: {message: x}", "search_request")[0]
+    assert result["index_id"] == "windows-sysmon"
+    assert result["request"]["sort_by"] == "-@timestamp"
+
+
+@pytest.mark.parametrize(
+    "content,message",
+    [("[1, 2]", "not a mapping"), ("doc_mapping: {}", "no field mappings")],
+)
+def test_quickwit_mapping_invalid_config(tmp_path, content, message):
+    config = tmp_path / "index.yaml"
+    config.write_text(content)
+    with pytest.raises(SigmaConfigurationError, match=message):
+        QuickwitBackend(index_config=str(config))
+
+
+def test_quickwit_mapping_missing_config(tmp_path):
+    with pytest.raises(SigmaConfigurationError, match="Can't load"):
+        QuickwitBackend(index_config=str(tmp_path / "missing.yaml"))
+
+
+@pytest.fixture
+def rewrite_backend():
+    return QuickwitBackend(
+        index_config=index_config,
+        wildcard_rewrite="true",
+        reversed_fields="process.executable=process.executable_reversed",
+        ngram_fields={"process.executable": "process.executable_ngram"},
+    )
+
+
+def test_quickwit_mapping_ngram_size():
+    doc_mapping = QuickwitDocMapping.from_file(index_config)
+    assert doc_mapping.ngram_size("process.executable_ngram") == 4
+    assert doc_mapping.ngram_size("process.executable") is None
+
+
+@pytest.mark.parametrize(
+    "detection,expected",
+    [
+        ("process.executable|startswith: 'C:\\'", "process.executable:C\\:\\\\*"),
+        (
+            "process.executable|endswith: '\\cmd.exe'",
+            "process.executable_reversed:exe.dmc\\\\*",
+        ),
+        (
+            "process.executable|contains: 'cmd /c'",
+            "process.executable_ngram:cmd\\ \\/c",
+        ),
+        ("process.executable|contains: cmd", "process.executable:/.*cmd.*/"),
+        (
+            r"process.executable: 'C:\\*\\c?d.exe'",
+            r"process.executable:/C:\\.*\\c.d\.exe/",
+        ),
+        ("tags|endswith: /x", "tags:/.*\\/x/"),
+        ("message|contains: failed", 'message:"*failed*"'),
+    ],
+)
+def test_quickwit_mapping_wildcard_rewrite(rewrite_backend, detection, expected):
+    assert convert(rewrite_backend, f"sel: {{{detection}}}") == [expected]
+
+
+def test_quickwit_mapping_wildcard_rewrite_in_list(rewrite_backend):
+    assert convert(
+        rewrite_backend,
+        "sel: {process.executable|endswith: ['\\cmd.exe', '\\sh']}",
+    ) == [
+        "process.executable_reversed:exe.dmc\\\\* OR process.executable_reversed:hs\\\\*"
+    ]
+    assert convert(rewrite_backend, "sel: {message|contains: [a, b]}") == [
+        "message:IN [*a* *b*]"
+    ]
+
+
+def test_quickwit_mapping_wildcard_rewrite_disabled(quickwit_backend):
+    assert convert(quickwit_backend, "sel: {process.executable|endswith: x}") == [
+        'process.executable:"*x"'
+    ]
+
+
+def test_quickwit_mapping_wildcard_rewrite_without_mapping():
+    backend = QuickwitBackend(wildcard_rewrite="true", ngram_fields="cmd=cmd_ngram")
+    assert convert(backend, "sel: {cmd|contains: abcd}") == ['cmd:"*abcd*"']
+
+
+def test_quickwit_mapping_lowercase_raw():
+    doc_mapping = QuickwitDocMapping.from_file(index_config)
+    assert doc_mapping.is_lowercase_raw("process.command_line_reversed")
+    assert not doc_mapping.is_lowercase_raw("process.executable_reversed")
+    assert not doc_mapping.is_lowercase_raw("process.pid")
+
+
+def test_quickwit_mapping_wildcard_rewrite_case_insensitive():
+    backend = QuickwitBackend(
+        index_config=index_config,
+        wildcard_rewrite="true",
+        reversed_fields={
+            "process.command_line": "process.command_line_reversed",
+            "message": "process.executable_reversed",
+        },
+    )
+    # The lowercasing companion keeps the match case-insensitive
+    assert convert(backend, "sel: {process.command_line|endswith: '\\CMD.exe'}") == [
+        "process.command_line_reversed:exe.dmc\\\\*"
+    ]
+    # A case-sensitive companion of a case-insensitive field isn't used
+    assert convert(backend, "sel: {message|endswith: '\\CMD.exe'}") == [
+        'message:"*\\\\CMD.exe"'
+    ]
+
+
+def test_quickwit_mapping_wildcard_rewrite_ngram_case_insensitive():
+    doc_mapping = QuickwitDocMapping.from_file(index_config)
+    assert doc_mapping.is_lowercase_ngram("process.command_line_ngram")
+    assert not doc_mapping.is_lowercase_ngram("process.executable_ngram")
+    backend = QuickwitBackend(
+        index_config=index_config,
+        wildcard_rewrite="true",
+        ngram_fields={
+            "process.command_line": "process.command_line_ngram",
+            "message": "process.executable_ngram",
+        },
+    )
+    assert convert(backend, "sel: {process.command_line|contains: WhoAmI}") == [
+        "process.command_line_ngram:whoami"
+    ]
+    assert convert(backend, "sel: {message|contains: WhoAmI}") == ['message:"*WhoAmI*"']
+
+
+def test_quickwit_mapping_wildcard_rewrite_reversed_without_mapping():
+    backend = QuickwitBackend(wildcard_rewrite="true", reversed_fields="cmd=cmd_rev")
+    assert convert(backend, "sel: {cmd|endswith: x}") == ['cmd:"*x"']
+
+
+def test_quickwit_mapping_wildcard_rewrite_invalid_companion():
+    with pytest.raises(SigmaConfigurationError, match="raw tokenizer"):
+        QuickwitBackend(
+            index_config=index_config,
+            reversed_fields="process.executable=process.command_line",
+        )
+    with pytest.raises(SigmaConfigurationError, match="field=companion"):
+        QuickwitBackend(reversed_fields="process.executable")
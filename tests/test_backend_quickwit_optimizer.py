@@ -0,0 +1,243 @@
+import random
+import time
+
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.backends.quickwit.optimizer import (
+    QuickwitConditionOptimizer,
+    subsumes,
+    subsumption_pairs,
+)
+from sigma.backends.quickwit.split import QuickwitQuerySplitter
+from sigma.conditions import ConditionFieldEqualsValueExpression, ConditionItem
+from sigma.types import SigmaString
+
+
+def convert(condition: str, backend: QuickwitBackend = None, **detections: str):
+    backend = backend or QuickwitBackend()
+    items = "\n".join(
+        f"                {name}:\n                    {detection}"
+        for name, detection in detections.items()
+    )
+    return backend.convert(
+        SigmaCollection.from_yaml(f"""
+            title: Test
+            status: test
+            logsource:
+                category: test_category
+                product: test_product
+            detection:
+{items}
+                condition: {condition}
+        """)
+    )[0]
+
+
+def test_quickwit_optimizer_in_list_merge():
+    assert (
+        convert(
+            "sel1 or (sel2 or sel3)",
+            sel1="fieldA: a",
+            sel2="fieldB: b",
+            sel3="fieldA: [c, d]",
+        )
+        == 'fieldA:IN [a c d] OR fieldB:"b"'
+    )
+
+
+def test_quickwit_optimizer_duplicates():
+    assert convert("sel1 or sel2", sel1="fieldA: a", sel2="fieldA: [a, b]") == (
+        "fieldA:IN [a b]"
+    )
+
+
+def test_quickwit_optimizer_flat_list():
+    assert convert("sel", sel="fieldA: [a, b, a, ab*, abc]") == "fieldA:IN [a b ab*]"
+    # An escaped * and a backslash before a wildcard are different values
+    assert convert("sel", sel=r"fieldA: ['a\*', 'a\\*']") == r"fieldA:IN [a\* a\\*]"
+    cond = (
+        SigmaCollection.from_yaml("""
+            title: Test
+            status: test
+            logsource:
+                product: test_product
+            detection:
+                sel:
+                    fieldA: [a, b, c]
+                condition: sel
+        """)
+        .rules[0]
+        .detection.parsed_condition[0]
+        .parsed
+    )
+    assert QuickwitConditionOptimizer().optimize(cond) == (cond, 0)
+
+
+def test_quickwit_optimizer_wildcard_subsumption_or():
+    assert (
+        convert("sel1 or sel2", sel1="fieldA: [abc, abd]", sel2="fieldA|startswith: ab")
+        == 'fieldA:"ab*"'
+    )
+
+
+def test_quickwit_optimizer_wildcard_subsumption_and():
+    assert (
+        convert("sel1 and sel2", sel1="fieldA: abc", sel2="fieldA|contains: b")
+        == 'fieldA:"abc"'
+    )
+
+
+def test_quickwit_optimizer_double_negation():
+    assert convert("not (not sel)", sel="fieldA: a") == 'fieldA:"a"'
+
+
+def test_quickwit_optimizer_not_push_down():
+    assert (
+        convert(
+            "sel1 and not (sel2 or sel3)",
+            sel1="fieldA: a",
+            sel2="{fieldB: b, fieldC: c}",
+            sel3="fieldD: d",
+        )
+        == 'fieldA:"a" AND NOT (fieldB:"b" AND fieldC:"c") AND NOT fieldD:"d"'
+    )
+
+
+def test_quickwit_optimizer_keeps_negated_in_list():
+    assert (
+        convert("sel1 and not sel2", sel1="fieldA: a", sel2="fieldB: [b, c]")
+        == 'fieldA:"a" AND NOT fieldB:IN [b c]'
+    )
+
+
+def test_quickwit_optimizer_absorption():
+    assert (
+        convert("sel1 or (sel1 and sel2)", sel1="fieldA: a", sel2="fieldB: b")
+        == 'fieldA:"a"'
+    )
+
+
+def test_quickwit_optimizer_disabled():
+    assert (
+        convert(
+            "sel1 or (sel1 and sel2)",
+            QuickwitBackend(optimize="false"),
+            sel1="fieldA: a",
+            sel2="fieldB: b",
+        )
+        == 'fieldA:"a" OR (fieldA:"a" AND fieldB:"b")'
+    )
+
+
+def test_quickwit_optimizer_report():
+    backend = QuickwitBackend()
+    convert("sel1 or sel2", backend, sel1="fieldA: [a, b, c]", sel2="fieldA: [a, b]")
+    assert backend.optimizer_report == {"Test": 2}
+
+
+@pytest.mark.parametrize(
+    "general,specific,result",
+    [
+        ("ab*", "abc", True),
+        ("ab*", "abc*", True),
+        ("ab*", "xab", False),
+        ("*bc", "abc", True),
+        ("*bc", "*abc", True),
+        ("*b*", "abc", True),
+        ("*b*", "a*b*c", True),
+        ("*b*", "ac", False),
+        ("abc", "abc", False),
+        ("a*c", "abc", False),
+        ("AB*", "abc", False),
+    ],
+)
+def test_quickwit_optimizer_subsumes(general, specific, result):
+    assert subsumes(SigmaString(general), SigmaString(specific)) is result
+
+
+def test_quickwit_optimizer_subsumption_pairs():
+    rng = random.Random(1)
+    conds = [
+        ConditionFieldEqualsValueExpression(
+            rng.choice("xy"),
+            SigmaString(
+                rng.choice(["", "*"])
+                + "".join(rng.choice("ab") for _ in range(rng.randint(1, 4)))
+                + rng.choice(["", "*"])
+            ),
+        )
+        for _ in range(200)
+    ]
+    assert {
+        (id(general), id(specific)) for general, specific in subsumption_pairs(conds)
+    } == {
+        (id(general), id(specific))
+        for general in conds
+        for specific in conds
+        if general.field == specific.field and subsumes(general.value, specific.value)
+    }
+
+
+def test_quickwit_optimizer_and_splitter_keep_input_tree():
+    rule = SigmaCollection.from_yaml("""
+        title: Test
+        status: test
+        logsource:
+            category: test_category
+            product: test_product
+        detection:
+            sel1:
+                fieldA: [a, b]
+            sel2:
+                fieldB: [c, d]
+            sel3:
+                fieldC: [e, f]
+            condition: sel1 or sel2 or sel3 or not (sel1 or sel3)
+    """).rules[0]
+    cond = rule.detection.parsed_condition[0].parsed
+
+    def parents(cond):
+        if isinstance(cond, ConditionItem):
+            yield cond, cond.parent
+            for arg in cond.args:
+                yield from parents(arg)
+
+    before = list(parents(cond))
+    QuickwitConditionOptimizer(True).optimize(cond)
+    QuickwitQuerySplitter(max_clauses=4).split(cond, str)
+    assert all(item.parent is parent for item, parent in before)
+
+
+@pytest.mark.benchmark
+def test_quickwit_optimizer_flat_list_time():
+    values = "\n".join(f"                        - v{i}" for i in range(20000))
+    yaml = f"""
+            title: Test
+            status: test
+            logsource:
+                product: test_product
+            detection:
+                sel:
+                    fieldA:
+{values}
+                condition: sel
+        """
+
+    def optimization_time():
+        cond = SigmaCollection.from_yaml(yaml).rules[0].detection.parsed_condition[0]
+        cond = cond.parsed
+        start = time.perf_counter()
+        QuickwitConditionOptimizer().optimize(cond)
+        return time.perf_counter() - start
+
+    def conversion_time():
+        rules = SigmaCollection.from_yaml(yaml)
+        start = time.perf_counter()
+        QuickwitBackend(optimize="false", memo_max_entries="0").convert(rules)
+        return time.perf_counter() - start
+
+    # The optimizer has nothing to do for a flat list, so it takes a fraction of the conversion
+    assert min(optimization_time() for _ in range(3)) < 0.5 * min(
+        conversion_time() for _ in range(3)
+    )
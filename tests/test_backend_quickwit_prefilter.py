@@ -0,0 +1,82 @@
+import random
+
+import pytest
+from sigma.backends.quickwit.evaluator import QuickwitQueryEvaluator
+from sigma.backends.quickwit.prefilter import (
+    AhoCorasick,
+    QuickwitPrefilter,
+    required_literals,
+)
+from sigma.backends.quickwit.query import parse_query
+
+
+def test_aho_corasick():
+    automaton = AhoCorasick(["he", "she", "his", "hers", "xyz"])
+    assert automaton.search("ushers") == {0, 1, 3}
+    assert automaton.search("this") == {2}
+    assert automaton.search("") == set()
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ('a:"foo"', {("a", "foo")}),
+        ('a:"*Foo*ba*"', {("a", "foo")}),
+        ("a:IN [x yy*]", {("a", "x"), ("a", "yy")}),
+        ('a:"x" AND b:"longer"', {("b", "longer")}),
+        ('a:"x" OR b:"y"', {("a", "x"), ("b", "y")}),
+        ('a:"x" AND NOT b:"longer"', {("a", "x")}),
+        ('a:"x" OR NOT b:"y"', None),
+        ("a:/x/", None),
+        ("a:[1 TO 2]", None),
+        ('a:"*"', None),
+    ],
+)
+def test_required_literals(query, expected):
+    requirement = required_literals(parse_query(query))
+    assert (set(requirement) if requirement is not None else None) == expected
+
+
+def test_prefilter_candidates():
+    prefilter = QuickwitPrefilter(
+        [
+            [parse_query('a:"foo*" AND b:"x"')],
+            [parse_query('a:"bar"'), parse_query('c:"baz"')],
+            [parse_query("NOT a:x")],
+        ]
+    )
+    assert prefilter.candidates({"a": "FOOD"}) == {0, 2}
+    assert prefilter.candidates({"c": ["x", "abazb"]}) == {1, 2}
+    assert prefilter.candidates({"b": "foo"}) == {2}
+
+
+def test_prefilter_equivalence():
+    rnd = random.Random(42)
+    words = ["alpha", "beta", "gamma", "delta", "cmd.exe", "powershell"]
+    queries = {
+        f"r{i}": query
+        for i, query in enumerate(
+            [
+                'Image:"*\\\\cmd.exe" AND NOT User:"SYSTEM"',
+                'CommandLine:"*alpha*" OR CommandLine:"*beta*"',
+                "Image:IN [powershell* gamma]",
+                'User:"system" AND CommandLine:/del.a/',
+                "EventID:>3",
+                'Image:"*" AND CommandLine:"*gamma delta*"',
+            ]
+        )
+    }
+    events = [
+        {
+            "Image": rnd.choice(words) + rnd.choice(["", "\\cmd.exe"]),
+            "CommandLine": " ".join(rnd.choices(words, k=3)),
+            "User": rnd.choice(["system", "SYSTEM", "user"]),
+            "EventID": rnd.randint(1, 5),
+        }
+        for _ in range(500)
+    ]
+    filtered = QuickwitQueryEvaluator(queries).evaluate(events)
+    unfiltered = QuickwitQueryEvaluator(queries, prefilter=False).evaluate(events)
+    assert filtered.matches == unfiltered.matches
+    assert filtered.samples == unfiltered.samples
+    assert filtered.evaluations < unfiltered.evaluations == 500 * len(queries)
@@ -0,0 +1,169 @@
+import re
+import warnings
+
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.backends.quickwit.evaluator import compile_query
+from sigma.backends.quickwit.quickwit import QuickwitRegexWarning
+from sigma.backends.quickwit.regex import translate_regex
+from sigma.exceptions import (
+    SigmaBackendError,
+    SigmaConfigurationError,
+    SigmaFeatureNotSupportedByBackendError,
+    SigmaRegularExpressionError,
+)
+
+
+@pytest.mark.parametrize(
+    "regex,expected",
+    [
+        ("^foo$", "foo"),
+        ("foo", ".*foo.*"),
+        ("^foo", "foo.*"),
+        (".*foo$", ".*foo"),
+        ("\\Afoo\\Z", "foo"),
+        ("^a$|b", "a|.*b.*"),
+        ("^C:\\\\Windows\\\\.*", "C:\\\\Windows\\\\.*"),
+        ('^a\\:b\\-c\\"$', 'a:b\\-c"'),
+        ("^(?P<a>x)(?<b>y)(?:z)$", "(?P<a>x)(?P<b>y)(?:z)"),
+        ("^(?i)x(?-i:y)(?#comment)$", "(?i)x(?-i:y)"),
+        ("(?i)cmd", "(?i).*cmd.*"),
+        ("(?s)(?x)^a$|b", "(?sx)a|.*b.*"),
+        ("(?i)", "(?i).*"),
+        ("^[a&&b[~~]]$", "[a&\\&b\\[~\\~]\\]"),
+        ("^[\\b\\d\\-]$", "[\\x08\\d\\-]"),
+        ("^a{,3}b{2,}c{1}d{$", "a{0,3}b{2,}c{1}d\\{"),
+        ("^\\0\\x41\\u0042$", "\\x00\\x41\\u0042"),
+        ("^a+?$", "a+?"),
+        ("", ".*"),
+    ],
+)
+def test_translate_regex(regex, expected):
+    translated = translate_regex(regex)
+    assert translated.regex == expected
+    re.compile(translated.regex)
+
+
+def test_translate_regex_flags():
+    assert translate_regex("^x$", frozenset({"i", "m", "s"})).regex == "(?is)x"
+
+
+@pytest.mark.parametrize(
+    "regex,construct",
+    [
+        ("a(?=b)", "Lookaround"),
+        ("a(?!b)", "Lookaround"),
+        ("(?<=a)b", "Lookaround"),
+        ("(?<!a)b", "Lookaround"),
+        ("(a)\\1", "Backreference"),
+        ("(?P<a>x)(?P=a)", "Backreference"),
+        ("\\bfoo", "Word boundary"),
+        ("(?a)x", "Flag 'a'"),
+        ("a*+", "Possessive quantifier"),
+        ("(?>a)", "Atomic group"),
+        ("(a)?(?(1)b)", "Conditional group"),
+        ("a(^b)", "Anchor inside of pattern"),
+        ("(a$)", "Anchor inside of group"),
+        ("a$b", "Anchor inside of pattern"),
+    ],
+)
+def test_translate_regex_unsupported(regex, construct):
+    with pytest.raises(SigmaFeatureNotSupportedByBackendError, match=construct):
+        translate_regex(regex)
+
+
+@pytest.mark.parametrize("regex", ["(a", "a)", "[a", "*a", "\\q", "(?y)"])
+def test_translate_regex_invalid(regex):
+    with pytest.raises(SigmaRegularExpressionError):
+        translate_regex(regex)
+
+
+@pytest.mark.parametrize(
+    "regex,finding",
+    [
+        ("^(a+)+$", "nested quantifier in '(a+)+'"),
+        ("^(\\w+\\s?)*$", "nested quantifier"),
+        ("^(a|ab)*$", "repetition of overlapping alternatives in '(a|ab)*'"),
+        ("^(.|x)+$", "repetition of overlapping alternatives"),
+        ("^(a{100}){20}$", "repetition of 2000 states"),
+        ("foo", "unanchored pattern"),
+    ],
+)
+def test_translate_regex_findings(regex, finding):
+    assert any(finding in f for f in translate_regex(regex).findings)
+
+
+@pytest.mark.parametrize("regex", ["^(a|b)*$", "^(ab)+c*$", "^a{100}$", "^.*x.*$"])
+def test_translate_regex_no_findings(regex):
+    assert translate_regex(regex).findings == ()
+
+
+def test_translate_regex_cache():
+    translate_regex.cache_clear()
+    for _ in range(3):
+        translate_regex("^cached$")
+    info = translate_regex.cache_info()
+    assert (info.hits, info.misses) == (2, 1)
+
+
+def rule_collection(regex: str) -> SigmaCollection:
+    return SigmaCollection.from_yaml(f"""
+        title: Regex
+        status: test
+        logsource:
+            product: test_product
+        detection:
+            sel:
+                fieldA|re: '{regex}'
+            condition: sel
+    """)
+
+
+def test_quickwit_regex_translation():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert QuickwitBackend().convert(rule_collection("^a/b\\.c$")) == [
+            "fieldA:/a\\/b\\.c/"
+        ]
+
+
+def test_quickwit_regex_warning():
+    with pytest.warns(QuickwitRegexWarning, match="unanchored pattern"):
+        assert QuickwitBackend().convert(rule_collection("x")) == ["fieldA:/.*x.*/"]
+
+
+def test_quickwit_regex_guard_off():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        QuickwitBackend(regex_guard="off").convert(rule_collection("(a+)+"))
+
+
+def test_quickwit_regex_guard_reject():
+    with pytest.raises(SigmaBackendError, match="nested quantifier"):
+        QuickwitBackend(regex_guard="reject").convert(rule_collection("^(a+)+$"))
+
+
+def test_quickwit_regex_unsupported():
+    with pytest.raises(SigmaFeatureNotSupportedByBackendError, match="Lookaround"):
+        QuickwitBackend().convert(rule_collection("a(?=b)"))
+
+
+def test_quickwit_regex_guard_invalid():
+    with pytest.raises(SigmaConfigurationError, match="regex_guard"):
+        QuickwitBackend(regex_guard="ignore")
+
+
+@pytest.mark.parametrize(
+    "regex,value,expected",
+    [
+        ("^ab$", "ab", True),
+        ("^ab$", "xab", False),
+        ("ab", "xaby", True),
+        ("(?i)cmd", "C:\\Windows\\CMD.EXE", True),
+        ("(?i)cmd", "powershell", False),
+    ],
+)
+def test_quickwit_regex_evaluation(regex, value, expected):
+    (query,) = QuickwitBackend(regex_guard="off").convert(rule_collection(regex))
+    assert compile_query(query)({"fieldA": value}) is expected
@@ -0,0 +1,315 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+from sigma.backends.quickwit.runner import (
+    CheckpointStore,
+    QuickwitRunner,
+    QuickwitSearchClient,
+)
+from sigma.exceptions import SigmaConfigurationError
+
+
+class StubQuickwit(BaseHTTPRequestHandler):
+    """
+    Quickwit search API stub: hits contain the query, queries containing flaky fail once,
+    queries containing many have 5 hits, which are paged, and aggregations contain the requested
+    aggregation names.
+    """
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+    failures = set()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append((self.path, body))
+        if "invalid" in body["query"]:
+            self.respond(400, {"message": "invalid query"})
+        elif "flaky" in body["query"] and body["query"] not in self.failures:
+            self.failures.add(body["query"])
+            self.respond(503, {"message": "unavailable"})
+        elif "many" in body["query"]:
+            offset = body.get("start_offset", 0)
+            hits = range(offset, min(5, offset + body["max_hits"]))
+            self.respond(200, {"num_hits": 5, "hits": [{"n": n} for n in hits]})
+        else:
+            response = {"num_hits": 1, "hits": [{"query": body["query"]}]}
+            if "aggs" in body:
+                response["aggregations"] = {
+                    name: {"buckets": []} for name in body["aggs"]
+                }
+            self.respond(200, response)
+
+    def respond(self, status, data):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def quickwit_url():
+    StubQuickwit.requests = []
+    StubQuickwit.failures = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubQuickwit)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def search_requests(*values: str):
+    return QuickwitBackend(end_timestamp=1000, time_window="100s").convert(
+        SigmaCollection.from_yaml(
+            "\n---\n".join(
+                f"""
+title: Rule {value}
+id: 00000000-0000-0000-0000-00000000000{i}
+status: test
+logsource:
+    product: test
+detection:
+    sel:
+        fieldA: {value}
+    condition: sel
+"""
+                for i, value in enumerate(values)
+            )
+        ),
+        "search_request",
+    )
+
+
+def run(runner, records):
+    async def collect():
+        try:
+            return [hits async for hits in runner.run(records)]
+        finally:
+            runner.client.close()
+
+    return sorted(asyncio.run(collect()), key=lambda hits: hits.title)
+
+
+def test_quickwit_runner(quickwit_url, tmp_path):
+    checkpoints = tmp_path / "checkpoints.json"
+    records = search_requests("a", "b", "c")
+    client = QuickwitSearchClient(quickwit_url, pool_size=2)
+    results = run(
+        QuickwitRunner(
+            client,
+            CheckpointStore(checkpoints),
+            default_index="logs",
+            clock=lambda: 1500,
+        ),
+        records,
+    )
+    assert [(hits.title, hits.num_hits, hits.error) for hits in results] == [
+        ("Rule a", 1, None),
+        ("Rule b", 1, None),
+        ("Rule c", 1, None),
+    ]
+    assert results[0].hits == [{"query": 'fieldA:"a"'}]
+    assert {path for path, _ in StubQuickwit.requests} == {"/api/v1/logs/search"}
+    assert {
+        (body["start_timestamp"], body["end_timestamp"])
+        for _, body in StubQuickwit.requests
+    } == {(900, 1500)}
+    assert client.connections_opened <= 2
+    assert json.loads(checkpoints.read_text()) == {
+        f"00000000-0000-0000-0000-00000000000{i}": 1500 for i in range(3)
+    }
+
+    # The next run continues at the checkpoints
+    StubQuickwit.requests = []
+    run(
+        QuickwitRunner(
+            QuickwitSearchClient(quickwit_url),
+            CheckpointStore(checkpoints),
+            default_index="logs",
+            clock=lambda: 1600,
+        ),
+        records,
+    )
+    assert {
+        (body["start_timestamp"], body["end_timestamp"])
+        for _, body in StubQuickwit.requests
+    } == {(1500, 1600)}
+
+
+def test_quickwit_runner_pages(quickwit_url):
+    checkpoints = CheckpointStore()
+    record = search_requests("many")[0]
+    record["request"]["max_hits"] = 2
+    (hits,) = run(
+        QuickwitRunner(
+            QuickwitSearchClient(quickwit_url),
+            checkpoints,
+            default_index="logs",
+            clock=lambda: 1500,
+        ),
+        [record],
+    )
+    assert (hits.num_hits, hits.hits, hits.truncated) == (
+        5,
+        [{"n": n} for n in range(5)],
+        False,
+    )
+    assert [body.get("start_offset") for _, body in StubQuickwit.requests] == [
+        None,
+        2,
+        4,
+    ]
+    assert checkpoints.checkpoints == {"00000000-0000-0000-0000-000000000000": 1500}
+
+
+def test_quickwit_runner_truncated(quickwit_url, tmp_path):
+    checkpoints = CheckpointStore(tmp_path / "checkpoints.json")
+    record = search_requests("many")[0]
+    record["request"]["max_hits"] = 2
+    (hits,) = run(
+        QuickwitRunner(
+            QuickwitSearchClient(quickwit_url),
+            checkpoints,
+            default_index="logs",
+            max_pages=2,
+            clock=lambda: 1500,
+        ),
+        [record],
+    )
+    assert (hits.num_hits, len(hits.hits), hits.truncated) == (5, 4, True)
+    assert checkpoints.checkpoints == {}
+    assert not (tmp_path / "checkpoints.json").exists()
+
+
+def test_quickwit_checkpoint_store_flush(tmp_path):
+    path = tmp_path / "checkpoints.json"
+    checkpoints = CheckpointStore(path)
+    checkpoints.set("a", 1000)
+    checkpoints.set("b", 2000)
+    assert not path.exists()
+    checkpoints.flush()
+    assert CheckpointStore(path).checkpoints == {"a": 1000, "b": 2000}
+
+
+def test_quickwit_runner_fused(quickwit_url):
+    records = QuickwitBackend(end_timestamp=1000, index_id="logs").convert(
+        SigmaCollection.from_yaml(
+            "\n---\n".join(
+                f"""
+title: Rule {value}
+status: test
+logsource:
+    product: test
+detection:
+    sel:
+        fieldA: {value}
+    condition: sel
+"""
+                for value in ("a", "b")
+            )
+        ),
+        "fused",
+    )
+    checkpoints = CheckpointStore()
+    (hits,) = run(
+        QuickwitRunner(
+            QuickwitSearchClient(quickwit_url), checkpoints, clock=lambda: 1500
+        ),
+        records,
+    )
+    assert (hits.title, hits.error) == ("Fused query of 2 rules", None)
+    assert hits.hits == [{"query": '(fieldA:"a") OR (fieldA:"b")'}]
+    assert checkpoints.checkpoints == {f"fused:{records[0]['query_hash']}": 1500}
+
+
+def test_quickwit_runner_retry(quickwit_url):
+    (hits,) = run(
+        QuickwitRunner(
+            QuickwitSearchClient(quickwit_url), default_index="logs", backoff=0.01
+        ),
+        search_requests("flaky"),
+    )
+    assert (hits.num_hits, hits.attempts, hits.error) == (1, 2, None)
+
+
+def test_quickwit_runner_errors(quickwit_url, tmp_path):
+    checkpoints = CheckpointStore(tmp_path / "checkpoints.json")
+    invalid, unrouted = run(
+        QuickwitRunner(QuickwitSearchClient(quickwit_url), checkpoints, backoff=0.01),
+        [
+            dict(search_requests("invalid")[0], index_id="logs"),
+            search_requests("unrouted")[0],
+        ],
+    )
+    assert "status 400" in invalid.error and invalid.attempts == 1
+    assert "No index ID" in unrouted.error
+    assert checkpoints.checkpoints == {}
+
+
+def test_quickwit_runner_up_to_date(quickwit_url):
+    checkpoints = CheckpointStore()
+    checkpoints.set("00000000-0000-0000-0000-000000000000", 1000)
+    (hits,) = run(
+        QuickwitRunner(
+            QuickwitSearchClient(quickwit_url),
+            checkpoints,
+            default_index="logs",
+            clock=lambda: 1000,
+        ),
+        search_requests("a"),
+    )
+    assert hits.attempts == 0
+    assert StubQuickwit.requests == []
+
+
+def test_quickwit_runner_aggregations(quickwit_url):
+    record = {
+        "rule_id": "correlation",
+        "title": "Correlation",
+        "index_id": "logs",
+        "correlation": {"type": "event_count"},
+        "request": {
+            "query": "*",
+            "start_timestamp": 900,
+            "end_timestamp": 1000,
+            "max_hits": 0,
+            "aggs": {"user": {"terms": {"field": "user"}}},
+        },
+    }
+    (hits,) = run(QuickwitRunner(QuickwitSearchClient(quickwit_url)), [record])
+    assert hits.aggregations == {"user": {"buckets": []}}
+
+
+def test_quickwit_runner_correlation_timespan(quickwit_url):
+    record = {
+        "rule_id": "correlation",
+        "title": "Correlation",
+        "index_id": "logs",
+        "correlation": {"type": "event_count", "timespan": 300},
+        "request": {"query": "*", "start_timestamp": 0, "max_hits": 0, "aggs": {}},
+    }
+    checkpoints = CheckpointStore()
+    checkpoints.set("correlation", 1400)
+    (hits,) = run(
+        QuickwitRunner(
+            QuickwitSearchClient(quickwit_url), checkpoints, clock=lambda: 1500
+        ),
+        [record],
+    )
+    assert (hits.start_timestamp, hits.end_timestamp) == (1200, 1500)
+
+
+def test_quickwit_runner_invalid_url():
+    with pytest.raises(SigmaConfigurationError, match="Invalid Quickwit URL"):
+        QuickwitSearchClient("localhost:7280")
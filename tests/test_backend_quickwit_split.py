@@ -0,0 +1,125 @@
+import pytest
+from sigma.collection import SigmaCollection
+from sigma.backends.quickwit import QuickwitBackend
+
+
+def ioc_rule(values: int, condition: str = "sel") -> SigmaCollection:
+    hashes = "\n".join(f"                    - h{i}" for i in range(values))
+    return SigmaCollection.from_yaml(f"""
+        title: IOC
+        id: 5013332f-8a70-4e04-bcc1-06a98a2cca2e
+        status: test
+        logsource:
+            product: test_product
+        detection:
+            sel:
+                hash:
+{hashes}
+            filter:
+                user: admin
+            condition: {condition}
+    """)
+
+
+def test_quickwit_split_disabled():
+    assert QuickwitBackend().convert(ioc_rule(4)) == ["hash:IN [h0 h1 h2 h3]"]
+
+
+def test_quickwit_split_within_budget():
+    assert QuickwitBackend(split_max_clauses=4).convert(ioc_rule(4)) == [
+        "hash:IN [h0 h1 h2 h3]"
+    ]
+
+
+def test_quickwit_split_max_clauses():
+    assert QuickwitBackend(split_max_clauses="2").convert(ioc_rule(5)) == [
+        "hash:IN [h0 h1]",
+        "hash:IN [h2 h3]",
+        'hash:"h4"',
+    ]
+
+
+def test_quickwit_split_max_bytes():
+    queries = QuickwitBackend(split_max_bytes=30).convert(ioc_rule(20))
+    assert all(len(query) <= 30 for query in queries)
+    assert [value for query in queries for value in query[9:-1].split()] == [
+        f"h{i}" for i in range(20)
+    ]
+
+
+def test_quickwit_split_and():
+    assert QuickwitBackend(split_max_clauses=3).convert(
+        ioc_rule(4, "sel and not filter")
+    ) == [
+        'hash:IN [h0 h1] AND NOT user:"admin"',
+        'hash:IN [h2 h3] AND NOT user:"admin"',
+    ]
+
+
+def test_quickwit_split_unsplittable():
+    assert QuickwitBackend(split_max_clauses=2).convert(ioc_rule(4, "not sel")) == [
+        "NOT hash:IN [h0 h1 h2 h3]"
+    ]
+
+
+def test_quickwit_split_and_copies_exceed_budget():
+    # Distribution of the AND over any of the lists would copy 22 clauses into each part
+    selections = "\n".join(
+        f"            sel{i}:\n                f{i}: [a, b]" for i in range(12)
+    )
+    rule = SigmaCollection.from_yaml(f"""
+        title: Lists
+        status: test
+        logsource:
+            product: test_product
+        detection:
+{selections}
+            condition: all of sel*
+    """)
+    (query,) = QuickwitBackend(split_max_clauses=4).convert(rule)
+    assert query.count(" AND ") == 11
+
+
+@pytest.mark.parametrize("output_format", ["search_request", "fused"])
+def test_quickwit_split_tagged(output_format):
+    output = QuickwitBackend(split_max_clauses=2).convert(ioc_rule(4), output_format)
+    if output_format == "fused":
+        (fused,) = output
+        assert fused["query"] == "(hash:IN [h0 h1]) OR (hash:IN [h2 h3])"
+        output = fused["attribution"]
+    assert [(query["rule_id"], query["part"], query["parts"]) for query in output] == [
+        ("5013332f-8a70-4e04-bcc1-06a98a2cca2e", 0, 2),
+        ("5013332f-8a70-4e04-bcc1-06a98a2cca2e", 1, 2),
+    ]
+
+
+def windash_rule(condition: str) -> SigmaCollection:
+    return SigmaCollection.from_yaml(f"""
+        title: Windash
+        status: test
+        logsource:
+            product: test_product
+        detection:
+            sel:
+                CommandLine|windash|contains: ' -enc '
+            filter:
+                user: admin
+            condition: {condition}
+    """)
+
+
+def test_quickwit_split_modifier_expansion():
+    variants = [f'CommandLine:"* {dash}enc *"' for dash in ("-", "/", "–", "—", "―")]
+    assert QuickwitBackend(split_max_clauses=2).convert(
+        windash_rule("sel and not filter")
+    ) == [f'{variant} AND NOT user:"admin"' for variant in variants]
+    assert QuickwitBackend(split_max_clauses=2).convert(windash_rule("sel")) == [
+        f"({variants[0]} OR {variants[1]})",
+        f"({variants[2]} OR {variants[3]})",
+        variants[4],
+    ]
+
+
+def test_quickwit_split_negated_modifier_expansion():
+    (query,) = QuickwitBackend(split_max_clauses=2).convert(windash_rule("not sel"))
+    assert query.startswith("NOT (") and query.count(" OR ") == 4
@@ -0,0 +1,179 @@
+import json
+import os
+
+import pytest
+from sigma.backends.quickwit.watch import QuickwitWatcher, main
+from sigma.exceptions import SigmaConfigurationError
+from sigma.pipelines.quickwit import quickwit_windows_pipeline
+
+RULE = """
+title: {title}
+name: {name}
+status: test
+logsource:
+    product: windows
+    service: sysmon
+detection:
+    sel:
+        Image: {value}
+    condition: sel
+"""
+
+CORRELATION = """
+title: Correlation
+status: test
+correlation:
+    type: event_count
+    rules:
+        - rule_a
+    group-by:
+        - User
+    timespan: 5m
+    condition:
+        gte: 10
+"""
+
+PIPELINE = """
+name: prefix
+priority: 30
+transformations:
+    - id: prefix
+      type: field_name_prefix
+      prefix: "{prefix}"
+"""
+
+
+def write_rule(path, value, title="A", name="rule_a"):
+    path.write_text(RULE.format(title=title, name=name, value=value))
+
+
+def manifest(watcher):
+    return json.loads(watcher.manifest_path.read_text())
+
+
+@pytest.fixture
+def rules(tmp_path):
+    rules = tmp_path / "rules"
+    (rules / "sub").mkdir(parents=True)
+    write_rule(rules / "a.yml", "a.exe")
+    write_rule(rules / "sub" / "b.yaml", "b.exe", "B", "rule_b")
+    return rules
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    path = tmp_path / "pipeline.yml"
+    path.write_text(PIPELINE.format(prefix="x."))
+    return path
+
+
+@pytest.fixture
+def watcher(tmp_path, rules, pipeline):
+    return QuickwitWatcher(
+        rules,
+        tmp_path / "out" / "manifest.json",
+        [pipeline],
+        [quickwit_windows_pipeline()],
+    )
+
+
+def test_quickwit_watch_initial(watcher):
+    cycle = watcher.poll()
+    assert len(cycle.converted) == 2 and cycle.manifest_written
+    result = manifest(watcher)
+    assert result["output"] == [
+        'x.process.executable:"a.exe"',
+        'x.process.executable:"b.exe"',
+    ]
+    assert result["rules"]["sub/b.yaml"]["queries"] == ['x.process.executable:"b.exe"']
+    assert os.listdir(watcher.manifest_path.parent) == ["manifest.json"]
+
+
+def test_quickwit_watch_unchanged(watcher, rules):
+    watcher.poll()
+    os.utime(rules / "a.yml", ns=(0, 0))
+    cycle = watcher.poll()
+    assert cycle.converted == [] and not cycle.manifest_written
+    assert watcher.poll().converted == []
+
+
+def test_quickwit_watch_edit(watcher, rules):
+    watcher.poll()
+    write_rule(rules / "a.yml", "changed.exe")
+    cycle = watcher.poll()
+    assert cycle.converted == [rules / "a.yml"] and cycle.manifest_written
+    assert manifest(watcher)["output"][0] == 'x.process.executable:"changed.exe"'
+
+
+def test_quickwit_watch_remove(watcher, rules):
+    watcher.poll()
+    (rules / "a.yml").unlink()
+    cycle = watcher.poll()
+    assert cycle.removed == [rules / "a.yml"]
+    assert list(manifest(watcher)["rules"]) == ["sub/b.yaml"]
+
+
+def test_quickwit_watch_pipeline_change(watcher, pipeline):
+    watcher.poll()
+    pipeline.write_text(PIPELINE.format(prefix="yy."))
+    cycle = watcher.poll()
+    assert cycle.pipeline_changed and len(cycle.converted) == 2
+    assert manifest(watcher)["output"][0] == 'yy.process.executable:"a.exe"'
+
+    pipeline.write_text("transformations: [")
+    cycle = watcher.poll()
+    assert cycle.pipeline_error is not None and cycle.converted == []
+    pipeline.write_text(PIPELINE.format(prefix="yy."))
+    cycle = watcher.poll()
+    assert cycle.pipeline_error is None and not cycle.pipeline_changed
+
+
+def test_quickwit_watch_pipeline_invalid(tmp_path, rules):
+    with pytest.raises(SigmaConfigurationError, match="processing pipeline"):
+        QuickwitWatcher(rules, tmp_path / "m.json", [tmp_path / "missing.yml"]).poll()
+
+
+def test_quickwit_watch_correlation(watcher, rules):
+    (rules / "correlation.yml").write_text(CORRELATION)
+    watcher.poll()
+    (correlation,) = manifest(watcher)["rules"]["correlation.yml"]["queries"]
+    assert correlation["request"]["query"] == 'x.process.executable:"a.exe"'
+
+    write_rule(rules / "a.yml", "changed.exe")
+    cycle = watcher.poll()
+    assert sorted(cycle.converted) == [rules / "a.yml", rules / "correlation.yml"]
+    (correlation,) = manifest(watcher)["rules"]["correlation.yml"]["queries"]
+    assert correlation["request"]["query"] == 'x.process.executable:"changed.exe"'
+
+
+def test_quickwit_watch_invalid_rule(watcher, rules):
+    (rules / "invalid.yml").write_text("title: [")
+    watcher.poll()
+    result = manifest(watcher)["rules"]["invalid.yml"]
+    assert result["queries"] == [] and len(result["errors"]) == 1
+
+
+def test_quickwit_watch_main(tmp_path, rules, pipeline, monkeypatch):
+    output = tmp_path / "manifest.json"
+    monkeypatch.setattr(
+        QuickwitWatcher, "run", lambda self, *args, **kwargs: self.poll()
+    )
+    assert (
+        main(
+            [
+                str(rules),
+                "-o",
+                str(output),
+                "-p",
+                str(pipeline),
+                "-p",
+                "quickwit_windows_pipeline",
+                "-O",
+                "end_timestamp=0",
+                "-f",
+                "search_request",
+            ]
+        )
+        == 0
+    )
+    assert json.loads(output.read_text())["output"][0]["request"]["end_timestamp"] == 0
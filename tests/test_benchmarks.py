@@ -0,0 +1,110 @@
+import json
+import random
+
+import pytest
+from sigma.rule import SigmaRule
+
+from benchmarks import fuzz, startup
+from benchmarks.corpus import CORPORA
+from benchmarks.run import compare, main, run
+
+
+@pytest.mark.parametrize("name", sorted(CORPORA))
+def test_benchmark_corpus_seeded(name):
+    corpus = CORPORA[name]
+    rules = corpus.generate(random.Random(7), 0.01)
+    assert rules and rules == corpus.generate(random.Random(7), 0.01)
+
+
+def test_benchmark_run(tmp_path):
+    output = tmp_path / "results.json"
+    assert main(["--scale", "0.01", "--repeat", "1", "--output", str(output)]) == 0
+    results = json.loads(output.read_text())
+    assert results["metadata"]["seed"] == 1
+    assert set(results["results"]) == set(CORPORA)
+    for result in results["results"].values():
+        assert result["rules"] > 0
+        assert result["rules_per_second"] > 0
+        assert result["peak_memory_bytes"] > 0
+        assert all(
+            method["method"].startswith("sigma.") for method in result["methods"]
+        )
+
+
+def test_benchmark_compare():
+    results = run(["deep_nesting"], scale=0.01, repeat=1)
+    assert compare(results, results, 0.2) == []
+    baseline = json.loads(json.dumps(results))
+    baseline["results"]["deep_nesting"]["rules_per_second"] *= 2
+    (regression,) = compare(results, baseline, 0.2)
+    assert regression.startswith("deep_nesting:")
+
+
+def test_startup_lazy_imports(tmp_path):
+    output = tmp_path / "startup.json"
+    assert (
+        startup.main(["--runs", "3", "--budget-ms", "1000", "--output", str(output)])
+        == 0
+    )
+    assert json.loads(output.read_text())["eager_modules"] == []
+
+
+@pytest.mark.benchmark
+def test_startup_budget():
+    assert startup.main(["--runs", "3"]) == 0
+
+
+def test_fuzz_rules_seeded():
+    generated = fuzz.random_rule(random.Random(3))
+    assert generated == fuzz.random_rule(random.Random(3))
+    assert generated.samples
+
+
+@pytest.mark.parametrize(
+    "detection,event,expected",
+    [
+        ({"sel": {"a|contains": "x*y"}}, {"a": "1XzY2"}, True),
+        ({"sel": {"a|re": "^x[0-9]"}}, {"a": "x1y"}, True),
+        ({"sel": {"a|cidr": "10.0.0.0/8"}}, {"a": "::1"}, False),
+        ({"sel": {"a|gte": 3}}, {"a": "3"}, True),
+        ({"sel": {"a": None}}, {"a": None}, True),
+        ({"sel": {"a.b": [4, 5]}}, {"a": {"b": 5}}, True),
+    ],
+)
+def test_fuzz_reference_matcher(detection, event, expected):
+    rule = SigmaRule.from_dict(
+        {
+            "title": "Test",
+            "logsource": {"product": "test"},
+            "detection": {**detection, "condition": "sel"},
+        }
+    )
+    assert fuzz.reference_matcher(rule)(event) is expected
+
+
+def test_fuzz_differential():
+    report = fuzz.differential(seed=1, rules=50, events=20)
+    assert [mismatch.to_dict() for mismatch in report.mismatches] == []
+    assert report.comparisons == 50 * 20 * len(fuzz.OPTION_SETS)
+    assert 0 < report.matches < 50 * 20
+
+
+def test_fuzz_complexity_size():
+    for dimension in fuzz.complexity(scale=0.5, repeat=1).values():
+        assert dimension["size_exponent"] <= fuzz.DEFAULT_MAX_EXPONENT
+
+
+@pytest.mark.benchmark
+def test_fuzz_complexity_time():
+    for dimension in fuzz.complexity(scale=0.5).values():
+        # Lenient bound against timing noise, quadratic growth is still detected
+        assert dimension["time_exponent"] <= 1.6
+
+
+def test_fuzz_main(tmp_path):
+    output = tmp_path / "fuzz.json"
+    assert (
+        fuzz.main(["--check", "differential", "--rules", "5", "--output", str(output)])
+        == 0
+    )
+    assert json.loads(output.read_text())["differential"]["rules"] == 5
@@ -1,7 +1,12 @@
 import pytest
 from sigma.collection import SigmaCollection
 from sigma.backends.quickwit import QuickwitBackend
-from sigma.pipelines.quickwit import quickwit_windows_pipeline
+from sigma.exceptions import SigmaConfigurationError
+from sigma.pipelines.quickwit import (
+    quickwit_index_routing_pipeline,
+    quickwit_mapping_pipeline,
+    quickwit_windows_pipeline,
+)
 
 
 @pytest.fixture
@@ -128,4 +133,205 @@ def test_quickwit_windows_multiple_services(quickwit_backend):
     ) == ['winlog.event_id:4624 OR (winlog.event_id:1 AND service:"sysmon")']
 
 
+def routed_index(pipeline, logsource: str):
+    return QuickwitBackend(pipeline, end_timestamp=0).convert(
+        SigmaCollection.from_yaml(f"""
+            title: Test Routing
+            status: test
+            logsource:
+                {logsource}
+            detection:
+                sel:
+                    EventID: 1
+                condition: sel
+        """),
+        "search_request",
+    )[0]["index_id"]
+
+
+def test_quickwit_index_routing_service():
+    assert (
+        routed_index(
+            quickwit_index_routing_pipeline(), "{product: windows, service: sysmon}"
+        )
+        == "windows-sysmon"
+    )
+
+
+def test_quickwit_index_routing_product_fallback():
+    assert (
+        routed_index(
+            quickwit_index_routing_pipeline(),
+            "{product: windows, category: process_creation}",
+        )
+        == "windows-*"
+    )
+
+
+def test_quickwit_index_routing_unrouted():
+    assert routed_index(quickwit_index_routing_pipeline(), "{product: linux}") is None
+
+
+def test_quickwit_index_routing_custom():
+    pipeline = quickwit_index_routing_pipeline(
+        [
+            {"product": "linux", "index": "linux"},
+            {
+                "product": "linux",
+                "category": "process_creation",
+                "index": "linux-processes",
+            },
+        ],
+        default_index="logs-*",
+    )
+    assert (
+        routed_index(pipeline, "{product: linux, category: process_creation}")
+        == "linux-processes"
+    )
+    assert routed_index(pipeline, "{product: linux, service: auditd}") == "linux"
+    assert routed_index(pipeline, "{product: macos}") == "logs-*"
+
+
+def test_quickwit_index_routing_backend_option():
+    assert (
+        QuickwitBackend(index_id="logs").convert(
+            SigmaCollection.from_yaml("""
+                title: Test
+                status: test
+                logsource:
+                    product: linux
+                detection:
+                    sel:
+                        fieldA: value
+                    condition: sel
+            """),
+            "search_request",
+        )[0]["index_id"]
+        == "logs"
+    )
+
+
+def mapped_query(pipeline, logsource: str) -> str:
+    return QuickwitBackend(pipeline).convert(
+        SigmaCollection.from_yaml(f"""
+            title: Test Mapping
+            status: test
+            logsource:
+                {logsource}
+            detection:
+                sel:
+                    EventID: 1
+                    Image: cmd.exe
+                condition: sel
+        """)
+    )[0]
+
+
+@pytest.mark.parametrize(
+    "logsource",
+    [
+        "{product: windows, service: sysmon}",
+        "{product: windows, service: security}",
+        "{product: windows, category: process_creation}",
+        "{product: linux, service: sysmon}",
+    ],
+)
+def test_quickwit_mapping_pipeline_default(logsource):
+    assert mapped_query(quickwit_mapping_pipeline(), logsource) == mapped_query(
+        quickwit_windows_pipeline(), logsource
+    )
+
+
+MAPPING = {
+    "fields": {"EventID": "event.code"},
+    "mappings": [
+        {
+            "logsource": {"product": "windows"},
+            "fields": {"Image": "process.executable"},
+        },
+        {
+            "logsource": {"product": "windows", "category": "process_creation"},
+            "fields": {"Image": ["process.executable", "process.name"]},
+        },
+        {"logsource": {"service": "sysmon"}, "fields": {"EventID": "winlog.event_id"}},
+    ],
+}
+
+
+@pytest.mark.parametrize(
+    "logsource,expected",
+    [
+        ("{product: linux}", 'event.code:1 AND Image:"cmd.exe"'),
+        ("{product: windows}", 'event.code:1 AND process.executable:"cmd.exe"'),
+        (
+            "{product: windows, category: process_creation}",
+            'event.code:1 AND (process.executable:"cmd.exe" OR process.name:"cmd.exe")',
+        ),
+        (
+            "{product: windows, service: sysmon}",
+            'winlog.event_id:1 AND process.executable:"cmd.exe"',
+        ),
+    ],
+)
+def test_quickwit_mapping_pipeline_logsources(logsource, expected):
+    assert mapped_query(quickwit_mapping_pipeline(MAPPING), logsource) == expected
+
+
+def test_quickwit_mapping_pipeline_file(tmp_path):
+    path = tmp_path / "mapping.yml"
+    path.write_text("""
+mappings:
+    - logsource:
+        product: windows
+      fields:
+        Image: process.executable
+""")
+    assert (
+        mapped_query(quickwit_mapping_pipeline(str(path)), "{product: windows}")
+        == 'EventID:1 AND process.executable:"cmd.exe"'
+    )
+
+
+def test_quickwit_mapping_pipeline_indexed():
+    mapping = {
+        "mappings": [
+            {
+                "logsource": {"product": f"product{i}"},
+                "fields": {f"field{j}": f"product{i}.field{j}" for j in range(10)},
+            }
+            for i in range(1000)
+        ]
+    }
+    pipeline = quickwit_mapping_pipeline(mapping)
+    assert len(pipeline.items) == 1
+    transformation = pipeline.items[0].transformation
+    assert len(transformation.mappings) == 1000
+    assert transformation.resolve(("product7", None, "sysmon")) == {
+        f"field{j}": f"product7.field{j}" for j in range(10)
+    }
+    assert (
+        transformation.resolve(("product7", None, "sysmon"))
+        is (transformation._resolved[("product7", None, "sysmon")])
+    )
+
+
+@pytest.mark.parametrize(
+    "mapping",
+    [
+        ["fields"],
+        {"mappings": [{"logsource": {"os": "windows"}, "fields": {"a": "b"}}]},
+        {"mappings": [{"logsource": {"product": "windows"}}]},
+        {"mappings": ["fields"]},
+    ],
+)
+def test_quickwit_mapping_pipeline_invalid(mapping):
+    with pytest.raises(SigmaConfigurationError, match="[Ff]ield mapping"):
+        quickwit_mapping_pipeline(mapping)
+
+
+def test_quickwit_mapping_pipeline_missing_file(tmp_path):
+    with pytest.raises(SigmaConfigurationError, match="Can't load field mapping"):
+        quickwit_mapping_pipeline(str(tmp_path / "missing.yml"))
+
+
 # Add more tests as needed to cover other aspects of your pipeline